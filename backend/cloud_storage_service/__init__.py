@@ -1,4 +1,4 @@
-from __future__ import absolute_import, unicode_literals
-from .celery import app as celery_app
-
-__all__ = ('celery_app',)
+from __future__ import absolute_import, unicode_literals
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -1,19 +1,39 @@
-import logging
-from django.utils.deprecation import MiddlewareMixin
-
-logger = logging.getLogger(__name__)
-
-class DisableCacheMiddleware(MiddlewareMixin):
-    """
-    Middleware to disable caching.
-    """
-    def process_response(self, request, response):
-        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0, private'
-        response['Pragma'] = 'no-cache'
-        response['Expires'] = '0'
-
-        content_type = response.get('Content-Type', '')
-        if 'application/json' in content_type:
-            response['Cache-Control'] += ', proxy-revalidate'
-
-        return response
+import logging
+import time
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+class DisableCacheMiddleware(MiddlewareMixin):
+    """
+    Middleware to disable caching.
+    """
+    def process_response(self, request, response):
+        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0, private'
+        response['Pragma'] = 'no-cache'
+        response['Expires'] = '0'
+
+        content_type = response.get('Content-Type', '')
+        if 'application/json' in content_type:
+            response['Cache-Control'] += ', proxy-revalidate'
+
+        return response
+
+class SessionRefreshMiddleware(MiddlewareMixin):
+    """
+    Middleware to extend session expiry only when it is close to lapsing.
+    Replaces SESSION_SAVE_EVERY_REQUEST, which writes the session to the cache
+    and the database on every request. Must be placed after SessionMiddleware.
+    """
+    refreshed_key = '_session_refreshed_at'
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is None or not session.accessed or session.modified or session.is_empty():
+            return response
+        refreshed_at = session.get(self.refreshed_key, 0)
+        if time.time() - refreshed_at > session.get_expiry_age() - settings.SESSION_REFRESH_THRESHOLD:
+            session[self.refreshed_key] = int(time.time())
+            logger.debug(f"Refreshed session expiry for {session.session_key}")
+        return response
@@ -1,235 +1,481 @@
-"""
-Django settings for cloud_storage_service project.
-
-Generated by 'django-admin startproject' using Django 5.1.3.
-"""
-
-from pathlib import Path
-from decouple import config
-import os
-
-# Build paths
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-# Security settings
-SECRET_KEY = config('SECRET_KEY')
-DEBUG = config('DEBUG', default=False, cast=bool)
-ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(',')
-
-# CSRF (.env)
-CSRF_TRUSTED_ORIGINS = config(
-    'CSRF_TRUSTED_ORIGINS',
-    default='http://localhost:3000,http://127.0.0.1:3000,http://localhost:8000,http://127.0.0.1:8000'
-).split(',')
-
-# Application definition
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    
-    # Third-party
-    'rest_framework',
-    'corsheaders',
-    'channels',
-    
-    # Local
-    'users',
-    'files',
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'cloud_storage_service.urls'
-WSGI_APPLICATION = 'cloud_storage_service.wsgi.application'
-ASGI_APPLICATION = 'cloud_storage_service.asgi.application'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('DB_NAME'),
-        'USER': config('DB_USER'),
-        'PASSWORD': config('DB_PASSWORD'),
-        'HOST': config('DB_HOST', default='localhost'),
-        'PORT': config('DB_PORT', default='5432'),
-    }
-}
-
-# Password validation
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-    },
-]
-
-# Internationalization
-LANGUAGE_CODE = 'en-us'
-TIME_ZONE = 'UTC'
-USE_I18N = True
-USE_TZ = True
-
-# Static files
-STATIC_URL = 'static/'
-STATIC_ROOT = BASE_DIR / 'staticfiles'
-
-# Media files
-MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
-
-# Default primary key
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-# Custom user model
-AUTH_USER_MODEL = 'users.CustomUser'
-
-# REST Framework
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-    ],
-    'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticated',
-    ],
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ],
-}
-
-# CORS
-CORS_ALLOWED_ORIGINS = [
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-]
-CORS_ALLOW_CREDENTIALS = True
-
-# Redis configuration
-REDIS_HOST = config('REDIS_HOST', default='localhost')
-REDIS_PORT = config('REDIS_PORT', default=6379, cast=int)
-
-# Sessions
-SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
-SESSION_COOKIE_HTTPONLY = True
-SESSION_COOKIE_SECURE = not DEBUG
-SESSION_COOKIE_SAMESITE = 'Lax'
-SESSION_COOKIE_AGE = 604800  # 1 week
-SESSION_SAVE_EVERY_REQUEST = True
-SESSION_CACHE_ALIAS = "default"
-
-# Celery
-CELERY_BROKER_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/0'
-CELERY_RESULT_BACKEND = f'redis://{REDIS_HOST}:{REDIS_PORT}/1'
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'UTC'
-
-# Channels
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            "hosts": [(REDIS_HOST, REDIS_PORT)],
-        },
-    },
-}
-
-# Cache
-CACHES = {
-    "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/2",
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-        }
-    }
-}
-
-# Security
-if not DEBUG:
-    SECURE_HSTS_SECONDS = 31536000
-    SECURE_HSTS_INCLUDE_SUBDOMAINS = True
-    SECURE_HSTS_PRELOAD = True
-    SECURE_SSL_REDIRECT = True
-    CSRF_COOKIE_SECURE = not DEBUG
-    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https') if not DEBUG else None
-    CSRF_COOKIE_HTTPONLY = True
-    CSRF_COOKIE_SAMESITE = 'Lax'
-
-# File uploads
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
-
-# Logging
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
-        },
-    },
-    'handlers': {
-        'console': {
-            'level': 'DEBUG' if DEBUG else 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
-        },
-    },
-    'loggers': {
-        'django': {
-            'handlers': ['console'],
-            'level': 'DEBUG' if DEBUG else 'INFO',
-            'propagate': True,
-        },
-        '': {
-            'handlers': ['console'],
-            'level': 'DEBUG' if DEBUG else 'INFO',
-        },
-    },
-}
-
-# Checking the configuration at startup
-if DEBUG:
-    print("\n✔ The configuration has been uploaded successfully:")
-    print(f"• The database: {DATABASES['default']['HOST']}:{DATABASES['default']['PORT']}")
-    print(f"• Redis: {REDIS_HOST}:{REDIS_PORT}")
+"""
+Django settings for cloud_storage_service project.
+
+Generated by 'django-admin startproject' using Django 5.1.3.
+"""
+
+from datetime import timedelta
+from pathlib import Path
+from decouple import config
+import os
+
+# Build paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Security settings
+SECRET_KEY = config('SECRET_KEY')
+DEBUG = config('DEBUG', default=False, cast=bool)
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(',')
+
+# CSRF (.env)
+CSRF_TRUSTED_ORIGINS = config(
+    'CSRF_TRUSTED_ORIGINS',
+    default='http://localhost:3000,http://127.0.0.1:3000,http://localhost:8000,http://127.0.0.1:8000'
+).split(',')
+
+# Application definition
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django.contrib.postgres',
+    
+    # Third-party
+    'rest_framework',
+    'rest_framework_simplejwt.token_blacklist',
+    'corsheaders',
+    'channels',
+    
+    # Local
+    'users',
+    'files',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'cloud_storage_service.middleware.SessionRefreshMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'cloud_storage_service.urls'
+WSGI_APPLICATION = 'cloud_storage_service.wsgi.application'
+ASGI_APPLICATION = 'cloud_storage_service.asgi.application'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+# Database
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config('DB_NAME'),
+        'USER': config('DB_USER'),
+        'PASSWORD': config('DB_PASSWORD'),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default='5432'),
+    }
+}
+
+# Password validation
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# Password hashing. PASSWORD_HASHER_PROFILE picks the hasher new passwords
+# use; hashes made by the other one (or with other costs) are upgraded on login.
+PASSWORD_HASHER_PROFILE = config('PASSWORD_HASHER_PROFILE', default='argon2')
+PASSWORD_HASHER_PROFILES = {
+    'argon2': [
+        'users.hashers.TunedArgon2PasswordHasher',
+        'users.hashers.TunedPBKDF2PasswordHasher',
+    ],
+    'pbkdf2': [
+        'users.hashers.TunedPBKDF2PasswordHasher',
+        'users.hashers.TunedArgon2PasswordHasher',
+    ],
+}
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=65536, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+PBKDF2_ITERATIONS = config('PBKDF2_ITERATIONS', default=870000, cast=int)
+
+# Passwords are checked on a pool of PASSWORD_HASHING_WORKERS threads per
+# process; attempts beyond PASSWORD_HASHING_QUEUE waiting ones get a 503.
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=2, cast=int)
+PASSWORD_HASHING_QUEUE = config('PASSWORD_HASHING_QUEUE', default=16, cast=int)
+
+# Sign-in attempts allowed per client IP and per account within the sliding window (seconds)
+LOGIN_RATE_LIMIT_WINDOW = config('LOGIN_RATE_LIMIT_WINDOW', default=300, cast=int)
+LOGIN_RATE_LIMIT_PER_IP = config('LOGIN_RATE_LIMIT_PER_IP', default=50, cast=int)
+LOGIN_RATE_LIMIT_PER_ACCOUNT = config('LOGIN_RATE_LIMIT_PER_ACCOUNT', default=10, cast=int)
+
+# Internationalization
+LANGUAGE_CODE = 'en-us'
+TIME_ZONE = 'UTC'
+USE_I18N = True
+USE_TZ = True
+
+# Static files
+STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Media files
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Storage backends. With FILE_STORAGE_DEDUPLICATE identical uploads share one blob.
+# With FILE_TIERING_ENABLED files live on local disk (hot) and move to the
+# S3-compatible 'cold' storage when not downloaded for a while.
+FILE_STORAGE_DEDUPLICATE = config('FILE_STORAGE_DEDUPLICATE', default=False, cast=bool)
+FILE_TIERING_ENABLED = config('FILE_TIERING_ENABLED', default=False, cast=bool)
+FILE_STORAGE_BACKENDS = {
+    (False, False): 'django.core.files.storage.FileSystemStorage',
+    (True, False): 'files.storage.ContentAddressedStorage',
+    (False, True): 'files.storage.TieredStorage',
+    (True, True): 'files.storage.TieredContentAddressedStorage',
+}
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'files': {
+        'BACKEND': FILE_STORAGE_BACKENDS[(FILE_STORAGE_DEDUPLICATE, FILE_TIERING_ENABLED)],
+    },
+    'cold': {
+        'BACKEND': 'files.storage.S3Storage',
+        'OPTIONS': {
+            'bucket_name': config('FILE_COLD_BUCKET', default='cloud-storage-cold'),
+            'endpoint_url': config('FILE_COLD_ENDPOINT_URL', default=None),
+            'access_key': config('FILE_COLD_ACCESS_KEY', default=None),
+            'secret_key': config('FILE_COLD_SECRET_KEY', default=None),
+            'region_name': config('FILE_COLD_REGION', default=None),
+            'prefix': config('FILE_COLD_PREFIX', default=''),
+        },
+    },
+}
+# Tiering policy (apply_storage_tiering, every FILE_TIERING_INTERVAL seconds): files not
+# downloaded for FILE_TIERING_COLD_AFTER_DAYS go cold, sooner while local disk usage is
+# above FILE_TIERING_DISK_HIGH_WATERMARK (0 disables); cold files downloaded again come back.
+# A run moves at most FILE_TIERING_MAX_BYTES_PER_RUN at FILE_TIERING_BANDWIDTH bytes/s (0: unlimited).
+FILE_TIERING_COLD_AFTER_DAYS = config('FILE_TIERING_COLD_AFTER_DAYS', default=14, cast=int)
+FILE_TIERING_DISK_HIGH_WATERMARK = config('FILE_TIERING_DISK_HIGH_WATERMARK', default=0.8, cast=float)
+FILE_TIERING_BATCH_SIZE = config('FILE_TIERING_BATCH_SIZE', default=100, cast=int)
+FILE_TIERING_MAX_BYTES_PER_RUN = config('FILE_TIERING_MAX_BYTES_PER_RUN', default=20 * 2 ** 30, cast=int)
+FILE_TIERING_BANDWIDTH = config('FILE_TIERING_BANDWIDTH', default=50 * 2 ** 20, cast=int)
+# Blobs per batch of the reconcile_blob_references task
+BLOB_RECONCILE_BATCH_SIZE = config('BLOB_RECONCILE_BATCH_SIZE', default=1000, cast=int)
+
+# Default primary key
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Custom user model
+AUTH_USER_MODEL = 'users.CustomUser'
+
+# Session users are cached for USER_CACHE_TTL seconds; sessions created
+# before the cached backend keep working through ModelBackend. Credentials are
+# only checked by CachedModelBackend (by username or email).
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TTL = config('USER_CACHE_TTL', default=300, cast=int)
+
+# REST Framework
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users.authentication.CachedJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+    # Reverse proxies in front of the app (nginx appends the client address to
+    # X-Forwarded-For). Throttles take the client IP that many hops from the
+    # right, so clients cannot pick their own by sending the header; 0 uses
+    # REMOTE_ADDR only.
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
+}
+
+# JWT (API clients and CLI tools; the browser frontend keeps using sessions)
+# Tokens are verified in-process with the configured key. Refresh tokens are
+# rotated and the old ones blacklisted; a password change revokes access tokens.
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_MINUTES', default=15, cast=int)),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=config('JWT_REFRESH_TOKEN_DAYS', default=7, cast=int)),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'UPDATE_LAST_LOGIN': False,
+    'CHECK_REVOKE_TOKEN': True,
+    'ALGORITHM': config('JWT_ALGORITHM', default='HS256'),
+    'SIGNING_KEY': config('JWT_SIGNING_KEY', default=SECRET_KEY),
+    'VERIFYING_KEY': config('JWT_VERIFYING_KEY', default=''),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.CustomTokenObtainPairSerializer',
+}
+
+# CORS
+CORS_ALLOWED_ORIGINS = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+]
+CORS_ALLOW_CREDENTIALS = True
+
+# Redis configuration
+REDIS_HOST = config('REDIS_HOST', default='localhost')
+REDIS_PORT = config('REDIS_PORT', default=6379, cast=int)
+
+# Sessions
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_COOKIE_HTTPONLY = True
+SESSION_COOKIE_SECURE = not DEBUG
+SESSION_COOKIE_SAMESITE = 'Lax'
+SESSION_COOKIE_AGE = 604800  # 1 week
+# Sessions are saved when modified or when less than SESSION_REFRESH_THRESHOLD
+# seconds of their lifetime are left (SessionRefreshMiddleware).
+SESSION_SAVE_EVERY_REQUEST = config('SESSION_SAVE_EVERY_REQUEST', default=False, cast=bool)
+SESSION_REFRESH_THRESHOLD = config('SESSION_REFRESH_THRESHOLD', default=86400, cast=int)  # 1 day
+SESSION_CACHE_ALIAS = "default"
+
+# Celery
+CELERY_BROKER_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/0'
+CELERY_RESULT_BACKEND = f'redis://{REDIS_HOST}:{REDIS_PORT}/1'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'delete-old-files': {
+        'task': 'files.tasks.delete_old_files',
+        'schedule': 3600.0,
+    },
+    'delete-expired-upload-sessions': {
+        'task': 'files.tasks.delete_expired_upload_sessions',
+        'schedule': 3600.0,
+    },
+    'flush-download-stats': {
+        'task': 'files.tasks.flush_download_stats',
+        'schedule': float(config('DOWNLOAD_STATS_FLUSH_INTERVAL', default=60, cast=int)),
+    },
+    'resume-storage-tombstones': {
+        'task': 'files.tasks.resume_storage_tombstones',
+        'schedule': 1800.0,
+    },
+    'reconcile-blob-references': {
+        'task': 'files.tasks.reconcile_blob_references',
+        'schedule': 86400.0,
+    },
+    'reconcile-storage-usage': {
+        'task': 'files.tasks.reconcile_storage_usage',
+        'schedule': 86400.0,
+    },
+    'trim-file-changes': {
+        'task': 'files.tasks.trim_file_changes',
+        'schedule': 3600.0,
+    },
+    'apply-storage-tiering': {
+        'task': 'files.tasks.apply_storage_tiering',
+        'schedule': float(config('FILE_TIERING_INTERVAL', default=900, cast=int)),
+    },
+    'export-share-revocations': {
+        'task': 'files.tasks.export_share_revocations',
+        'schedule': float(config('FILE_SHARE_REVOCATIONS_INTERVAL', default=60, cast=int)),
+    },
+}
+
+# Channels
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            "hosts": [(REDIS_HOST, REDIS_PORT)],
+            # Messages queued per channel before group sends to it are dropped,
+            # and seconds after which an unread message expires.
+            "capacity": config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),
+            "expiry": config('CHANNEL_LAYER_EXPIRY', default=60, cast=int),
+        },
+    },
+}
+
+# File events over WebSocket
+# Events reaching a consumer within the window are sent as one frame (0 sends each at once).
+# More than FILE_EVENTS_BATCH_MAX pending events, or events that waited longer than
+# FILE_EVENTS_MAX_LAG seconds in the channel layer, are replaced by a single resync frame.
+FILE_EVENTS_BATCH_WINDOW = config('FILE_EVENTS_BATCH_WINDOW', default=0.25, cast=float)
+FILE_EVENTS_BATCH_MAX = config('FILE_EVENTS_BATCH_MAX', default=500, cast=int)
+FILE_EVENTS_MAX_LAG = config('FILE_EVENTS_MAX_LAG', default=10.0, cast=float)
+
+# File change log (GET /api/files/changes/?since=<seq> and the WebSocket `resume` action)
+FILE_CHANGES_RETENTION_HOURS = config('FILE_CHANGES_RETENTION_HOURS', default=72, cast=int)
+FILE_CHANGES_MAX = config('FILE_CHANGES_MAX', default=1000, cast=int)
+
+# Cache
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/2",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        }
+    }
+}
+
+# Security
+if not DEBUG:
+    SECURE_HSTS_SECONDS = 31536000
+    SECURE_HSTS_INCLUDE_SUBDOMAINS = True
+    SECURE_HSTS_PRELOAD = True
+    SECURE_SSL_REDIRECT = True
+    CSRF_COOKIE_SECURE = not DEBUG
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https') if not DEBUG else None
+    CSRF_COOKIE_HTTPONLY = True
+    CSRF_COOKIE_SAMESITE = 'Lax'
+
+# File uploads
+FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
+
+# Resumable uploads
+UPLOAD_CHUNK_MAX_SIZE = config('UPLOAD_CHUNK_MAX_SIZE', default=67108864, cast=int)  # 64MB
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', default=24, cast=int)
+
+# Bulk file operations (delete, rename, ZIP download): files per request
+FILE_BULK_MAX_ITEMS = config('FILE_BULK_MAX_ITEMS', default=1000, cast=int)
+
+# File search: longest accepted query
+FILE_SEARCH_MAX_LENGTH = config('FILE_SEARCH_MAX_LENGTH', default=200, cast=int)
+
+# File expiry
+FILE_EXPIRY_BATCH_SIZE = config('FILE_EXPIRY_BATCH_SIZE', default=1000, cast=int)
+STORAGE_DELETE_WORKERS = config('STORAGE_DELETE_WORKERS', default=8, cast=int)
+
+# File processing (files.tasks.process_file). Stages run in this order over a
+# single read of the content; CPU-heavy ones use FILE_PROCESSING_WORKERS processes
+# per Celery worker.
+FILE_PROCESSING_STAGES = [
+    'files.processing.ChecksumStage',
+    'files.processing.MimeTypeStage',
+    'files.processing.ThumbnailStage',
+    'files.processing.CompressionStage',
+]
+FILE_PROCESSING_WORKERS = config('FILE_PROCESSING_WORKERS', default=2, cast=int)
+FILE_THUMBNAIL_SIZE = config('FILE_THUMBNAIL_SIZE', default=256, cast=int)
+FILE_THUMBNAIL_MAX_SOURCE_SIZE = config('FILE_THUMBNAIL_MAX_SOURCE_SIZE', default=104857600, cast=int)  # 100MB
+FILE_THUMBNAIL_TIMEOUT = config('FILE_THUMBNAIL_TIMEOUT', default=60, cast=int)
+
+# Compression at rest (zstd). Eligible content is compressed by process_file when a
+# sample of its first bytes shrinks by at least FILE_COMPRESSION_MIN_RATIO.
+FILE_COMPRESSION_ENABLED = config('FILE_COMPRESSION_ENABLED', default=False, cast=bool)
+FILE_COMPRESSION_LEVEL = config('FILE_COMPRESSION_LEVEL', default=3, cast=int)
+FILE_COMPRESSION_MIN_SIZE = config('FILE_COMPRESSION_MIN_SIZE', default=4096, cast=int)
+FILE_COMPRESSION_MIN_RATIO = config('FILE_COMPRESSION_MIN_RATIO', default=1.2, cast=float)
+FILE_COMPRESSION_SAMPLE_SIZE = config('FILE_COMPRESSION_SAMPLE_SIZE', default=1048576, cast=int)  # 1MB
+FILE_COMPRESSION_TYPES = [
+    'text/',
+    'application/json',
+    'application/xml',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/sql',
+    'application/octet-stream',
+    'image/svg+xml',
+    'image/bmp',
+]
+
+# Storage quotas
+# Default per-user quota in bytes; 0 means unlimited. StorageUsage.quota overrides it per user.
+STORAGE_QUOTA_DEFAULT = config('STORAGE_QUOTA_DEFAULT', default=0, cast=int)
+# Bytes of an upload's Content-Length not charged by the quota pre-check:
+# multipart boundaries, part headers and the name and comment fields
+FILE_UPLOAD_MULTIPART_OVERHEAD = config('FILE_UPLOAD_MULTIPART_OVERHEAD', default=16384, cast=int)
+STORAGE_USAGE_RECONCILE_BATCH_SIZE = config('STORAGE_USAGE_RECONCILE_BATCH_SIZE', default=1000, cast=int)
+
+# File delivery
+# 'django' streams file content from the worker; 'x-accel-redirect' (nginx) and
+# 'x-sendfile' (Apache/lighttpd) hand the transfer to the reverse proxy.
+FILE_DELIVERY_MODE = config('FILE_DELIVERY_MODE', default='django')
+FILE_DELIVERY_ACCEL_PREFIX = config('FILE_DELIVERY_ACCEL_PREFIX', default='/protected-media/')
+SHARED_FILE_CACHE_MAX_AGE = config('SHARED_FILE_CACHE_MAX_AGE', default=3600, cast=int)
+
+# Shared links: seconds a resolved link (and, shorter, an unknown token) stays in Redis
+SHARED_LINK_CACHE_TTL = config('SHARED_LINK_CACHE_TTL', default=3600, cast=int)
+SHARED_LINK_MISS_CACHE_TTL = config('SHARED_LINK_MISS_CACHE_TTL', default=60, cast=int)
+
+# Signed share URLs (files/s/<token>/<expires>/<signature>/), checkable at the edge.
+# FILE_SIGNING_KEY is shared with the edge and must not be SECRET_KEY; no signed
+# URLs are issued or accepted without one.
+# Expiries are rounded up to FILE_SIGNED_URL_BUCKET seconds so repeated signing yields one URL.
+FILE_SIGNING_KEY = config('FILE_SIGNING_KEY', default='')
+FILE_SIGNED_URL_TTL = config('FILE_SIGNED_URL_TTL', default=86400, cast=int)
+FILE_SIGNED_URL_MAX_TTL = config('FILE_SIGNED_URL_MAX_TTL', default=2592000, cast=int)
+FILE_SIGNED_URL_BUCKET = config('FILE_SIGNED_URL_BUCKET', default=3600, cast=int)
+# nginx map include of revoked links written by files.tasks.export_share_revocations
+FILE_SHARE_REVOCATIONS_PATH = config('FILE_SHARE_REVOCATIONS_PATH', default='')
+
+# Logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '{levelname} {asctime} {module} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'verbose',
+        },
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+            'propagate': True,
+        },
+        '': {
+            'handlers': ['console'],
+            'level': 'DEBUG' if DEBUG else 'INFO',
+        },
+    },
+}
+
+# Checking the configuration at startup
+if DEBUG:
+    print("\n✔ The configuration has been uploaded successfully:")
+    print(f"• The database: {DATABASES['default']['HOST']}:{DATABASES['default']['PORT']}")
+    print(f"• Redis: {REDIS_HOST}:{REDIS_PORT}")
     print(f"• Static: {STATIC_ROOT}\n")
\ No newline at end of file
@@ -1,6 +1,6 @@
-from django.apps import AppConfig
-
-
-class FilesConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'files'
+from django.apps import AppConfig
+
+
+class FilesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'files'
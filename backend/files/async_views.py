@@ -0,0 +1,80 @@
+"""
+Native async (ASGI) variants of the download and view actions of FileViewSet.
+They use async ORM lookups and stream file chunks from async generators, so a
+slow client holds a coroutine instead of a thread from the sync-to-async pool.
+"""
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import CachedJWTAuthentication
+from .counters import record_download
+from .delivery import aserve_file
+from .models import File
+
+logger = logging.getLogger(__name__)
+
+async def authenticate(request):
+    """
+    Returns (user, error response). API clients authenticate with a JWT in the
+    Authorization header, checked by CachedJWTAuthentication like on the other
+    endpoints; without the header the session user is taken.
+    """
+    if 'HTTP_AUTHORIZATION' not in request.META:
+        user = await request.auser()
+    else:
+        authenticator = CachedJWTAuthentication()
+        try:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except AuthenticationFailed as e:
+            # Same body and challenge as DRF's exception handler
+            error = JsonResponse(e.detail if isinstance(e.detail, dict) else {'detail': e.detail}, status=401)
+            error['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return None, error
+        user = result[0] if result else await request.auser()
+    if not user.is_authenticated:
+        return None, JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'}, status=403
+        )
+    return user, None
+
+async def download(request, pk):
+    """
+    Downloads the file as an attachment.
+    Only the owner may download; the download is buffered in Redis.
+    """
+    user, error = await authenticate(request)
+    if error is not None:
+        return error
+    try:
+        file = await File.objects.aget(pk=pk, user=user)
+    except File.DoesNotExist:
+        raise Http404("File not found")
+    try:
+        await asyncio.to_thread(record_download, file.id)
+        response = await aserve_file(request, file, as_attachment=True)
+        logger.info(f"Downloaded file ID {file.id} (async)")
+        return response
+    except Exception as e:
+        logger.error(f"File download error for ID {pk}: {str(e)}")
+        raise Http404("File not found")
+
+async def view(request, pk):
+    """
+    Displays the file inline in browser.
+    Only the owner or an admin may view it.
+    """
+    user, error = await authenticate(request)
+    if error is not None:
+        return error
+    files = File.objects.all() if user.is_staff else File.objects.filter(user=user)
+    try:
+        file = await files.aget(pk=pk)
+    except File.DoesNotExist:
+        raise Http404("File not found")
+    try:
+        return await aserve_file(request, file)
+    except Exception as e:
+        logger.error(f"File view error for ID {pk}: {str(e)}")
+        raise Http404("File not found")
@@ -0,0 +1,49 @@
+"""
+Compression of stored file content. zstandard is only imported when content
+is actually compressed or decompressed, so it is needed only with
+FILE_COMPRESSION_ENABLED or when compressed files exist.
+"""
+
+ZSTD = 'zstd'
+
+def accepts_encoding(request, encoding):
+    """
+    Returns True if the request's Accept-Encoding allows `encoding` (q > 0).
+    """
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        if coding.strip().lower() != encoding:
+            continue
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+def open_decompressed(fileobj, encoding):
+    """
+    Wraps a stored file object in a reader yielding the original bytes.
+    The reader only seeks forward, which is all range delivery needs since
+    ranges are sorted.
+    """
+    if encoding != ZSTD:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=True)
+
+def compressed_size(data, level):
+    """Size of `data` compressed in one shot, used to estimate the ratio from a sample."""
+    import zstandard
+    return len(zstandard.ZstdCompressor(level=level).compress(data))
+
+def compressing_writer(fileobj, level, size=None):
+    """
+    Returns a writer compressing everything written to it into `fileobj`.
+    With `size` the original length is recorded in the frame header.
+    """
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=level)
+    return compressor.stream_writer(fileobj, size=size if size is not None else -1, closefd=False)
@@ -1,110 +1,194 @@
-import json
-import logging
-from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from django.contrib.auth.models import AnonymousUser
-
-logger = logging.getLogger(__name__)
-
-class FileConsumer(AsyncWebsocketConsumer):
-    """
-    Handles real-time file updates through WebSocket connections.
-    Uses Django's session authentication via cookies.
-    Rejects unauthenticated connections and provides secure file update notifications.
-    """
-
-    async def connect(self):
-        """
-        Handles new WebSocket connection.
-        Performs strict authentication check before accepting connection.
-        Adds authenticated users to the file updates notification group.
-        
-        Rejects connection with code 4001 if:
-        - User is not authenticated
-        - Session cookie is invalid/missing
-        """
-        self.room_group_name = 'file_updates'
-        self.user = self.scope["user"]
-
-        # Strict authentication check
-        if not self.user.is_authenticated or isinstance(self.user, AnonymousUser):
-            logger.warning(f"Rejected unauthorized connection attempt from {self.scope['client'][0]}")
-            await self.close(code=4001)
-            return
-
-        # Add to notification group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        await self.accept()
-        logger.info(f"Accepted WebSocket connection for user: {self.user.username}")
-
-    async def disconnect(self, close_code):
-        """
-        Handles WebSocket disconnection.
-        Removes user from notification group and logs the event.
-        
-        Args:
-            close_code (int): WebSocket close code
-        """
-        if hasattr(self, 'room_group_name'):
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
-        logger.info(f"WebSocket disconnected for {self.user.username} with code: {close_code}")
-
-    async def receive(self, text_data):
-        """
-        Processes incoming WebSocket messages.
-        Validates JSON format and handles ping/pong heartbeat mechanism.
-        
-        Args:
-            text_data (str): JSON-encoded message data
-        """
-        try:
-            data = json.loads(text_data)
-            logger.debug(f"Received message from {self.user.username}: {data}")
-
-            if data.get('action') == 'ping':
-                await self.send(json.dumps({
-                    'action': 'pong',
-                    'user': self.user.username,
-                    'status': 'authenticated'
-                }))
-
-        except json.JSONDecodeError:
-            logger.warning(f"Invalid JSON received from {self.user.username}")
-            await self.send(json.dumps({
-                'error': 'Invalid JSON format',
-                'status': 'error'
-            }))
-
-    async def file_notification(self, event):
-        """
-        Broadcasts file updates to all connected clients.
-        Ensures proper formatting and error handling for notifications.
-        
-        Args:
-            event (dict): Contains:
-                - file_id (int): Updated file ID
-                - action (str): 'created', 'updated' or 'deleted'
-                - file_data (dict): File information (optional)
-                - user (str): Username who triggered the update (added)
-        """
-        try:
-            await self.send(text_data=json.dumps({
-                'type': 'file_update',
-                'file_id': event['file_id'],
-                'action': event['action'],
-                'data': event.get('file_data', {}),
-                'user': event.get('user', 'system'),
-                'timestamp': event.get('timestamp', '')
-            }))
-        except Exception as e:
-            logger.error(f"Failed to send update to {self.user.username}: {str(e)}")
-            await self.send(json.dumps({
-                'error': 'Internal server error',
-                'status': 'error'
-            }))
\ No newline at end of file
+import asyncio
+import json
+import logging
+import time
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.auth.models import AnonymousUser
+from .events import ADMIN_GROUP, user_group
+from .models import FileChange
+from .serializers import FileChangesSerializer
+
+logger = logging.getLogger(__name__)
+
+class FileConsumer(AsyncWebsocketConsumer):
+    """
+    Handles real-time file updates through WebSocket connections.
+    Uses Django's session authentication via cookies, or a JWT access token
+    passed by API clients (see users.authentication.JWTAuthMiddleware).
+    Rejects unauthenticated connections and provides secure file update notifications.
+    Events are batched for FILE_EVENTS_BATCH_WINDOW seconds; a client that falls
+    behind gets a single resync frame instead of the backlog.
+    """
+    resync_frame = json.dumps({'type': 'resync'})
+
+    async def connect(self):
+        """
+        Handles new WebSocket connection.
+        Performs strict authentication check before accepting connection.
+        Adds the socket to its user's notification group; staff sockets join
+        the admin group instead, which receives the events of all users.
+        
+        Rejects connection with code 4001 if:
+        - User is not authenticated
+        - Session cookie is invalid/missing
+        """
+        self.user = self.scope["user"]
+
+        # Strict authentication check
+        if not self.user.is_authenticated or isinstance(self.user, AnonymousUser):
+            logger.warning(f"Rejected unauthorized connection attempt from {self.scope['client'][0]}")
+            await self.close(code=4001)
+            return
+
+        self.pending_frames = []
+        self.flush_task = None
+        self.resynced_at = 0.0
+
+        # Add to notification group
+        self.room_group_name = ADMIN_GROUP if self.user.is_staff else user_group(self.user.pk)
+        await self.channel_layer.group_add(
+            self.room_group_name,
+            self.channel_name
+        )
+        await self.accept()
+        logger.info(f"Accepted WebSocket connection for user: {self.user.username}")
+
+    async def disconnect(self, close_code):
+        """
+        Handles WebSocket disconnection.
+        Removes user from notification group and logs the event.
+        
+        Args:
+            close_code (int): WebSocket close code
+        """
+        if getattr(self, 'flush_task', None):
+            self.flush_task.cancel()
+        if hasattr(self, 'room_group_name'):
+            await self.channel_layer.group_discard(
+                self.room_group_name,
+                self.channel_name
+            )
+        logger.info(f"WebSocket disconnected for {self.user.username} with code: {close_code}")
+
+    async def receive(self, text_data):
+        """
+        Processes incoming WebSocket messages.
+        Validates JSON format and handles ping/pong heartbeat mechanism.
+        `{"action": "resume", "since": <seq>}` replies with the changes the
+        client missed while disconnected (see resume()).
+        
+        Args:
+            text_data (str): JSON-encoded message data
+        """
+        try:
+            data = json.loads(text_data)
+            logger.debug(f"Received message from {self.user.username}: {data}")
+
+            if data.get('action') == 'ping':
+                await self.send(json.dumps({
+                    'action': 'pong',
+                    'user': self.user.username,
+                    'status': 'authenticated'
+                }))
+            elif data.get('action') == 'resume':
+                await self.resume(data.get('since'))
+
+        except json.JSONDecodeError:
+            logger.warning(f"Invalid JSON received from {self.user.username}")
+            await self.send(json.dumps({
+                'error': 'Invalid JSON format',
+                'status': 'error'
+            }))
+
+    async def resume(self, since):
+        """
+        Sends a `changes` frame with the user's changes after `since`, coalesced
+        per file, or a `resync` frame when the change log cannot answer (staff
+        sockets follow all users and always resync). Events delivered while the
+        query runs may repeat changes; clients skip frames with seq <= the last seen.
+        """
+        try:
+            since = int(since)
+        except (TypeError, ValueError):
+            await self.send(json.dumps({
+                'error': 'since must be an integer',
+                'status': 'error'
+            }))
+            return
+        if self.user.is_staff:
+            await self.send(text_data=self.resync_frame)
+            return
+        result = await database_sync_to_async(self.get_changes)(since)
+        if result.get('resync'):
+            await self.send(json.dumps({'type': 'resync', 'seq': result['seq']}))
+        else:
+            await self.send(json.dumps({'type': 'changes', **result}, cls=DjangoJSONEncoder))
+
+    def get_changes(self, since):
+        return FileChangesSerializer(FileChange.objects.since(self.user.pk, since)).data
+
+    async def file_notification(self, event):
+        """
+        Forwards file updates of this user's group (or of all users for admins).
+        Frames arrive pre-serialized, so nothing is encoded per consumer.
+        Events that waited in the channel layer longer than FILE_EVENTS_MAX_LAG
+        are replaced by a resync; later events already covered by it are dropped.
+        
+        Args:
+            event (dict): Contains:
+                - frames (list): JSON `file_update` frames of one transaction
+                - sent_at (float): Time the group message was sent
+        """
+        try:
+            sent_at = event.get('sent_at', 0.0)
+            if sent_at < self.resynced_at:
+                return
+            if time.time() - sent_at > settings.FILE_EVENTS_MAX_LAG:
+                logger.warning(f"Client of {self.user.username} is lagging, sending resync")
+                await self.resync()
+                return
+            self.pending_frames.extend(event['frames'])
+            if len(self.pending_frames) > settings.FILE_EVENTS_BATCH_MAX:
+                await self.resync()
+            elif settings.FILE_EVENTS_BATCH_WINDOW <= 0:
+                await self.flush_frames()
+            elif self.flush_task is None:
+                self.flush_task = asyncio.ensure_future(self.flush_later())
+        except Exception as e:
+            logger.error(f"Failed to send update to {self.user.username}: {str(e)}")
+            await self.send(json.dumps({
+                'error': 'Internal server error',
+                'status': 'error'
+            }))
+
+    async def flush_later(self):
+        """
+        Sends the frames collected during the batch window.
+        """
+        await asyncio.sleep(settings.FILE_EVENTS_BATCH_WINDOW)
+        self.flush_task = None
+        await self.flush_frames()
+
+    async def flush_frames(self):
+        """
+        Sends pending frames: a single event as is, several as one `file_updates` frame.
+        """
+        frames, self.pending_frames = self.pending_frames, []
+        if len(frames) == 1:
+            await self.send(text_data=frames[0])
+        elif frames:
+            await self.send(text_data=f'{{"type": "file_updates", "events": [{", ".join(frames)}]}}')
+
+    async def resync(self):
+        """
+        Drops pending frames and tells the client to reload its file list.
+        """
+        self.pending_frames = []
+        self.resynced_at = time.time()
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.send(text_data=self.resync_frame)
\ No newline at end of file
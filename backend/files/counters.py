@@ -0,0 +1,129 @@
+import logging
+import uuid
+from django.db import connection, transaction
+from django.utils.timezone import now
+from django_redis import get_redis_connection
+from redis.exceptions import LockNotOwnedError, ResponseError
+from .models import File
+
+logger = logging.getLogger(__name__)
+
+DOWNLOADS_KEY = 'files:downloads'
+FLUSHING_KEY_PREFIX = 'files:downloads:flushing:'
+FLUSH_BATCH_SIZE = 1000
+FLUSH_LOCK_KEY = 'files:downloads:flush-lock'
+FLUSH_LOCK_TIMEOUT = 600
+
+def record_download(file_id, when=None):
+    """
+    Buffers a download in Redis instead of updating the File row.
+    The hash holds '<id>:count' counters and '<id>:last' timestamps and is
+    written to the database by flush_download_counters.
+    """
+    record_downloads([file_id], when)
+
+def record_downloads(file_ids, when=None):
+    """
+    Buffers one download of each of the given files in a single round trip.
+    """
+    when = when or now()
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    for file_id in file_ids:
+        pipe.hincrby(DOWNLOADS_KEY, f"{file_id}:count", 1)
+        pipe.hset(DOWNLOADS_KEY, f"{file_id}:last", when.timestamp())
+    pipe.execute()
+
+def flush_download_counters():
+    """
+    Moves the buffered counters to the database in bulk UPDATE ... FROM (VALUES ...)
+    statements. The buffer is claimed by renaming it, so downloads recorded during
+    the flush go to a fresh hash; a claimed buffer that a failed flush left
+    behind is picked up by the next one.
+    Flushes hold a Redis lock, so overlapping runs never apply the same buffer
+    twice; a run that finds the lock taken skips. A claimed buffer is deleted
+    inside the transaction applying it, and counted again if the commit fails.
+    Returns the number of files updated.
+    """
+    redis = get_redis_connection('default')
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        logger.info("Download counters already being flushed, skipping")
+        return 0
+    try:
+        claimed = f"{FLUSHING_KEY_PREFIX}{uuid.uuid4().hex}"
+        try:
+            redis.rename(DOWNLOADS_KEY, claimed)
+        except ResponseError:
+            # Nothing buffered since the last flush
+            pass
+
+        updated = 0
+        for key in redis.scan_iter(match=f"{FLUSHING_KEY_PREFIX}*"):
+            updated += _flush_buffer(redis, key)
+        logger.info(f"Flushed download counters for {updated} files")
+        return updated
+    finally:
+        try:
+            lock.release()
+        except LockNotOwnedError:
+            logger.warning("Download counter flush outlived its lock")
+
+def _flush_buffer(redis, key):
+    """
+    Applies one claimed buffer and deletes it in the same transaction.
+    Returns the number of files updated.
+    """
+    rows = {}
+    for field, value in redis.hgetall(key).items():
+        file_id, kind = field.decode().split(':')
+        downloads, last = rows.get(int(file_id), (0, None))
+        if kind == 'count':
+            downloads = int(value)
+        else:
+            last = float(value)
+        rows[int(file_id)] = (downloads, last)
+
+    items = list(rows.items())
+    updated = 0
+    deleted = False
+    try:
+        with transaction.atomic():
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                updated += _update_batch(items[start:start + FLUSH_BATCH_SIZE])
+            redis.delete(key)
+            deleted = True
+    except Exception:
+        if deleted:
+            # The commit failed after the buffer was dropped: count it again
+            _rebuffer(redis, items)
+        raise
+    return updated
+
+def _rebuffer(redis, items):
+    """Adds the counters of a buffer that was not applied back to the live buffer."""
+    pipe = redis.pipeline(transaction=False)
+    for file_id, (downloads, last) in items:
+        pipe.hincrby(DOWNLOADS_KEY, f"{file_id}:count", downloads)
+        if last is not None:
+            pipe.hsetnx(DOWNLOADS_KEY, f"{file_id}:last", last)
+    pipe.execute()
+
+def _update_batch(items):
+    """
+    Applies one batch of (file_id, (downloads, last_timestamp)) in a single UPDATE.
+    """
+    table = connection.ops.quote_name(File._meta.db_table)
+    values = ", ".join(["(%s::bigint, %s::bigint, to_timestamp(%s::double precision))"] * len(items))
+    params = []
+    for file_id, (downloads, last) in items:
+        params.extend([file_id, downloads, last])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS f "
+            f"SET download_count = f.download_count + v.downloads, "
+            f"last_downloaded = GREATEST(f.last_downloaded, v.last_downloaded) "
+            f"FROM (VALUES {values}) AS v(id, downloads, last_downloaded) "
+            f"WHERE f.id = v.id",
+            params,
+        )
+        return cursor.rowcount
@@ -0,0 +1,419 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import uuid
+import zipfile
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe, quote_etag
+from django.utils.timezone import localtime
+from .compression import accepts_encoding, open_decompressed
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 2 ** 10
+MAX_RANGES = 16
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+def served_content_type(mime_type):
+    """
+    Content-Type a file is served with. Types a browser would render or run
+    as active content on the app's origin (HTML, SVG and other XML, JavaScript)
+    are sent as text/plain, so uploads show as source instead.
+    """
+    if (
+        mime_type == 'text/html'
+        or mime_type.endswith(('/xml', '+xml'))
+        or 'javascript' in mime_type
+        or 'ecmascript' in mime_type
+    ):
+        return 'text/plain'
+    return mime_type
+
+class FileMetadata:
+    """
+    Size, modification time and strong ETag of the stored content of a File.
+    Content-addressed blobs use their digest as the ETag, anything else a hash
+    of storage name, size and modification time.
+    For compressed content `size` is the original size and the encoded
+    representation gets its own ETag. `local` is False for content on the
+    cold tier of a TieredStorage, which the reverse proxy cannot read.
+    The Content-Type is the MIME type sniffed by process_file, or guessed
+    from the name until the file is processed, made safe by served_content_type.
+    """
+
+    def __init__(self, file):
+        storage = file.file.storage
+        self.name = file.file.name
+        self.encoding = file.content_encoding
+        if hasattr(storage, 'stat'):
+            self.stored_size, self.modified, self.local = storage.stat(self.name)
+        else:
+            self.stored_size = storage.size(self.name)
+            self.modified = storage.get_modified_time(self.name)
+            self.local = True
+        self.size = file.size if self.encoding else self.stored_size
+        self.timestamp = int(self.modified.timestamp())
+        if hasattr(storage, 'is_blob') and storage.is_blob(self.name):
+            tag = self.name.rsplit('/', 1)[-1]
+        else:
+            fingerprint = f"{self.name}:{self.stored_size}:{self.modified.timestamp()}"
+            tag = hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+        self.etag = quote_etag(tag)
+        self.encoded_etag = quote_etag(f"{tag}-{self.encoding}") if self.encoding else None
+        self.content_type = served_content_type(
+            file.mime_type or mimetypes.guess_type(file.name)[0] or 'application/octet-stream'
+        )
+
+def parse_range_header(header, size):
+    """
+    Parses a `Range: bytes=...` header into a list of inclusive (start, end) pairs.
+    Returns None when the header should be ignored (missing, malformed or too many
+    ranges) and an empty list when no range is satisfiable.
+    Overlapping and adjacent ranges are coalesced.
+    """
+    if not header or not header.startswith('bytes=') or size == 0:
+        return None
+    specs = header[len('bytes='):].split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':
+            suffix = int(last)
+            if suffix == 0:
+                continue
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+            if start >= size:
+                continue
+        ranges.append((start, end))
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def if_range_matches(request, metadata):
+    """
+    Checks `If-Range`: a range is only honoured if the validator still matches.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return parse_etags(if_range) == [metadata.etag]
+    return parse_http_date_safe(if_range) == metadata.timestamp
+
+def open_stored(file):
+    """Opens the stored content of a File for reading, as stored."""
+    return file.file.storage.open(file.file.name, 'rb')
+
+def open_content(file):
+    """Opens the content of a File for reading, decompressing it if it is stored compressed."""
+    fileobj = open_stored(file)
+    if file.content_encoding:
+        return open_decompressed(fileobj, file.content_encoding)
+    return fileobj
+
+def iter_range(file, start, length, raw=False):
+    """
+    Yields `length` bytes of the content starting at `start`.
+    With `raw` the bytes are read as stored, without decompressing.
+    """
+    with (open_stored if raw else open_content)(file) as fileobj:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def iter_multipart(file, ranges, parts, boundary):
+    """
+    Yields a multipart/byteranges body, opening the stored content once.
+    """
+    with open_content(file) as fileobj:
+        for (start, end), part_header in zip(ranges, parts):
+            yield part_header
+            fileobj.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+async def aiter_range(file, start, length, raw=False):
+    """
+    Async variant of iter_range. Blocking reads run in the default executor one
+    chunk at a time, so the event loop is never blocked and no thread is held
+    while the client is slow to consume.
+    """
+    fileobj = await asyncio.to_thread(open_stored if raw else open_content, file)
+    try:
+        await asyncio.to_thread(fileobj.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(fileobj.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+async def aiter_multipart(file, ranges, parts, boundary):
+    """
+    Async variant of iter_multipart.
+    """
+    for (start, end), part_header in zip(ranges, parts):
+        yield part_header
+        async for chunk in aiter_range(file, start, end - start + 1):
+            yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+class SyncBody:
+    """Response bodies read with blocking I/O, for WSGI and sync views."""
+    range = staticmethod(iter_range)
+    multipart = staticmethod(iter_multipart)
+
+    @staticmethod
+    def full(file, metadata):
+        if metadata.encoding:
+            response = StreamingHttpResponse(
+                iter_range(file, 0, metadata.size), content_type=metadata.content_type
+            )
+            response['Content-Length'] = str(metadata.size)
+            return response
+        return FileResponse(open_content(file), content_type=metadata.content_type)
+
+    @staticmethod
+    def encoded(file, metadata):
+        return FileResponse(open_stored(file), content_type=metadata.content_type)
+
+class AsyncBody:
+    """Response bodies streamed by async generators, for native ASGI views."""
+    range = staticmethod(aiter_range)
+    multipart = staticmethod(aiter_multipart)
+
+    @staticmethod
+    def full(file, metadata):
+        response = StreamingHttpResponse(
+            aiter_range(file, 0, metadata.size), content_type=metadata.content_type
+        )
+        response['Content-Length'] = str(metadata.size)
+        return response
+
+    @staticmethod
+    def encoded(file, metadata):
+        response = StreamingHttpResponse(
+            aiter_range(file, 0, metadata.stored_size, raw=True), content_type=metadata.content_type
+        )
+        response['Content-Length'] = str(metadata.stored_size)
+        return response
+
+def build_ranged_response(file, metadata, ranges, body=SyncBody):
+    """
+    Builds a 206 response for one range or a multipart/byteranges response for several.
+    """
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            body.range(file, start, end - start + 1),
+            status=206,
+            content_type=metadata.content_type,
+        )
+        response['Content-Range'] = f"bytes {start}-{end}/{metadata.size}"
+        response['Content-Length'] = str(end - start + 1)
+        return response
+
+    boundary = uuid.uuid4().hex
+    parts = [
+        (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {metadata.content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{metadata.size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    length = sum(len(part) for part in parts)
+    length += sum(end - start + 1 for start, end in ranges)
+    length += len(f"\r\n--{boundary}--\r\n")
+    response = StreamingHttpResponse(
+        body.multipart(file, ranges, parts, boundary),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+    )
+    response['Content-Length'] = str(length)
+    return response
+
+def build_offloaded_response(file, metadata):
+    """
+    Hands the transfer over to the reverse proxy according to FILE_DELIVERY_MODE.
+    nginx (X-Accel-Redirect) and mod_xsendfile (X-Sendfile) serve Range requests
+    themselves, so Django only sends headers and an empty body.
+    """
+    response = HttpResponse(content_type=metadata.content_type)
+    if settings.FILE_DELIVERY_MODE == 'x-accel-redirect':
+        prefix = settings.FILE_DELIVERY_ACCEL_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f"{prefix}/{quote(metadata.name)}"
+    else:
+        response['X-Sendfile'] = file.file.path
+    return response
+
+def build_response(request, file, metadata, as_attachment, cache_control, body):
+    """
+    Picks the response for a request once the content metadata is known.
+    Shared by the sync and async delivery paths, which differ only in `body`.
+    Compressed content is sent as stored to clients accepting its encoding
+    (unless a range is requested) and decompressed on the fly for anyone else;
+    it is never offloaded, since the proxy would drop Content-Encoding, and
+    neither is content streamed from a cold storage tier.
+    """
+    encoded = (
+        metadata.encoding is not None
+        and 'Range' not in request.headers
+        and accepts_encoding(request, metadata.encoding)
+    )
+    etag = metadata.encoded_etag if encoded else metadata.etag
+    response = get_conditional_response(
+        request, etag=etag, last_modified=metadata.timestamp
+    )
+    if response is None and encoded:
+        response = body.encoded(file, metadata)
+        response['Content-Encoding'] = metadata.encoding
+    elif response is None and settings.FILE_DELIVERY_MODE != 'django' and not metadata.encoding and metadata.local:
+        response = build_offloaded_response(file, metadata)
+    elif response is None:
+        ranges = None
+        if request.method in ('GET', 'HEAD') and if_range_matches(request, metadata):
+            ranges = parse_range_header(request.headers.get('Range'), metadata.size)
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{metadata.size}"
+        elif ranges and ranges != [(0, metadata.size - 1)]:
+            response = build_ranged_response(file, metadata, ranges, body)
+        else:
+            response = body.full(file, metadata)
+
+    if response.status_code in (200, 206):
+        response['Content-Disposition'] = content_disposition_header(as_attachment, file.name)
+    if metadata.encoding:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(metadata.timestamp)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+def serve_file(request, file, as_attachment=False, cache_control='private, no-cache'):
+    """
+    Serves the stored content of a File with conditional GET and Range support.
+    Answers 304/412 from ETag and Last-Modified validators, 206 for satisfiable
+    single or multiple ranges, 416 for unsatisfiable ones and 200 otherwise.
+    Unless FILE_DELIVERY_MODE is 'django' the bytes are sent by the reverse proxy.
+    """
+    metadata = FileMetadata(file)
+    return build_response(request, file, metadata, as_attachment, cache_control, SyncBody)
+
+async def aserve_file(request, file, as_attachment=False, cache_control='private, no-cache'):
+    """
+    Async variant of serve_file for native ASGI views.
+    """
+    metadata = await asyncio.to_thread(FileMetadata, file)
+    return build_response(request, file, metadata, as_attachment, cache_control, AsyncBody)
+
+class ZipBuffer:
+    """
+    Write-only file object that holds what ZipFile writes until it is drained.
+    Having no tell() or seek(), it makes ZipFile stream entries with data descriptors.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def archive_name(name, used):
+    """
+    Returns a flat, unique entry name for a file in a ZIP archive.
+    """
+    name = name.replace('/', '_').replace('\\', '_').lstrip('.') or 'file'
+    base, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{base} ({n}){ext}"
+    used.add(candidate)
+    return candidate
+
+def iter_zip(files):
+    """
+    Yields a ZIP archive of the given files while it is being built.
+    Entries are stored uncompressed in ZIP64 format and written one chunk at a
+    time, so memory use does not depend on the size or number of the files
+    beyond the central directory. Files whose content is missing are skipped.
+    """
+    buffer = ZipBuffer()
+    used = set()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for file in files:
+            try:
+                content = open_content(file)
+            except OSError as e:
+                logger.error(f"Skipping file ID {file.id} in archive: {str(e)}")
+                continue
+            info = zipfile.ZipInfo(
+                archive_name(file.name, used), date_time=localtime(file.uploaded_at).timetuple()[:6]
+            )
+            with content, archive.open(info, mode='w', force_zip64=True) as entry:
+                for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+                    entry.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
+def serve_zip(files, filename):
+    """
+    Streams a ZIP archive of the given files as an attachment.
+    """
+    response = StreamingHttpResponse(
+        (chunk for chunk in iter_zip(files) if chunk), content_type='application/zip'
+    )
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-store'
+    return response
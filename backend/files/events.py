@@ -0,0 +1,150 @@
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import Counter
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+ADMIN_GROUP = 'files.admin'
+
+_local = threading.local()
+
+def user_group(user_id):
+    """Channel layer group of all WebSocket sessions of one user."""
+    return f"files.user.{user_id}"
+
+class PendingEvents(dict):
+    """
+    File change events of one transaction or savepoint, keyed by file id.
+    Called as the on_commit hook that sends them.
+    """
+    sent = False
+
+    def add(self, event):
+        """
+        Coalesces a new event with an earlier one for the same file: a file
+        created and deleted in the same savepoint is never announced, and
+        repeated updates collapse into the last one.
+        """
+        previous = self.get(event['file_id'])
+        if previous is not None and previous['action'] == 'created':
+            if event['action'] == 'deleted':
+                del self[event['file_id']]
+                return
+            event = {**event, 'action': 'created'}
+        self[event['file_id']] = event
+
+    def __call__(self):
+        """
+        Sends one message per owner group and one to the admin group.
+        Every event is serialized to its WebSocket frame here, once, so the
+        consumers of a group only forward the text.
+        """
+        self.sent = True
+        if not self:
+            return
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        frames = {}
+        by_user = {}
+        for file_id, event in self.items():
+            frames[file_id] = json.dumps({
+                'type': 'file_update',
+                'seq': event['seq'],
+                'file_id': file_id,
+                'action': event['action'],
+                'data': event['file_data'],
+                'user': event['user'],
+                'timestamp': event['timestamp'],
+            }, cls=DjangoJSONEncoder)
+            by_user.setdefault(event['user_id'], []).append(frames[file_id])
+        sent_at = time.time()
+        try:
+            for user_id, user_frames in by_user.items():
+                async_to_sync(channel_layer.group_send)(
+                    user_group(user_id),
+                    {'type': 'file.notification', 'frames': user_frames, 'sent_at': sent_at}
+                )
+            async_to_sync(channel_layer.group_send)(
+                ADMIN_GROUP,
+                {'type': 'file.notification', 'frames': list(frames.values()), 'sent_at': sent_at}
+            )
+        except Exception as e:
+            logger.error(f"Error sending file notifications: {str(e)}")
+
+def _pending_events():
+    """
+    Returns the event buffer of the current savepoint, registering it as an
+    on_commit hook on first use. Rolling back a savepoint discards the hooks
+    registered within it, so each savepoint gets a buffer of its own and a
+    rollback drops exactly its events.
+    Buffers are held weakly, keyed on connection.savepoint_ids: the hook is
+    their only strong reference, so a buffer whose hook was discarded goes
+    away with it, and one already sent is replaced.
+    """
+    buffers = getattr(_local, 'pending', None)
+    if buffers is None:
+        buffers = _local.pending = weakref.WeakValueDictionary()
+    key = tuple(connection.savepoint_ids)
+    pending = buffers.get(key)
+    if pending is None or pending.sent:
+        pending = buffers[key] = PendingEvents()
+        transaction.on_commit(pending)
+    return pending
+
+def notify_file_changes(changes, actor=None):
+    """
+    Records (user_id, file_id, action, data) changes in the FileChange log under
+    per-user sequence numbers and queues notifications for the owners' sessions
+    and for admins. Sent once the transaction commits, and not at all if the
+    savepoint they were recorded in rolls back.
+    Sequence numbers and log rows are written with one statement each.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+    ChangeSequence = apps.get_model('files', 'ChangeSequence')
+    FileChange = apps.get_model('files', 'FileChange')
+    timestamp = now()
+    events = []
+    with transaction.atomic():
+        next_seq = ChangeSequence.allocate(Counter(change[0] for change in changes))
+        log = []
+        for user_id, file_id, action, data in changes:
+            seq = next_seq[user_id]
+            next_seq[user_id] += 1
+            log.append(FileChange(
+                user_id=user_id, seq=seq, file_id=file_id, action=action, created_at=timestamp
+            ))
+            events.append({
+                'user_id': user_id,
+                'file_id': file_id,
+                'seq': seq,
+                'action': action,
+                'file_data': data or {},
+                'user': actor or 'system',
+                'timestamp': timestamp.isoformat(),
+            })
+        FileChange.objects.bulk_create(log, batch_size=1000)
+    # Queued in the caller's savepoint, not in the one of the block above;
+    # in autocommit mode the changes are committed already
+    pending = _pending_events() if connection.in_atomic_block else PendingEvents()
+    for event in events:
+        pending.add(event)
+    if not connection.in_atomic_block:
+        pending()
+
+def notify_file_change(user_id, file_id, action, data=None, actor=None):
+    """
+    Records and announces a created, updated or deleted file.
+    """
+    notify_file_changes([(user_id, file_id, action, data)], actor)
@@ -0,0 +1,119 @@
+import asyncio
+import statistics
+import time
+from importlib import import_module
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from files.models import File
+
+
+class Command(BaseCommand):
+    """
+    Compares the sync FileResponse download path with the native async one.
+    Runs against a live ASGI server (e.g. daphne) with raw HTTP connections,
+    so slow clients can be simulated with --read-delay.
+    """
+    help = "Benchmark the sync and async file download endpoints under concurrent load"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_id', type=int, help='ID of the file to download')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--read-delay', type=float, default=0.0,
+            help='Seconds to sleep between socket reads to simulate slow clients'
+        )
+        parser.add_argument(
+            '--paths', nargs='+', choices=['sync', 'async'], default=['sync', 'async']
+        )
+
+    def handle(self, *args, **options):
+        try:
+            file = File.objects.select_related('user').get(pk=options['file_id'])
+        except File.DoesNotExist:
+            raise CommandError(f"File {options['file_id']} does not exist")
+
+        session = self.create_session(file.user)
+        paths = {
+            'sync': f"/api/files/{file.id}/download/",
+            'async': f"/api/files/async/{file.id}/download/",
+        }
+        try:
+            for label in options['paths']:
+                started = time.perf_counter()
+                results = asyncio.run(self.run(paths[label], session.session_key, options))
+                self.report(label, results, time.perf_counter() - started)
+        finally:
+            session.delete()
+
+    def create_session(self, user):
+        """
+        Creates a login session for the file owner so requests pass authentication.
+        """
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    async def run(self, path, session_key, options):
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def bounded():
+            async with semaphore:
+                return await self.fetch(path, session_key, options)
+
+        return await asyncio.gather(*(bounded() for _ in range(options['requests'])))
+
+    async def fetch(self, path, session_key, options):
+        """
+        Performs one GET and reads the body to the end.
+        Returns (status, seconds, bytes received).
+        """
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(options['host'], options['port'])
+        except OSError:
+            return 0, time.perf_counter() - started, 0
+        writer.write((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {options['host']}\r\n"
+            f"Cookie: {settings.SESSION_COOKIE_NAME}={session_key}\r\n"
+            f"X-Forwarded-Proto: https\r\n"
+            f"Connection: close\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        received = 0
+        while True:
+            chunk = await reader.read(64 * 2 ** 10)
+            if not chunk:
+                break
+            received += len(chunk)
+            if options['read_delay']:
+                await asyncio.sleep(options['read_delay'])
+        writer.close()
+        parts = status_line.split()
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+        return status, time.perf_counter() - started, received
+
+    def report(self, label, results, elapsed):
+        ok = [r for r in results if r[0] == 200]
+        latencies = sorted(r[1] for r in ok) or [0.0]
+        received = sum(r[2] for r in ok)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{label} download path"))
+        self.stdout.write(f"  requests: {len(ok)}/{len(results)} ok")
+        self.stdout.write(f"  throughput: {len(ok) / elapsed:.1f} req/s, {received / elapsed / 2 ** 20:.1f} MiB/s")
+        self.stdout.write(
+            f"  latency ms: p50 {statistics.median(latencies) * 1000:.1f}, "
+            f"p95 {percentile(0.95):.1f}, p99 {percentile(0.99):.1f}"
+        )
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand, CommandError
+from files.events import user_group
+
+
+class Command(BaseCommand):
+    """
+    Measures the cost of delivering one file event through the channel layer.
+    Registers synthetic channels spread over many users, then compares sending
+    to one user's group with sending to a single group holding every connection
+    (the former global `file_updates` group).
+    """
+    help = "Benchmark per-user WebSocket fan-out against a global broadcast group"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=100)
+
+    def handle(self, *args, **options):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            raise CommandError("No channel layer is configured")
+        asyncio.run(self.run(channel_layer, options))
+
+    async def run(self, channel_layer, options):
+        prefix = f"benchmark.{int(time.time())}"
+        global_group = f"{prefix}.global"
+        memberships = []
+        for i in range(options['connections']):
+            channel = await channel_layer.new_channel()
+            group = f"{prefix}.{user_group(i % options['users'])}"
+            memberships.append((group, channel))
+            await channel_layer.group_add(group, channel)
+            await channel_layer.group_add(global_group, channel)
+        try:
+            sessions = len([m for m in memberships if m[0] == memberships[0][0]])
+            message = {
+                'type': 'file.notification',
+                'frames': ['{"type": "file_update", "file_id": 0, "action": "updated"}'],
+                'sent_at': time.time(),
+            }
+            for label, group in (('per-user', memberships[0][0]), ('global', global_group)):
+                started = time.perf_counter()
+                for _ in range(options['events']):
+                    await channel_layer.group_send(group, message)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label:<9} {options['events']} events, "
+                    f"{elapsed / options['events'] * 1000:.2f}ms per event"
+                )
+            self.stdout.write(
+                f"{options['connections']} connections, {sessions} sessions in the target user's group"
+            )
+        finally:
+            for group, channel in memberships:
+                await channel_layer.group_discard(group, channel)
+                await channel_layer.group_discard(global_group, channel)
@@ -1,24 +1,24 @@
-# Generated by Django 5.1.3 on 2024-11-26 19:43
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='File',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('name', models.CharField(max_length=255)),
-                ('file', models.FileField(upload_to='uploads/')),
-                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
-                ('shared_link', models.CharField(blank=True, max_length=255, null=True, unique=True)),
-            ],
-        ),
-    ]
+# Generated by Django 5.1.3 on 2024-11-26 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='File',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('file', models.FileField(upload_to='uploads/')),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('shared_link', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+            ],
+        ),
+    ]
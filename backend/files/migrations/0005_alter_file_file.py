@@ -1,19 +1,19 @@
-# Generated by Django 5.1.3 on 2024-12-08 10:00
-
-import files.models
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('files', '0004_alter_file_shared_link'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='file',
-            name='file',
-            field=models.FileField(upload_to=files.models.user_directory_path),
-        ),
-    ]
+# Generated by Django 5.1.3 on 2024-12-08 10:00
+
+import files.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0004_alter_file_shared_link'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(upload_to=files.models.user_directory_path),
+        ),
+    ]
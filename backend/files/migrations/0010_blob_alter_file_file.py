@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:04
+
+import files.models
+import files.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0009_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(storage=files.storage.get_file_storage, upload_to=files.models.user_directory_path),
+        ),
+    ]
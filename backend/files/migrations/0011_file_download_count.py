@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0010_blob_alter_file_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='download_count',
+            field=models.PositiveBigIntegerField(default=0, help_text='Number of downloads, flushed periodically from the Redis buffer'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:15
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('files', '0011_file_download_count'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(fields=['auto_deleted_at', 'id'], name='files_file_expiry_idx'),
+        ),
+    ]
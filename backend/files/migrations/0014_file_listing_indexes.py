@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:48
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('files', '0013_storagetombstone'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='files_file_user_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='files_file_recent_idx'),
+        ),
+    ]
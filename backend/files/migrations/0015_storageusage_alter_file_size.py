@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0014_file_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('bytes', models.PositiveBigIntegerField(default=0)),
+                ('files', models.PositiveBigIntegerField(default=0)),
+                ('quota', models.PositiveBigIntegerField(blank=True, help_text='Quota in bytes; empty uses STORAGE_QUOTA_DEFAULT', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO files_storageusage (user_id, bytes, files, updated_at)
+                SELECT user_id, COALESCE(SUM(size), 0), COUNT(*), NOW()
+                FROM files_file
+                GROUP BY user_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
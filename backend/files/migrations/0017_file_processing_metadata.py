@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:35
+
+import files.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0016_changesequence_filechange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='mime_type',
+            field=models.CharField(blank=True, help_text='MIME type sniffed from the content, set by process_file', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 of the content, set by process_file', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='thumbnail',
+            field=models.FileField(blank=True, max_length=255, null=True, upload_to=files.models.thumbnail_path),
+        ),
+    ]
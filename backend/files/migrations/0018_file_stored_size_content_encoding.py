@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0017_file_processing_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='content_encoding',
+            field=models.CharField(blank=True, help_text='Encoding of the stored content (e.g. zstd), empty if stored as uploaded', max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='stored_size',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Bytes held in storage; smaller than size when the content is compressed', null=True),
+        ),
+    ]
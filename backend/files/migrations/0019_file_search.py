@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, BtreeGinExtension, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('files', '0018_file_stored_size_content_encoding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='file',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('name', 'comment', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'search_vector'], name='files_file_search_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'name'], name='files_file_name_trgm_idx', opclasses=['int8_ops', 'gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:05
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('files', '0019_file_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(fields=['user', 'auto_deleted_at', 'id'], name='files_file_user_expiry_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(condition=models.Q(('last_downloaded__isnull', False)), fields=['user', '-last_downloaded', '-id'], name='files_file_user_downloaded_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(fields=['file'], name='files_file_file_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='DROP INDEX CONCURRENTLY IF EXISTS "files_file_user_id_cb7a70eb"',
+                    reverse_sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS "files_file_user_id_cb7a70eb" ON "files_file" ("user_id")',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='file',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='files', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0020_file_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='shared_link_downloads',
+            field=models.PositiveIntegerField(default=0, help_text='Downloads through the current shared link, counted when it has a limit'),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='shared_link_expires_at',
+            field=models.DateTimeField(blank=True, help_text='The shared link stops working after this time', null=True),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='shared_link_max_downloads',
+            field=models.PositiveIntegerField(blank=True, help_text='Downloads allowed through the shared link, unlimited if empty', null=True),
+        ),
+        migrations.AlterField(
+            model_name='file',
+            name='shared_link',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:07
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('files', '0021_file_shared_link_limits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='storage_tier',
+            field=models.CharField(choices=[('hot', 'Hot'), ('cold', 'Cold')], default='hot', help_text='Storage tier holding the content, moved by apply_storage_tiering', max_length=4),
+        ),
+        migrations.AddField(
+            model_name='file',
+            name='tier_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('last_downloaded', 'uploaded_at'), models.F('id'), condition=models.Q(('storage_tier', 'hot')), name='files_file_tier_demote_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(condition=models.Q(('last_downloaded__gt', models.F('tier_changed_at')), ('storage_tier', 'cold')), fields=['id'], name='files_file_tier_recall_idx'),
+        ),
+    ]
@@ -1,94 +1,759 @@
-from django.db import models
-from django.conf import settings
-import uuid
-import os
-from django.db.models.signals import post_delete, pre_delete
-from django.dispatch import receiver
-from datetime import timedelta
-from django.utils.timezone import now
-
-def user_directory_path(instance, filename):
-    """
-    Generates a file upload path that includes the user name.
-    Example: uploads/<username>/<filename>
-    """
-    return f"uploads/{instance.user.username}/{filename}"
-
-def default_auto_deleted_at():
-    """
-    Returns the date and time for automatic file deletion.
-    For example, after 30 days
-    """
-    return now() + timedelta(days=30)
-
-class File(models.Model):
-    """
-    Model representing uploaded files with metadata.
-    Includes tracking for last download time.
-    """
-    user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="files"
-    )
-    name = models.CharField(max_length=255)
-    file = models.FileField(upload_to=user_directory_path)
-    size = models.PositiveIntegerField(null=True, blank=True)
-    uploaded_at = models.DateTimeField(auto_now_add=True)
-    auto_deleted_at = models.DateTimeField(default=default_auto_deleted_at)
-    shared_link = models.CharField(max_length=36, blank=True, null=True, unique=True)
-    comment = models.TextField(null=True, blank=True)
-    last_downloaded = models.DateTimeField(
-        null=True, 
-        blank=True, 
-        verbose_name="Last Downloaded",
-        help_text="Date and time when the file was last downloaded"
-    )
-
-    def save(self, *args, **kwargs):
-        """
-        Redefining the save method to set the file size and unique shared_link.
-        Automatically calculates size if not set and generates shared_link if missing.
-        """
-        if self.file and not self.size:
-            try:
-                self.size = self.file.size
-            except AttributeError:
-                self.size = 0
-        if not self.shared_link:
-            self.shared_link = str(uuid.uuid4())
-        super().save(*args, **kwargs)
-
-    def get_shared_url(self):
-        """
-        Generates a relative URL for downloading a file by `shared_link`.
-        Used for creating shareable download links.
-        """
-        from django.urls import reverse
-        return reverse('file-download', kwargs={'shared_link': self.shared_link})
-
-    def __str__(self):
-        """String representation of the file for admin interface and debugging."""
-        return f"{self.name} ({self.user.username})"
-
-@receiver(post_delete, sender=File)
-def delete_file_on_model_delete(sender, instance, **kwargs):
-    """
-    Signal receiver to delete physical file from storage when model instance is deleted.
-    Prevents orphaned files in storage when database records are removed.
-    """
-    if instance.file and os.path.isfile(instance.file.path):
-        os.remove(instance.file.path)
-
-@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
-def delete_user_directory(sender, instance, **kwargs):
-    """
-    Signal receiver to delete user's upload directory when user is deleted.
-    Recursively removes all files and subdirectories in the user's upload folder.
-    """
-    user_folder = os.path.join(settings.MEDIA_ROOT, "uploads", instance.username)
-    if os.path.isdir(user_folder):
-        for root, dirs, files in os.walk(user_folder, topdown=False):
-            for file in files:
-                os.remove(os.path.join(root, file))
-            for dir in dirs:
-                os.rmdir(os.path.join(root, dir))
-        os.rmdir(user_folder)
\ No newline at end of file
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramSimilarity
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.db.models.functions import Cast, Coalesce
+from django.conf import settings
+from django.core.files.base import File as BaseFile
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+import uuid
+import os
+import re
+import time
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from datetime import timedelta
+from django.utils.timezone import now
+from django.contrib.auth import get_user_model
+from django_redis import get_redis_connection
+import logging
+from .events import notify_file_changes
+from .storage import delete_stored_files, get_file_storage
+
+logger = logging.getLogger(__name__)
+
+def user_directory_path(instance, filename):
+    """
+    Generates a file upload path that includes the user name.
+    Example: uploads/<username>/<filename>
+    """
+    return f"uploads/{instance.user.username}/{filename}"
+
+def thumbnail_path(instance, filename):
+    """
+    Generates the storage path of a file's thumbnail.
+    Example: thumbnails/<user_id>/<filename>
+    """
+    return f"thumbnails/{instance.user_id}/{filename}"
+
+def default_auto_deleted_at():
+    """
+    Returns the date and time for automatic file deletion.
+    For example, after 30 days
+    """
+    return now() + timedelta(days=30)
+
+def default_upload_session_expires_at():
+    """
+    Returns the date and time after which an unfinished upload session is discarded.
+    Pushed forward every time a chunk is received.
+    """
+    return now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+def shared_link_cache_key(link):
+    """Cache key of the fields files.sharing keeps for a shared link (UUID)."""
+    return f"files:share:{link}"
+
+def forget_shared_links(links):
+    """
+    Drops the cached shared links, again after commit so a concurrent public
+    request cannot re-cache the old row.
+    """
+    keys = [shared_link_cache_key(link) for link in links if link]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+# Sorted sets of shared links (UUID strings) scored by a Unix time: links with
+# signed URLs by the expiry of the last one issued, and revoked links by the
+# time their last signed URL expires and they can leave the edge revocation list.
+SIGNED_SHARED_LINKS_KEY = 'files:share:signed'
+REVOKED_SHARED_LINKS_KEY = 'files:share:revoked'
+
+def revoke_shared_links(links):
+    """
+    Drops the cached shared links of deleted files or revoked and rotated links.
+    After commit, those with signed URLs that have not expired yet are put on
+    the revocation list files.tasks.export_share_revocations pushes to the edge,
+    which may hold cached responses of their signed URLs.
+    """
+    links = [str(link) for link in links if link]
+    if not links:
+        return
+    forget_shared_links(links)
+    transaction.on_commit(lambda: _revoke_signed_links(links))
+
+def _revoke_signed_links(links):
+    redis = get_redis_connection('default')
+    current = time.time()
+    revoked = {
+        link: expires
+        for link, expires in zip(links, redis.zmscore(SIGNED_SHARED_LINKS_KEY, links))
+        if expires and expires > current
+    }
+    if revoked:
+        pipe = redis.pipeline(transaction=False)
+        pipe.zadd(REVOKED_SHARED_LINKS_KEY, revoked)
+        pipe.zrem(SIGNED_SHARED_LINKS_KEY, *revoked)
+        pipe.execute()
+        logger.info(f"Revoked {len(revoked)} shared links with signed URLs")
+
+class FileQuerySet(models.QuerySet):
+    """
+    QuerySet with set-based deletion for expiry and bulk operations.
+    """
+
+    def delete_returning(self):
+        """
+        Deletes the selected rows in one DELETE ... RETURNING statement without
+        loading model instances or sending per-row signals.
+        Returns (id, user_id, size, file, thumbnail, shared_link) tuples of the deleted rows.
+        """
+        select_sql, params = self.values('id').query.sql_with_params()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id IN ({select_sql}) "
+                f"RETURNING id, user_id, size, file, thumbnail, shared_link",
+                params,
+            )
+            return cursor.fetchall()
+
+    def purge(self, actor=None):
+        """
+        Deletes the selected files and removes their stored content in parallel
+        once the surrounding transaction commits. Storage usage of the owners is
+        adjusted in the same transaction and their sessions are notified on commit.
+        Returns the number of deleted files.
+        """
+        with transaction.atomic():
+            rows = self.delete_returning()
+            deltas = {}
+            for _, user_id, size, _, _, _ in rows:
+                size_delta, files_delta = deltas.get(user_id, (0, 0))
+                deltas[user_id] = (size_delta - (size or 0), files_delta - 1)
+            StorageUsage.objects.adjust(deltas)
+            notify_file_changes(
+                ((user_id, file_id, 'deleted', None) for file_id, user_id, _, _, _, _ in rows), actor
+            )
+            revoke_shared_links(row[5] for row in rows)
+        names = [row[3] for row in rows if row[3]]
+        if names:
+            transaction.on_commit(lambda: delete_stored_files(names))
+        thumbnails = [row[4] for row in rows if row[4]]
+        if thumbnails:
+            transaction.on_commit(lambda: delete_stored_files(thumbnails, storage=default_storage))
+        return len(rows)
+
+    search_orderings = {
+        'ranked': ('-rank', '-id'),
+        'prefix': ('-uploaded_at', '-id'),
+        'fuzzy': ('-similarity', '-id'),
+    }
+
+    def search(self, query, mode='ranked'):
+        """
+        Filters the files matching a search query. Every mode is answered from a
+        GIN index; with search_orderings[mode] the result can be keyset-paged
+        (scores are cast from real to double so cursor positions compare exactly).
+        - ranked: web-search syntax over name and comment, ranked by ts_rank
+        - prefix: every word starts a word of the name or comment, newest first
+        - fuzzy: name similar to the query by trigrams, most similar first
+        """
+        if mode == 'prefix':
+            words = re.findall(r'\w+', query)
+            if not words:
+                return self.none()
+            prefix_query = SearchQuery(
+                ' & '.join(f"{word}:*" for word in words), search_type='raw', config='simple'
+            )
+            return self.filter(search_vector=prefix_query)
+        if mode == 'fuzzy':
+            return self.filter(name__trigram_similar=query).annotate(
+                similarity=Cast(TrigramSimilarity('name', query), models.FloatField())
+            )
+        text_query = SearchQuery(query, search_type='websearch', config='simple')
+        return self.filter(search_vector=text_query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), text_query), models.FloatField())
+        )
+
+    def rename(self, names):
+        """
+        Renames the selected files from an {id: name} mapping in a single
+        UPDATE ... FROM (VALUES ...) statement; ids outside the queryset are ignored.
+        Their cached shared links are dropped, as they carry the name.
+        Returns (id, user_id) tuples of the renamed rows.
+        """
+        if not names:
+            return []
+        select_sql, params = self.filter(id__in=list(names)).values('id').query.sql_with_params()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        values = ", ".join(["(%s::bigint, %s)"] * len(names))
+        values_params = []
+        for file_id, name in names.items():
+            values_params.extend([file_id, name])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} AS f SET name = v.name "
+                f"FROM (VALUES {values}) AS v(id, name) "
+                f"WHERE f.id = v.id AND f.id IN ({select_sql}) "
+                f"RETURNING f.id, f.user_id, f.shared_link",
+                values_params + list(params),
+            )
+            rows = cursor.fetchall()
+        forget_shared_links(row[2] for row in rows)
+        return [(file_id, user_id) for file_id, user_id, _ in rows]
+
+class File(models.Model):
+    """
+    Model representing uploaded files with metadata.
+    Includes tracking for last download time.
+    """
+    HOT = 'hot'
+    COLD = 'cold'
+    TIERS = [(HOT, 'Hot'), (COLD, 'Cold')]
+
+    objects = FileQuerySet.as_manager()
+
+    # No single-column index: the (user, ...) indexes below serve user_id lookups.
+    # Deleted along with the user by delete_user_directory, in one statement;
+    # files are added under lock_file_owner so none slips in meanwhile
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name="files", db_index=False
+    )
+    name = models.CharField(max_length=255)
+    file = models.FileField(upload_to=user_directory_path, storage=get_file_storage)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    auto_deleted_at = models.DateTimeField(default=default_auto_deleted_at)
+    shared_link = models.UUIDField(blank=True, null=True, unique=True)
+    shared_link_expires_at = models.DateTimeField(
+        null=True, blank=True, help_text="The shared link stops working after this time"
+    )
+    shared_link_max_downloads = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Downloads allowed through the shared link, unlimited if empty"
+    )
+    shared_link_downloads = models.PositiveIntegerField(
+        default=0, help_text="Downloads through the current shared link, counted when it has a limit"
+    )
+    comment = models.TextField(null=True, blank=True)
+    last_downloaded = models.DateTimeField(
+        null=True, 
+        blank=True, 
+        verbose_name="Last Downloaded",
+        help_text="Date and time when the file was last downloaded"
+    )
+    download_count = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Number of downloads, flushed periodically from the Redis buffer"
+    )
+    sha256 = models.CharField(
+        max_length=64, null=True, blank=True,
+        help_text="SHA-256 of the content, set by process_file"
+    )
+    mime_type = models.CharField(
+        max_length=255, null=True, blank=True,
+        help_text="MIME type sniffed from the content, set by process_file"
+    )
+    thumbnail = models.FileField(upload_to=thumbnail_path, max_length=255, null=True, blank=True)
+    stored_size = models.PositiveBigIntegerField(
+        null=True, blank=True,
+        help_text="Bytes held in storage; smaller than size when the content is compressed"
+    )
+    content_encoding = models.CharField(
+        max_length=16, null=True, blank=True,
+        help_text="Encoding of the stored content (e.g. zstd), empty if stored as uploaded"
+    )
+    search_vector = models.GeneratedField(
+        expression=SearchVector('name', 'comment', config='simple'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+    storage_tier = models.CharField(
+        max_length=4, choices=TIERS, default=HOT,
+        help_text="Storage tier holding the content, moved by apply_storage_tiering"
+    )
+    tier_changed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['auto_deleted_at', 'id'], name='files_file_expiry_idx'),
+            models.Index(fields=['user', '-uploaded_at', '-id'], name='files_file_user_recent_idx'),
+            models.Index(fields=['-uploaded_at', '-id'], name='files_file_recent_idx'),
+            models.Index(fields=['user', 'auto_deleted_at', 'id'], name='files_file_user_expiry_idx'),
+            models.Index(
+                fields=['user', '-last_downloaded', '-id'], name='files_file_user_downloaded_idx',
+                condition=models.Q(last_downloaded__isnull=False)
+            ),
+            # Blob reference lookups: equality and prefix (LIKE 'blobs/%') on the stored name
+            models.Index(fields=['file'], opclasses=['varchar_pattern_ops'], name='files_file_file_idx'),
+            # Storage tiering: hot files by last access, cold files downloaded since they went cold
+            models.Index(
+                Coalesce('last_downloaded', 'uploaded_at'), F('id'), name='files_file_tier_demote_idx',
+                condition=models.Q(storage_tier='hot')
+            ),
+            models.Index(
+                fields=['id'], name='files_file_tier_recall_idx',
+                condition=models.Q(storage_tier='cold', last_downloaded__gt=F('tier_changed_at'))
+            ),
+            # Multicolumn GIN (btree_gin) indexes serve searches with or without a user filter
+            GinIndex(fields=['user', 'search_vector'], name='files_file_search_idx'),
+            GinIndex(
+                fields=['user', 'name'], opclasses=['int8_ops', 'gin_trgm_ops'],
+                name='files_file_name_trgm_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Redefining the save method to set the file size and unique shared_link.
+        Automatically calculates size if not set and generates shared_link for new
+        files (a revoked link stays empty).
+        New files are added to the owner's storage usage in the same transaction.
+        New content is stored as uploaded until process_file compresses it.
+        """
+        if self.file and not self.file._committed:
+            self.content_encoding = None
+            self.stored_size = None
+        if self.file and not self.size:
+            try:
+                self.size = self.file.size
+            except AttributeError:
+                self.size = 0
+        adding = self._state.adding
+        if adding and not self.shared_link:
+            self.shared_link = uuid.uuid4()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                StorageUsage.objects.adjust({self.user_id: (self.size or 0, 1)})
+
+    def get_shared_url(self):
+        """
+        Generates a relative URL for downloading a file by `shared_link`, with the
+        link in its compact token form. Used for creating shareable download links.
+        """
+        from django.urls import reverse
+        from .sharing import share_token
+        return reverse('file-download', kwargs={'shared_link': share_token(self.shared_link)})
+
+    def __str__(self):
+        """String representation of the file for admin interface and debugging."""
+        return f"{self.name} ({self.user.username})"
+
+class StorageUsageQuerySet(models.QuerySet):
+    """
+    QuerySet with atomic in-place adjustment of usage counters.
+    """
+
+    def adjust(self, deltas):
+        """
+        Applies {user_id: (bytes, files)} deltas with set-based statements.
+        Existing rows are updated in place (never below zero); rows for users
+        without one yet are inserted for positive deltas.
+        """
+        items = [(user_id, delta) for user_id, delta in deltas.items() if any(delta)]
+        if not items:
+            return
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        users_table = connection.ops.quote_name(get_user_model()._meta.db_table)
+
+        def values_sql(items):
+            params = []
+            for user_id, (bytes_delta, files_delta) in items:
+                params.extend([user_id, bytes_delta, files_delta])
+            values = ", ".join(["(%s::bigint, %s::bigint, %s::bigint)"] * len(items))
+            return f"(VALUES {values}) AS v(user_id, bytes, files)", params
+
+        with connection.cursor() as cursor:
+            values, params = values_sql(items)
+            cursor.execute(
+                f"UPDATE {table} AS u "
+                f"SET bytes = GREATEST(u.bytes + v.bytes, 0), "
+                f"files = GREATEST(u.files + v.files, 0), updated_at = NOW() "
+                f"FROM {values} WHERE u.user_id = v.user_id "
+                f"RETURNING u.user_id",
+                params,
+            )
+            updated = {row[0] for row in cursor.fetchall()}
+            missing = [
+                (user_id, delta) for user_id, delta in items
+                if user_id not in updated and min(delta) >= 0
+            ]
+            if not missing:
+                return
+            values, params = values_sql(missing)
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, bytes, files, updated_at) "
+                f"SELECT v.user_id, v.bytes, v.files, NOW() FROM {values} "
+                f"JOIN {users_table} AS owner ON owner.id = v.user_id "
+                f"ON CONFLICT (user_id) DO UPDATE "
+                f"SET bytes = {table}.bytes + EXCLUDED.bytes, "
+                f"files = {table}.files + EXCLUDED.files, updated_at = EXCLUDED.updated_at",
+                params,
+            )
+
+    def exceeds_quota(self, user, incoming):
+        """
+        Checks whether storing `incoming` more bytes would take the user over
+        their quota. Reads the maintained counter, never files_file.
+        """
+        used, quota = self.filter(user=user).values_list('bytes', 'quota').first() or (0, None)
+        if quota is None:
+            quota = settings.STORAGE_QUOTA_DEFAULT
+        return bool(quota) and used + incoming > quota
+
+class StorageUsage(models.Model):
+    """
+    Bytes and number of files stored by a user.
+    Maintained on every File create/delete and corrected by the
+    reconcile_storage_usage task, so quotas never aggregate files_file.
+    """
+    objects = StorageUsageQuerySet.as_manager()
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        primary_key=True, related_name="storage_usage"
+    )
+    bytes = models.PositiveBigIntegerField(default=0)
+    files = models.PositiveBigIntegerField(default=0)
+    quota = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Quota in bytes; empty uses STORAGE_QUOTA_DEFAULT"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.bytes} bytes in {self.files} files"
+
+class ChangeSequence(models.Model):
+    """
+    Per-user counter of file changes.
+    `value` is the last sequence number handed out; changes up to `trimmed`
+    have been removed from the log, so clients behind it must resync.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        primary_key=True, related_name="change_sequence"
+    )
+    value = models.PositiveBigIntegerField(default=0)
+    trimmed = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, counts):
+        """
+        Reserves {user_id: n} sequence numbers in one statement and returns
+        {user_id: first reserved number}. The row locks are held until commit,
+        so each user's changes become visible in sequence order.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        values = ", ".join(["(%s::bigint, %s::bigint)"] * len(counts))
+        params = []
+        for user_id, count in counts.items():
+            params.extend([user_id, count])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, value, trimmed) "
+                f"SELECT v.user_id, v.count, 0 FROM (VALUES {values}) AS v(user_id, count) "
+                f"ON CONFLICT (user_id) DO UPDATE SET value = {table}.value + EXCLUDED.value "
+                f"RETURNING user_id, value",
+                params,
+            )
+            return {user_id: value - counts[user_id] + 1 for user_id, value in cursor.fetchall()}
+
+    def __str__(self):
+        return f"{self.user_id}: {self.value}"
+
+class FileChangeQuerySet(models.QuerySet):
+    """
+    QuerySet answering "what changed since sequence number N" for one user.
+    """
+
+    def since(self, user_id, since):
+        """
+        Returns {'seq': latest, 'changes': [...]} with the changes after `since`
+        coalesced per file, or {'seq': latest, 'resync': True} when the log no
+        longer covers `since` or holds more than FILE_CHANGES_MAX changes.
+        """
+        limit = settings.FILE_CHANGES_MAX
+        rows = list(
+            self.filter(user_id=user_id, seq__gt=since)
+            .order_by('seq')
+            .values_list('seq', 'file_id', 'action')[:limit + 1]
+        )
+        # Read after the rows: a trim committing in between is then always noticed.
+        latest, trimmed = ChangeSequence.objects.filter(user_id=user_id).values_list(
+            'value', 'trimmed'
+        ).first() or (0, 0)
+        if rows:
+            latest = max(latest, rows[-1][0])
+        if since < trimmed or since > latest or len(rows) > limit:
+            return {'seq': latest, 'resync': True}
+
+        changes = {}
+        for seq, file_id, action in rows:
+            previous = changes.get(file_id)
+            if previous is not None and previous['action'] == 'created':
+                if action == 'deleted':
+                    del changes[file_id]
+                    continue
+                action = 'created'
+            changes[file_id] = {'seq': seq, 'file_id': file_id, 'action': action}
+        return {'seq': latest, 'changes': sorted(changes.values(), key=lambda change: change['seq'])}
+
+class FileChange(models.Model):
+    """
+    Compact log of file changes per user, numbered by ChangeSequence.
+    Lets reconnecting clients fetch what they missed instead of the full list.
+    """
+    ACTIONS = [('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')]
+
+    objects = FileChangeQuerySet.as_manager()
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name="file_changes", db_index=False
+    )
+    seq = models.PositiveBigIntegerField()
+    file_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=7, choices=ACTIONS)
+    created_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'seq'], name='files_filechange_user_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}#{self.seq}: {self.action} {self.file_id}"
+
+class UploadSession(models.Model):
+    """
+    Resumable chunked upload.
+    Chunks are appended in place to `path`, which becomes the storage name
+    of the File created when the session is completed.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    name = models.CharField(max_length=255)
+    comment = models.TextField(null=True, blank=True)
+    path = models.CharField(max_length=255, editable=False)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=default_upload_session_expires_at)
+
+    @staticmethod
+    def get_storage():
+        """Storage the finished File will live in."""
+        return File._meta.get_field('file').storage
+
+    def save(self, *args, **kwargs):
+        """
+        Redefining the save method to reserve the final storage path.
+        An empty file is created so concurrent sessions can't claim the same name.
+        """
+        if not self.path:
+            field = File._meta.get_field('file')
+            storage = self.get_storage()
+            name = field.generate_filename(File(user=self.user), self.name)
+            while True:
+                name = storage.get_available_name(name, max_length=field.max_length)
+                full_path = storage.path(name)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                try:
+                    os.close(os.open(full_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                    break
+                except FileExistsError:
+                    continue
+            self.path = name
+        super().save(*args, **kwargs)
+
+    def append_chunk(self, stream, length):
+        """
+        Writes up to `length` bytes from `stream` at the current offset.
+        Bytes received before the client went away are kept, so the upload
+        can resume from the new offset. Returns the number of bytes written.
+        """
+        written = 0
+        with open(self.get_storage().path(self.path), 'r+b') as destination:
+            destination.seek(self.offset)
+            while written < length:
+                try:
+                    chunk = stream.read(min(BaseFile.DEFAULT_CHUNK_SIZE, length - written))
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                destination.write(chunk)
+                written += len(chunk)
+            destination.truncate()
+        self.offset += written
+        self.expires_at = default_upload_session_expires_at()
+        self.save(update_fields=['offset', 'expires_at'])
+        return written
+
+    def finish(self):
+        """
+        Turns a fully received session into a File without copying any bytes.
+        """
+        file_instance = File(
+            user=self.user,
+            name=self.name,
+            comment=self.comment or "No comment",
+            size=self.size,
+        )
+        storage = self.get_storage()
+        file_instance.file.name = (
+            storage.ingest(self.path) if hasattr(storage, 'ingest') else self.path
+        )
+        file_instance.save()
+        self.delete()
+        return file_instance
+
+    def discard(self):
+        """
+        Removes the partially uploaded data together with the session.
+        """
+        self.get_storage().delete(self.path)
+        self.delete()
+
+    def __str__(self):
+        return f"{self.name} ({self.offset}/{self.size})"
+
+class Blob(models.Model):
+    """
+    Deduplicated content stored by ContentAddressedStorage.
+    Counts the File rows referencing it; the content is removed with the last reference.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest} ({self.ref_count} refs)"
+
+class StorageTombstone(models.Model):
+    """
+    Storage tree of a deleted user waiting to be removed in the background.
+    The tree is moved under trash/ when the deletion commits and purged by the
+    purge_storage_tombstone task, which records its progress here.
+    """
+    path = models.CharField(max_length=255)
+    username = models.CharField(max_length=150)
+    created_at = models.DateTimeField(auto_now_add=True)
+    removed_files = models.PositiveBigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def move_aside(self):
+        """
+        Renames the tree to trash/<id> so the username's upload path is free again.
+        Returns False if the tree is still in place but belongs to a new user of the
+        same name (the tombstone is then closed without removing anything).
+        """
+        trash_path = os.path.join("trash", str(self.pk))
+        if self.path == trash_path:
+            return True
+        storage = get_file_storage()
+        source = storage.path(self.path)
+        if get_user_model().objects.filter(username=self.username).exists():
+            logger.warning(f"Tombstone {self.pk}: {self.path} was reclaimed, skipping purge")
+            self.completed_at = now()
+            self.save(update_fields=['completed_at'])
+            return False
+        if os.path.isdir(source):
+            os.makedirs(storage.path("trash"), exist_ok=True)
+            os.rename(source, storage.path(trash_path))
+        self.path = trash_path
+        self.save(update_fields=['path'])
+        return True
+
+    def __str__(self):
+        return f"{self.path} ({self.removed_files} removed)"
+
+@receiver([post_save, post_delete], sender=File)
+def forget_shared_link(sender, instance, signal, **kwargs):
+    """
+    Drops the cached shared link of a saved or deleted file; the link of a
+    deleted file is revoked at the edge as well.
+    """
+    if signal is post_delete:
+        revoke_shared_links([instance.shared_link])
+    else:
+        forget_shared_links([instance.shared_link])
+
+@receiver(post_delete, sender=File)
+def delete_file_on_model_delete(sender, instance, **kwargs):
+    """
+    Signal receiver to delete physical file from storage when model instance is deleted.
+    Prevents orphaned files in storage when database records are removed.
+    Deduplicated blobs are only dropped once their last reference goes.
+    Thumbnails are removed as well and the owner's storage usage is decreased.
+    Files of a deleted user do not come through here, see delete_user_directory.
+    """
+    StorageUsage.objects.adjust({instance.user_id: (-(instance.size or 0), -1)})
+    if instance.thumbnail:
+        instance.thumbnail.storage.delete(instance.thumbnail.name)
+    if instance.file:
+        instance.file.storage.delete(instance.file.name)
+
+def lock_file_owner(user):
+    """
+    Takes a key-share lock on the user row for the rest of the transaction,
+    before files are added for the user. Returns False if the user is gone.
+    delete_user_directory locks the row for update before removing the
+    user's files, so a file added concurrently is either committed first and
+    removed with the others or not added at all; as File.user does not
+    cascade, it would otherwise make the user's deletion fail on the foreign
+    key. Key-share locks do not conflict with each other, so uploads of one
+    user still run in parallel.
+    """
+    meta = get_user_model()._meta
+    table = connection.ops.quote_name(meta.db_table)
+    column = connection.ops.quote_name(meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {table} WHERE {column} = %s FOR KEY SHARE", [user.pk])
+        return cursor.fetchone() is not None
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_user_directory(sender, instance, **kwargs):
+    """
+    Signal receiver to delete the user's files and tombstone their upload
+    directory when the user is deleted.
+    The user row is locked first, so uploads (see lock_file_owner) wait for
+    the deletion or finish before it. The files go in one DELETE (File.user
+    does not cascade row by row) and their shared links are revoked together;
+    the storage usage row goes with the user. After commit the directory is
+    moved aside and Celery tasks remove it, the thumbnails, the deduplicated
+    blobs outside it and any content on the cold storage tier in the background.
+    """
+    list(sender.objects.select_for_update().filter(pk=instance.pk).values_list('pk'))
+    user_folder = f"uploads/{instance.username}"
+    storage = get_file_storage()
+    cold_names = []
+    if hasattr(storage, 'cold'):
+        cold_names = list(File.objects.filter(
+            user=instance, storage_tier=File.COLD, file__startswith=f"{user_folder}/"
+        ).values_list('file', flat=True))
+    rows = File.objects.filter(user=instance).delete_returning()
+    revoke_shared_links(row[5] for row in rows)
+    blob_names = [row[3] for row in rows if row[3] and not row[3].startswith(f"{user_folder}/")]
+    thumbnails = [row[4] for row in rows if row[4]]
+    tombstone = StorageTombstone.objects.create(path=user_folder, username=instance.username)
+
+    def purge_after_commit():
+        from .tasks import purge_storage_tombstone, remove_stored_files
+        if tombstone.move_aside():
+            purge_storage_tombstone.delay(tombstone.pk)
+        batch_size = settings.FILE_EXPIRY_BATCH_SIZE
+        for location, names in (('files', blob_names), ('thumbnails', thumbnails), ('cold', cold_names)):
+            for offset in range(0, len(names), batch_size):
+                remove_stored_files.delay(names[offset:offset + batch_size], location)
+
+    transaction.on_commit(purge_after_commit)
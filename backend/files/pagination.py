@@ -0,0 +1,148 @@
+import base64
+import datetime
+import json
+import math
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Keeps the microseconds of datetimes, which DjangoJSONEncoder truncates
+    to milliseconds; a truncated position would skip rows within that millisecond.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over a fixed ordering ending in a unique column.
+    The cursor carries the ordering values of the last row returned, so every
+    page is a range scan on the matching index no matter how deep it is, and
+    rows inserted meanwhile never shift or duplicate entries.
+    Works with model instances as well as .values() rows.
+    """
+    ordering = ('-uploaded_at', '-id')
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None, ordering=None):
+        self.request = request
+        self.ordering = ordering or getattr(view, 'keyset_ordering', None) or self.ordering
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(self.parse_position(queryset.model, position)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.position_of(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def after(self, position):
+        """
+        Builds the "strictly after `position`" condition for the ordering.
+        The leading column also gets a plain bound so the planner can use it
+        as the index range start.
+        """
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+        condition = Q()
+        for index, (field, descending) in enumerate(fields):
+            step = Q(**{f"{field}__{'lt' if descending else 'gt'}": position[index]})
+            for previous in range(index):
+                step &= Q(**{fields[previous][0]: position[previous]})
+            condition |= step
+        leading, descending = fields[0]
+        return Q(**{f"{leading}__{'lte' if descending else 'gte'}": position[0]}) & condition
+
+    def parse_position(self, model, position):
+        """
+        Converts the cursor values to the types of the ordering columns, so a
+        tampered cursor is rejected here instead of failing in the database.
+        Model fields parse and validate their own values (datetimes must carry
+        a time zone); annotations such as the search rank are plain numbers.
+        """
+        values = []
+        for field, value in zip((field.lstrip('-') for field in self.ordering), position):
+            if value is None or isinstance(value, (bool, list, dict)):
+                raise NotFound('Invalid cursor.')
+            try:
+                model_field = model._meta.get_field(field)
+            except FieldDoesNotExist:
+                if not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise NotFound('Invalid cursor.')
+                values.append(value)
+                continue
+            try:
+                value = model_field.to_python(value)
+                model_field.run_validators(value)
+            except ValidationError:
+                raise NotFound('Invalid cursor.')
+            if isinstance(value, datetime.datetime) and timezone.is_naive(value):
+                raise NotFound('Invalid cursor.')
+            values.append(value)
+        return values
+
+    def position_of(self, row):
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, field) for field in fields]
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor.')
+        return position
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,340 @@
+import codecs
+import hashlib
+import logging
+import mimetypes
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.files.base import ContentFile, File as DjangoFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+from .compression import ZSTD, compressed_size, compressing_writer
+from .delivery import CHUNK_SIZE, open_content
+from .thumbnails import THUMBNAIL_FORMAT, render_thumbnail
+
+logger = logging.getLogger(__name__)
+
+SNIFF_SIZE = 4096
+
+# (offset, signature, MIME type), checked in order
+SIGNATURES = (
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),
+    (0, b'BM', 'image/bmp'),
+    (0, b'II*\x00', 'image/tiff'),
+    (0, b'MM\x00*', 'image/tiff'),
+    (0, b'\x00\x00\x01\x00', 'image/x-icon'),
+    (4, b'ftypheic', 'image/heic'),
+    (4, b'ftypavif', 'image/avif'),
+    (4, b'ftypqt', 'video/quicktime'),
+    (4, b'ftyp', 'video/mp4'),
+    (0, b'\x1aE\xdf\xa3', 'video/webm'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'fLaC', 'audio/flac'),
+    (8, b'WAVE', 'audio/wav'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1f\x8b', 'application/gzip'),
+    (0, b'(\xb5/\xfd', 'application/zstd'),
+    (0, b'7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+    (0, b'Rar!\x1a\x07', 'application/vnd.rar'),
+)
+
+# Formats stored as ZIP archives; the extension tells them apart
+ZIP_BASED_PREFIXES = ('application/vnd.openxmlformats', 'application/vnd.oasis', 'application/epub')
+
+_pool_lock = threading.Lock()
+_process_pool = None
+
+def process_pool():
+    """
+    Returns the per-worker process pool for CPU-heavy stages, creating it on
+    first use. Children are spawned, not forked, so they inherit neither the
+    Celery worker's threads nor its database connections.
+    """
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.FILE_PROCESSING_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _process_pool
+
+def run_in_process_pool(func, *args, timeout=None):
+    """
+    Runs func(*args) in the process pool and returns its result.
+    A pool broken by a crashed child is replaced for the next call.
+    """
+    global _process_pool
+    pool = process_pool()
+    try:
+        return pool.submit(func, *args).result(timeout=timeout)
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _process_pool is pool:
+                _process_pool = None
+        raise
+
+class Stage:
+    """
+    A step of the processing pipeline.
+    Every stage sees each chunk of the content once, in storage order, and
+    returns the File fields it sets from finish(). Stages run in the order of
+    FILE_PROCESSING_STAGES and share `results`, so later stages can use what
+    earlier ones found (e.g. the MIME type) while the content is still streaming.
+    """
+
+    def __init__(self, file, results):
+        self.file = file
+        self.results = results
+
+    def feed(self, chunk):
+        pass
+
+    def finish(self):
+        return {}
+
+    def close(self):
+        pass
+
+class ChecksumStage(Stage):
+    """
+    SHA-256 of the content. Deduplicated blobs are named by their digest,
+    which is used without hashing again unless they hold compressed content.
+    """
+
+    def __init__(self, file, results):
+        super().__init__(file, results)
+        storage = file.file.storage
+        self.digest = None
+        if not file.content_encoding and hasattr(storage, 'is_blob') and storage.is_blob(file.file.name):
+            self.digest = file.file.name.rsplit('/', 1)[-1]
+        self.hasher = None if self.digest else hashlib.sha256()
+
+    def feed(self, chunk):
+        if self.hasher:
+            self.hasher.update(chunk)
+
+    def finish(self):
+        return {'sha256': self.digest or self.hasher.hexdigest()}
+
+class MimeTypeStage(Stage):
+    """
+    MIME type sniffed from the leading bytes, falling back to the file name.
+    """
+
+    def __init__(self, file, results):
+        super().__init__(file, results)
+        self.head = b''
+
+    def feed(self, chunk):
+        if 'mime_type' in self.results:
+            return
+        self.head += chunk[:SNIFF_SIZE - len(self.head)]
+        if len(self.head) >= min(SNIFF_SIZE, self.file.size or SNIFF_SIZE):
+            self.results['mime_type'] = sniff_mime_type(self.head, self.file.name)
+
+    def finish(self):
+        if 'mime_type' not in self.results:
+            self.results['mime_type'] = sniff_mime_type(self.head, self.file.name)
+        return {'mime_type': self.results['mime_type']}
+
+class ThumbnailStage(Stage):
+    """
+    Thumbnail of images and the first page of PDFs, rendered in the process pool.
+    Content kept in local storage is read in place; anything else is spooled
+    to a temporary file while it streams past.
+    """
+    mime_types = (
+        'image/png', 'image/jpeg', 'image/gif', 'image/webp',
+        'image/bmp', 'image/tiff', 'application/pdf',
+    )
+
+    def __init__(self, file, results):
+        super().__init__(file, results)
+        self.enabled = None
+        self.path = None
+        self.spool = None
+
+    def start(self):
+        if self.results.get('mime_type') not in self.mime_types:
+            return False
+        if (self.file.size or 0) > settings.FILE_THUMBNAIL_MAX_SOURCE_SIZE:
+            return False
+        self.path = self.local_path()
+        if self.path is None:
+            self.spool = tempfile.NamedTemporaryFile(prefix='thumbnail-')
+            self.path = self.spool.name
+        return True
+
+    def local_path(self):
+        """
+        Path of the content on local disk, or None if it is compressed, kept
+        in a storage without paths or on the cold tier of a TieredStorage.
+        """
+        storage = self.file.file.storage
+        if self.file.content_encoding or not isinstance(storage, FileSystemStorage):
+            return None
+        path = storage.path(self.file.file.name)
+        return path if os.path.exists(path) else None
+
+    def feed(self, chunk):
+        if self.enabled is None:
+            self.enabled = self.start()
+        if self.spool:
+            self.spool.write(chunk)
+
+    def finish(self):
+        if not self.enabled:
+            return {'thumbnail': None}
+        if self.spool:
+            self.spool.flush()
+        try:
+            data = run_in_process_pool(
+                render_thumbnail, self.path, self.results['mime_type'],
+                settings.FILE_THUMBNAIL_SIZE, timeout=settings.FILE_THUMBNAIL_TIMEOUT,
+            )
+        except ImportError as e:
+            logger.warning(f"Thumbnails are disabled, missing dependency: {str(e)}")
+            return {'thumbnail': None}
+        except Exception as e:
+            logger.warning(f"Could not render thumbnail for file {self.file.id}: {str(e)}")
+            return {'thumbnail': None}
+        return {'thumbnail': ContentFile(data, name=f"{self.file.id}.{THUMBNAIL_FORMAT.lower()}")}
+
+    def close(self):
+        if self.spool:
+            self.spool.close()
+
+class CompressionStage(Stage):
+    """
+    zstd compression at rest for content of a FILE_COMPRESSION_TYPES type.
+    The first FILE_COMPRESSION_SAMPLE_SIZE bytes are compressed on their own,
+    and the rest of the content is compressed into a temporary file only if that
+    sample shrinks by FILE_COMPRESSION_MIN_RATIO. The task stores the result in
+    place of the original. Content that is already compressed is left alone.
+    """
+
+    def __init__(self, file, results):
+        super().__init__(file, results)
+        self.enabled = None
+        self.sample = b''
+        self.spool = None
+        self.writer = None
+
+    def start(self):
+        if not settings.FILE_COMPRESSION_ENABLED or self.file.content_encoding:
+            return False
+        if (self.file.size or 0) < settings.FILE_COMPRESSION_MIN_SIZE:
+            return False
+        mime_type = self.results.get('mime_type') or ''
+        return mime_type.startswith(tuple(settings.FILE_COMPRESSION_TYPES))
+
+    def feed(self, chunk):
+        if self.enabled is None:
+            self.enabled = self.start()
+        if not self.enabled:
+            return
+        if self.writer is not None:
+            self.writer.write(chunk)
+            return
+        self.sample += chunk
+        if len(self.sample) >= min(settings.FILE_COMPRESSION_SAMPLE_SIZE, self.file.size):
+            self.begin()
+
+    def begin(self):
+        """
+        Checks the sample ratio and starts compressing the content if it is worth it.
+        """
+        sample, self.sample = self.sample, b''
+        try:
+            ratio = len(sample) / max(compressed_size(sample, settings.FILE_COMPRESSION_LEVEL), 1)
+        except ImportError as e:
+            logger.warning(f"Compression is disabled, missing dependency: {str(e)}")
+            self.enabled = False
+            return
+        if ratio < settings.FILE_COMPRESSION_MIN_RATIO:
+            self.enabled = False
+            return
+        self.spool = tempfile.TemporaryFile(prefix='compressed-')
+        self.writer = compressing_writer(self.spool, settings.FILE_COMPRESSION_LEVEL, self.file.size)
+        self.writer.write(sample)
+
+    def finish(self):
+        if self.enabled and self.writer is None and self.sample:
+            self.begin()
+        if not self.writer:
+            if self.file.content_encoding:
+                return {}
+            return {'stored_size': self.file.size}
+        self.writer.close()
+        stored_size = self.spool.tell()
+        if stored_size * settings.FILE_COMPRESSION_MIN_RATIO > (self.file.size or 0):
+            return {'stored_size': self.file.size}
+        # Handed over to the task, which closes it once stored
+        spool, self.spool = self.spool, None
+        spool.seek(0)
+        return {
+            'compressed': DjangoFile(spool, name=f"{os.path.basename(self.file.file.name)}.zst"),
+            'content_encoding': ZSTD,
+            'stored_size': stored_size,
+        }
+
+    def close(self):
+        if self.spool:
+            self.spool.close()
+
+def sniff_mime_type(head, name):
+    """
+    Detects the MIME type from magic numbers in the first bytes of the content.
+    ZIP containers and text are refined by the extension; unknown binary content
+    falls back to the extension or application/octet-stream.
+    """
+    guessed = mimetypes.guess_type(name)[0]
+    for offset, signature, mime_type in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if mime_type == 'application/zip' and guessed and guessed.startswith(ZIP_BASED_PREFIXES):
+                return guessed
+            return mime_type
+    if head and b'\x00' not in head:
+        try:
+            # Not final when sniffing stopped early: a character may be cut at the end
+            codecs.getincrementaldecoder('utf-8')().decode(head, final=len(head) < SNIFF_SIZE)
+        except UnicodeDecodeError:
+            pass
+        else:
+            if guessed and (guessed.startswith('text/') or guessed.endswith(('json', 'xml', 'javascript'))):
+                return guessed
+            return 'text/plain'
+    return guessed or 'application/octet-stream'
+
+def run_pipeline(file):
+    """
+    Streams the stored content of a File once through every FILE_PROCESSING_STAGES
+    stage and returns the collected {field: value} metadata.
+    """
+    results = {}
+    stages = []
+    for path in settings.FILE_PROCESSING_STAGES:
+        stages.append(import_string(path)(file, results))
+    metadata = {}
+    try:
+        with open_content(file) as content:
+            for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+                for stage in stages:
+                    stage.feed(chunk)
+        for stage in stages:
+            metadata.update(stage.finish())
+    finally:
+        for stage in stages:
+            stage.close()
+    return metadata
@@ -1,45 +1,225 @@
-from rest_framework import serializers
-from .models import File
-
-class FileSerializer(serializers.ModelSerializer):
-    """
-    Serializer for File model that handles file uploads and metadata.
-    Includes computed file_url field and handles file ownership.
-    """
-    file_url = serializers.SerializerMethodField()
-
-    class Meta:
-        model = File
-        fields = ['id', 'user', 'name', 'file', 'size', 'uploaded_at', 
-                'shared_link', 'file_url', 'comment', 'last_downloaded']
-        read_only_fields = ['id', 'user', 'size', 'uploaded_at', 
-                          'shared_link', 'file_url', 'last_downloaded']
-
-    def create(self, validated_data):
-        """
-        Creates a file and automatically binds it to the current user.
-        Sets default comment if none provided.
-        """
-        validated_data['user'] = self.context['request'].user
-        validated_data['comment'] = validated_data.get('comment', "No comment")
-        return super().create(validated_data)
-
-    def update(self, instance, validated_data):
-        """
-        Allows users to update only the name and comment of their files.
-        Preserves existing values if new ones aren't provided.
-        """
-        instance.name = validated_data.get('name', instance.name)
-        instance.comment = validated_data.get('comment', instance.comment or "No comment")
-        instance.save()
-        return instance
-
-    def get_file_url(self, obj):
-        """
-        Returns the full URL to the file using the current request's domain.
-        Used for providing download links in API responses.
-        """
-        request = self.context.get('request')
-        if request:
-            return request.build_absolute_uri(obj.file.url)
-        return None
\ No newline at end of file
+import uuid
+from rest_framework import serializers
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+from django.utils.timezone import now
+from .models import File, UploadSession, forget_shared_links, revoke_shared_links
+from .storage import get_file_storage
+
+class FileSerializer(serializers.ModelSerializer):
+    """
+    Serializer for File model that handles file uploads and metadata.
+    Includes computed file_url field and handles file ownership.
+    """
+    file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = File
+        fields = ['id', 'user', 'name', 'file', 'size', 'uploaded_at', 
+                'shared_link', 'file_url', 'comment', 'last_downloaded', 'download_count',
+                'sha256', 'mime_type', 'thumbnail_url', 'processed_at', 'stored_size']
+        read_only_fields = ['id', 'user', 'size', 'uploaded_at', 
+                          'shared_link', 'file_url', 'last_downloaded', 'download_count',
+                          'sha256', 'mime_type', 'thumbnail_url', 'processed_at', 'stored_size']
+
+    def create(self, validated_data):
+        """
+        Creates a file and automatically binds it to the current user.
+        Sets default comment if none provided.
+        """
+        validated_data['user'] = self.context['request'].user
+        validated_data['comment'] = validated_data.get('comment', "No comment")
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """
+        Allows users to update only the name and comment of their files.
+        Preserves existing values if new ones aren't provided.
+        """
+        instance.name = validated_data.get('name', instance.name)
+        instance.comment = validated_data.get('comment', instance.comment or "No comment")
+        instance.save()
+        return instance
+
+    def get_file_url(self, obj):
+        """
+        Returns the full URL to the file using the current request's domain.
+        Used for providing download links in API responses.
+        """
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(obj.file.url)
+        return None
+
+    def get_thumbnail_url(self, obj):
+        """
+        Returns the full URL of the thumbnail made by process_file, if any.
+        """
+        if not obj.thumbnail:
+            return None
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(obj.thumbnail.url)
+        return obj.thumbnail.url
+
+class FileListSerializer(serializers.BaseSerializer):
+    """
+    Lightweight read-only serializer for file listings.
+    Works on .values() rows instead of model instances and emits only the
+    requested fields; file URLs are built from a storage base URL resolved once.
+    """
+    available_fields = ('id', 'user', 'name', 'file', 'size', 'uploaded_at', 'shared_link',
+                        'file_url', 'comment', 'last_downloaded', 'download_count',
+                        'sha256', 'mime_type', 'thumbnail_url', 'processed_at', 'stored_size')
+    datetime_fields = ('uploaded_at', 'last_downloaded', 'processed_at')
+    # Output field -> column holding the storage name
+    url_fields = {'file': 'file', 'file_url': 'file', 'thumbnail_url': 'thumbnail'}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selected = fields or self.available_fields
+        self.datetime_field = serializers.DateTimeField()
+        request = self.context.get('request')
+        self.url_prefixes = {}
+        for column, storage in (('file', get_file_storage()), ('thumbnail', default_storage)):
+            base_url = storage.base_url
+            self.url_prefixes[column] = request.build_absolute_uri(base_url) if request else base_url
+
+    @classmethod
+    def values_fields(cls, fields):
+        """
+        Columns to pass to QuerySet.values() for the requested output fields.
+        """
+        columns = {cls.url_fields.get(field, field) for field in fields}
+        return sorted(columns)
+
+    def to_representation(self, row):
+        data = {}
+        for field in self.selected:
+            if field in self.url_fields:
+                column = self.url_fields[field]
+                data[field] = self.url_prefixes[column] + filepath_to_uri(row[column]) if row[column] else None
+            elif field in self.datetime_fields:
+                data[field] = self.datetime_field.to_representation(row[field]) if row[field] else None
+            else:
+                data[field] = row[field]
+        return data
+
+class FileChangesSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer for the result of FileChange.objects.since().
+    Adds the listing fields of created and updated files, read in one query.
+    """
+
+    def to_representation(self, result):
+        if result.get('resync'):
+            return result
+        listing = FileListSerializer(context=self.context)
+        ids = [change['file_id'] for change in result['changes'] if change['action'] != 'deleted']
+        rows = {
+            row['id']: row for row in File.objects.filter(id__in=ids).values(
+                *FileListSerializer.values_fields(FileListSerializer.available_fields)
+            )
+        }
+        changes = []
+        for change in result['changes']:
+            row = rows.get(change['file_id'])
+            changes.append({**change, 'data': listing.to_representation(row) if row else {}})
+        return {'seq': result['seq'], 'changes': changes}
+
+class BulkFileIdsSerializer(serializers.Serializer):
+    """
+    Validates the file ids of a bulk request (at most FILE_BULK_MAX_ITEMS).
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.FILE_BULK_MAX_ITEMS,
+    )
+
+class BulkRenameItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    name = serializers.CharField(max_length=255)
+
+class BulkRenameSerializer(serializers.Serializer):
+    """
+    Validates a bulk rename: a list of {id, name} pairs.
+    """
+    files = BulkRenameItemSerializer(many=True, allow_empty=False, max_length=settings.FILE_BULK_MAX_ITEMS)
+
+    def validate_files(self, value):
+        return {item['id']: item['name'] for item in value}
+
+class SharedLinkSerializer(serializers.ModelSerializer):
+    """
+    Shared link of a file and its limits: optional expiry and number of downloads.
+    `shared_link` is the public download URL with the compact token.
+    """
+    shared_link = serializers.SerializerMethodField()
+    expires_at = serializers.DateTimeField(source='shared_link_expires_at', required=False, allow_null=True)
+    max_downloads = serializers.IntegerField(
+        source='shared_link_max_downloads', min_value=1, required=False, allow_null=True
+    )
+    downloads = serializers.IntegerField(source='shared_link_downloads', read_only=True)
+    rotate = serializers.BooleanField(write_only=True, required=False, default=False)
+
+    class Meta:
+        model = File
+        fields = ['shared_link', 'expires_at', 'max_downloads', 'downloads', 'rotate']
+
+    def get_shared_link(self, obj):
+        if not obj.shared_link:
+            return None
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(obj.get_shared_url())
+        return obj.get_shared_url()
+
+    def validate_expires_at(self, value):
+        if value is not None and value <= now():
+            raise serializers.ValidationError("Expiry must be in the future.")
+        return value
+
+    def update(self, instance, validated_data):
+        """
+        Applies the limits. A new token is issued when `rotate` is set or the
+        link was revoked; links handed out before stop working, the download
+        count starts over and an expiry that has passed is cleared.
+        """
+        previous = instance.shared_link
+        if validated_data.pop('rotate', False) or not instance.shared_link:
+            instance.shared_link = uuid.uuid4()
+            instance.shared_link_downloads = 0
+            if instance.shared_link_expires_at and instance.shared_link_expires_at <= now():
+                instance.shared_link_expires_at = None
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[
+            'shared_link', 'shared_link_expires_at', 'shared_link_max_downloads', 'shared_link_downloads'
+        ])
+        if previous != instance.shared_link:
+            revoke_shared_links([previous])
+        else:
+            forget_shared_links([previous])
+        return instance
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for resumable upload sessions.
+    The client declares name and total size up front and then sends chunks
+    starting at the returned offset.
+    """
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'name', 'comment', 'size', 'offset', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'offset', 'created_at', 'expires_at']
+
+    def create(self, validated_data):
+        """
+        Creates the session for the current user and reserves its storage path.
+        """
+        validated_data['user'] = self.context['request'].user
+        return super().create(validated_data)
@@ -0,0 +1,184 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.urls import reverse
+from django.utils.timezone import now
+from django_redis import get_redis_connection
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .delivery import FileMetadata, if_range_matches, parse_range_header
+from .models import SIGNED_SHARED_LINKS_KEY, File, shared_link_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Everything serve_file and the link checks need, so a cached link is served
+# without loading the File row.
+CACHED_FIELDS = (
+    'id', 'user_id', 'name', 'file', 'size', 'content_encoding', 'mime_type',
+    'shared_link_expires_at', 'shared_link_max_downloads',
+)
+
+class SharedLinkGone(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'This shared link has expired.'
+    default_code = 'shared_link_gone'
+
+class SigningNotConfigured(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Signed URLs are not configured.'
+    default_code = 'signing_not_configured'
+
+def share_token(link):
+    """
+    Compact URL token of a shared link: the 16 bytes of its UUID in unpadded
+    base64url, 22 characters instead of 36.
+    """
+    return base64.urlsafe_b64encode(link.bytes).decode().rstrip('=')
+
+def parse_share_token(token):
+    """
+    Returns the UUID of a compact token or of the 36-character form of links
+    handed out earlier; None if the token is malformed.
+    """
+    try:
+        if len(token) == 22:
+            return uuid.UUID(bytes=base64.urlsafe_b64decode(f"{token}=="))
+        if len(token) == 36:
+            return uuid.UUID(token)
+    except (ValueError, binascii.Error):
+        pass
+    return None
+
+def resolve_shared_file(token):
+    """
+    Returns the File a shared link token points to, or None.
+    Read through the cache: a hot link is answered from Redis alone, with the
+    File rebuilt unsaved from the cached fields. Unknown tokens are cached for
+    a short time as well, so guessing does not reach the database.
+    Raises SharedLinkGone once the link has expired.
+    """
+    link = parse_share_token(token)
+    if link is None:
+        return None
+    key = shared_link_cache_key(link)
+    fields = cache.get(key)
+    if fields is None:
+        fields = File.objects.filter(shared_link=link).values(*CACHED_FIELDS).first() or {}
+        ttl = settings.SHARED_LINK_CACHE_TTL if fields else settings.SHARED_LINK_MISS_CACHE_TTL
+        cache.set(key, fields, ttl)
+    if not fields:
+        return None
+    expires_at = fields['shared_link_expires_at']
+    if expires_at is not None and expires_at <= now():
+        raise SharedLinkGone()
+    return File(shared_link=link, **fields)
+
+def count_shared_download(request, file):
+    """
+    Counts a download through a link with a download limit and raises
+    SharedLinkGone once the limit is used up. The count is taken with one
+    conditional UPDATE, so concurrent downloads cannot exceed the limit.
+    Only responses that deliver the start of the file are counted: a full
+    body, or a range covering byte 0. Range requests that resume a download
+    and HEAD requests are not. Links without a limit are not counted and need
+    no query.
+    """
+    limit = file.shared_link_max_downloads
+    if not limit or not delivers_start(request, file):
+        return
+    counted = File.objects.filter(
+        shared_link=file.shared_link, shared_link_downloads__lt=limit
+    ).update(shared_link_downloads=F('shared_link_downloads') + 1)
+    if not counted:
+        logger.info(f"Shared link of file ID {file.id} reached its download limit")
+        raise SharedLinkGone('This shared link has reached its download limit.')
+
+def delivers_start(request, file):
+    """
+    Whether serve_file answers the request with the first byte of the file,
+    decided from the parsed ranges the same way serve_file honours them.
+    """
+    if request.method == 'HEAD':
+        return False
+    ranges = parse_range_header(request.headers.get('Range'), file.size or 0)
+    if ranges is None:
+        return True
+    if not ranges:
+        return False
+    if ranges[0][0] == 0:
+        return True
+    # A stale If-Range gets the full body instead of the ranges
+    return 'If-Range' in request.headers and not if_range_matches(request, FileMetadata(file))
+
+def shared_cache_control(file):
+    """
+    Cache-Control of a shared download: public for SHARED_FILE_CACHE_MAX_AGE,
+    at most until the link expires, and not stored at all when downloads are
+    limited, since a cached copy would hand the file out without counting.
+    """
+    if file.shared_link_max_downloads:
+        return 'private, no-store'
+    max_age = settings.SHARED_FILE_CACHE_MAX_AGE
+    if file.shared_link_expires_at is not None:
+        max_age = min(max_age, int((file.shared_link_expires_at - now()).total_seconds()))
+    return f'public, max-age={max(max_age, 0)}'
+
+def share_signature(token, expires):
+    """
+    HMAC-SHA256 of "<token>/<expires>" under FILE_SIGNING_KEY, in unpadded
+    base64url. The edge computes the same value to check signed URLs itself.
+    Raises SigningNotConfigured while FILE_SIGNING_KEY is unset.
+    """
+    if not settings.FILE_SIGNING_KEY:
+        raise SigningNotConfigured()
+    digest = hmac.new(
+        settings.FILE_SIGNING_KEY.encode(), f"{token}/{expires}".encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+def verify_share_signature(token, expires, signature):
+    """
+    True if the signed URL has not expired and its signature matches.
+    Always False while FILE_SIGNING_KEY is unset.
+    """
+    if not settings.FILE_SIGNING_KEY or expires <= time.time():
+        return False
+    return hmac.compare_digest(share_signature(token, expires), signature)
+
+def sign_shared_file(file, ttl=None):
+    """
+    Returns the path and expiry (Unix time) of a signed URL of the file's
+    shared link, valid for `ttl` seconds (FILE_SIGNED_URL_TTL by default).
+    The expiry is rounded up to FILE_SIGNED_URL_BUCKET, so a link signed many
+    times within a bucket gets one URL that the edge caches once; it never
+    outlasts the link's own expiry. The link is recorded with the expiry so
+    revoking it later puts it on the edge revocation list.
+    Raises SigningNotConfigured while FILE_SIGNING_KEY is unset.
+    """
+    if not settings.FILE_SIGNING_KEY:
+        raise SigningNotConfigured()
+    bucket = settings.FILE_SIGNED_URL_BUCKET
+    expires = -(-(int(time.time()) + (ttl or settings.FILE_SIGNED_URL_TTL)) // bucket) * bucket
+    if file.shared_link_expires_at is not None:
+        expires = min(expires, int(file.shared_link_expires_at.timestamp()))
+    token = share_token(file.shared_link)
+    get_redis_connection('default').zadd(SIGNED_SHARED_LINKS_KEY, {str(file.shared_link): expires}, gt=True)
+    path = reverse('file-signed', kwargs={
+        'token': token, 'expires': expires, 'signature': share_signature(token, expires),
+    })
+    return path, expires
+
+def signed_cache_control(expires):
+    """
+    Cache-Control of a signed URL: public and immutable until it expires.
+    The file behind a URL never changes; a revoked link stops at the edge
+    through the revocation list, and at the origin since it no longer resolves.
+    """
+    return f'public, max-age={max(int(expires - time.time()), 0)}, immutable'
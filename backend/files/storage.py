@@ -0,0 +1,442 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, Storage, storages
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+def get_file_storage():
+    """
+    Returns the storage backend configured for File.file (STORAGES['files']).
+    Used as a callable so the backend can be switched without a migration.
+    """
+    return storages['files']
+
+def delete_stored_files(names, workers=None, storage=None):
+    """
+    Removes stored content for the given storage names with a bounded thread pool.
+    Names are looked up in the File storage unless another storage is given.
+    Every worker closes its own database connection when done, since releasing
+    deduplicated blobs touches the Blob table.
+    Returns the number of names removed without error.
+    """
+    storage = storage or get_file_storage()
+    workers = max(1, min(workers or settings.STORAGE_DELETE_WORKERS, len(names)))
+
+    def remove(batch):
+        removed = 0
+        try:
+            for name in batch:
+                try:
+                    storage.delete(name)
+                    removed += 1
+                except Exception as e:
+                    logger.error(f"Error removing stored file {name}: {str(e)}")
+        finally:
+            connection.close()
+        return removed
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(remove, [names[i::workers] for i in range(workers)]))
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Deduplicating storage backend.
+    Content is stored once per SHA-256 digest under blobs/<aa>/<bb>/<digest>
+    and reference-counted through the Blob model. Names outside the blob area
+    (files uploaded before deduplication was enabled) behave as in FileSystemStorage.
+    """
+    blob_prefix = 'blobs'
+    chunk_size = 64 * 2 ** 10
+
+    def blob_name(self, digest):
+        """Storage name of the blob holding content with the given digest."""
+        return f"{self.blob_prefix}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(f"{self.blob_prefix}/")
+
+    def _save(self, name, content):
+        """
+        Hashes the content while it streams and stores it only if the digest is new.
+        Small uploads are hashed in memory and spooled uploads in place, so duplicates
+        are never written; anything else is written once to a staging file and renamed.
+        """
+        hasher = hashlib.sha256()
+        staging_path = None
+        if hasattr(content, 'temporary_file_path'):
+            for chunk in content.chunks():
+                hasher.update(chunk)
+            source_path = content.temporary_file_path()
+        elif not content.multiple_chunks():
+            for chunk in content.chunks():
+                hasher.update(chunk)
+            source_path = None
+        else:
+            source_path = staging_path = self._stage(content, hasher)
+
+        digest = hasher.hexdigest()
+        blob_name = self.blob_name(digest)
+        blob_exists = self.retain(digest, content.size)
+        try:
+            if blob_exists and self.exists(blob_name):
+                if staging_path:
+                    os.remove(staging_path)
+                logger.debug(f"Deduplicated upload {name} as {blob_name}")
+                return blob_name
+            if source_path is None:
+                content.seek(0)
+                source_path = self._stage(content)
+            os.makedirs(os.path.dirname(self.path(blob_name)), exist_ok=True)
+            file_move_safe(source_path, self.path(blob_name), allow_overwrite=True)
+            return blob_name
+        except Exception:
+            self.release(digest)
+            raise
+
+    def _stage(self, content, hasher=None):
+        """
+        Writes content to a staging file next to the blobs so it can be renamed into place.
+        """
+        staging_dir = self.path(f"{self.blob_prefix}/tmp")
+        os.makedirs(staging_dir, exist_ok=True)
+        fd, staging_path = tempfile.mkstemp(dir=staging_dir)
+        with os.fdopen(fd, 'wb') as staging:
+            for chunk in content.chunks():
+                if hasher is not None:
+                    hasher.update(chunk)
+                staging.write(chunk)
+        return staging_path
+
+    def ingest(self, name):
+        """
+        Moves an already written file (e.g. a completed upload session) into the
+        blob area without copying it. Returns the blob name.
+        """
+        if self.is_blob(name):
+            return name
+        path = self.path(name)
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(self.chunk_size), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        blob_name = self.blob_name(digest)
+        if self.retain(digest, os.path.getsize(path)) and self.exists(blob_name):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(self.path(blob_name)), exist_ok=True)
+            os.replace(path, self.path(blob_name))
+        return blob_name
+
+    def retain(self, digest, size):
+        """
+        Adds a reference to the blob. Returns True if the blob was already known.
+        """
+        Blob = apps.get_model('files', 'Blob')
+        with transaction.atomic():
+            blob, created = Blob.objects.select_for_update().get_or_create(
+                digest=digest, defaults={'size': size, 'ref_count': 1}
+            )
+            if not created:
+                Blob.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+        return not created
+
+    def release(self, digest):
+        """
+        Drops a reference to the blob and removes its content with the last one.
+        The content is removed while the row is still locked so a concurrent
+        upload of the same digest waits and writes it again.
+        """
+        Blob = apps.get_model('files', 'Blob')
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(pk=digest).first()
+            if blob is not None and blob.ref_count > 1:
+                Blob.objects.filter(pk=digest).update(ref_count=F('ref_count') - 1)
+                return False
+            if blob is not None:
+                blob.delete()
+            super().delete(self.blob_name(digest))
+        return True
+
+    def delete(self, name):
+        """
+        Releases a blob reference instead of deleting shared content outright.
+        """
+        if not self.is_blob(name):
+            return super().delete(name)
+        self.release(os.path.basename(name))
+
+class S3ObjectReader(io.RawIOBase):
+    """
+    Seekable read-only stream over an S3 object. Reads continue one open-ended
+    ranged GET, which is only reissued after a seek, so streaming a whole
+    object or a range of it costs a single request.
+    """
+
+    def __init__(self, client, bucket_name, key):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.position = 0
+        self.body = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.client.head_object(Bucket=self.bucket_name, Key=self.key)['ContentLength']
+        if offset != self.position:
+            self._close_body()
+            self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        if self.body is None:
+            try:
+                response = self.client.get_object(
+                    Bucket=self.bucket_name, Key=self.key, Range=f"bytes={self.position}-"
+                )
+            except self.client.exceptions.ClientError as e:
+                if e.response['Error']['Code'] == 'InvalidRange':
+                    return 0
+                if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                    raise FileNotFoundError(self.key) from e
+                raise
+            self.body = response['Body']
+        data = self.body.read(len(buffer))
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def _close_body(self):
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+
+    def close(self):
+        self._close_body()
+        super().close()
+
+class S3Storage(Storage):
+    """
+    Storage backend for an S3-compatible object store (AWS S3, MinIO), used as
+    the cold tier of TieredStorage (STORAGES['cold']). Names map to keys under
+    `prefix` and are overwritten rather than renamed. The modification time of
+    uploaded local files is kept in the object metadata, so ETags built from it
+    do not change when content moves between tiers. Needs boto3.
+    """
+    buffer_size = 1024 * 2 ** 10
+
+    def __init__(self, bucket_name, endpoint_url=None, access_key=None, secret_key=None,
+                 region_name=None, prefix='', max_pool_connections=None):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client(
+            's3',
+            # Empty settings fall back to boto3's own configuration (environment, instance role)
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region_name or None,
+            config=Config(max_pool_connections=max_pool_connections or settings.STORAGE_DELETE_WORKERS),
+        )
+
+    def key(self, name):
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket_name, Key=self.key(name))
+        except self.client.exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                raise FileNotFoundError(name) from e
+            raise
+
+    def _open(self, name, mode='rb'):
+        if mode != 'rb':
+            raise ValueError("S3Storage files can only be opened for reading")
+        reader = S3ObjectReader(self.client, self.bucket_name, self.key(name))
+        return File(io.BufferedReader(reader, buffer_size=self.buffer_size), name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        self.client.upload_fileobj(content, self.bucket_name, self.key(name))
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def exists(self, name):
+        try:
+            self._head(name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def stat(self, name):
+        """
+        (size, modification time) of an object, from a single HEAD request.
+        """
+        head = self._head(name)
+        mtime_ns = head.get('Metadata', {}).get('mtime-ns')
+        if mtime_ns is None:
+            return head['ContentLength'], head['LastModified']
+        # Same float as os.stat().st_mtime of the uploaded file
+        seconds, nanoseconds = divmod(int(mtime_ns), 10 ** 9)
+        return head['ContentLength'], datetime.fromtimestamp(seconds + nanoseconds * 1e-9, tz=timezone.utc)
+
+    def size(self, name):
+        return self.stat(name)[0]
+
+    def get_modified_time(self, name):
+        return self.stat(name)[1]
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket_name, Key=self.key(name))
+
+    def upload(self, name, path):
+        """
+        Uploads a local file (multipart when large), keeping its modification time.
+        """
+        mtime_ns = os.stat(path).st_mtime_ns
+        self.client.upload_file(
+            path, self.bucket_name, self.key(name), ExtraArgs={'Metadata': {'mtime-ns': str(mtime_ns)}}
+        )
+
+    def download(self, name, path):
+        """
+        Downloads an object to a local file (in parallel parts when large).
+        Returns the modification time recorded at upload in nanoseconds, or None.
+        """
+        head = self._head(name)
+        self.client.download_file(self.bucket_name, self.key(name), path)
+        mtime_ns = head.get('Metadata', {}).get('mtime-ns')
+        return int(mtime_ns) if mtime_ns is not None else None
+
+class TieredStorage(FileSystemStorage):
+    """
+    Local disk as the hot tier in front of a cold object store (STORAGES['cold']).
+    Content keeps its storage name on either tier: reads and metadata look on
+    local disk first and come from the cold tier otherwise. Which tier holds a
+    name is known from local disk and File.storage_tier, so existence checks and
+    deletes of hot content make no requests to the cold tier.
+    files.tiering moves content between the tiers.
+    """
+
+    @cached_property
+    def cold(self):
+        return storages['cold']
+
+    def is_hot(self, name):
+        return os.path.exists(self.path(name))
+
+    def _open(self, name, mode='rb'):
+        if mode != 'rb' or self.is_hot(name):
+            return super()._open(name, mode)
+        return self.cold.open(name, mode)
+
+    def exists(self, name):
+        """
+        Local content, or content of a file marked cold. Names on the cold
+        tier without a file (left by an interrupted move) are not reported.
+        """
+        if super().exists(name):
+            return True
+        File = apps.get_model('files', 'File')
+        return File.objects.filter(file=name, storage_tier=File.COLD).exists()
+
+    def stat(self, name):
+        """
+        (size, modification time, on local disk) of the stored content,
+        from one stat() or one request to the cold tier.
+        """
+        try:
+            result = os.stat(self.path(name))
+        except FileNotFoundError:
+            return (*self.cold.stat(name), False)
+        return result.st_size, self._datetime_from_timestamp(result.st_mtime), True
+
+    def size(self, name):
+        return self.stat(name)[0]
+
+    def get_modified_time(self, name):
+        return self.stat(name)[1]
+
+    def delete(self, name):
+        """
+        Removes the content from the tier holding it. files.tiering removes
+        the other copy of content deleted while it is being moved.
+        """
+        if self.is_hot(name):
+            super().delete(name)
+        else:
+            self.cold.delete(name)
+
+    def demote(self, name):
+        """
+        Copies local content to the cold tier; the local copy stays until
+        remove_local. Returns the number of bytes copied.
+        """
+        path = self.path(name)
+        self.cold.upload(name, path)
+        return os.path.getsize(path)
+
+    def recall(self, name):
+        """
+        Copies cold content back to local disk through a temporary file that is
+        renamed into place, with its original modification time; the cold copy
+        stays until remove_cold. Returns the number of bytes copied.
+        """
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.recall-')
+        os.close(fd)
+        try:
+            mtime_ns = self.cold.download(name, temporary)
+            if mtime_ns is not None:
+                os.utime(temporary, ns=(mtime_ns, mtime_ns))
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return os.path.getsize(path)
+
+    def remove_local(self, name):
+        super().delete(name)
+
+    def remove_cold(self, name):
+        self.cold.delete(name)
+
+class TieredContentAddressedStorage(ContentAddressedStorage, TieredStorage):
+    """
+    ContentAddressedStorage on TieredStorage: blobs move between the tiers as a
+    whole, and releasing the last reference removes them from both.
+    """
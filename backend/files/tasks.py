@@ -1,40 +1,488 @@
-from celery import shared_task
-from datetime import timedelta
-from django.utils.timezone import now
-from .models import File
-import logging
-
-logger = logging.getLogger(__name__)
-
-@shared_task
-def delete_old_files():
-    """
-    Deletes files whose lifetime has exceeded 30 days.
-    Runs automatically via Celery beat schedule.
-    """
-    try:
-        cutoff_date = now() - timedelta(days=30)
-        deleted_count, _ = File.objects.filter(uploaded_at__lt=cutoff_date).delete()
-        logger.info(f"Successfully deleted {deleted_count} old files")
-        return deleted_count
-    except Exception as e:
-        logger.error(f"Error deleting old files: {str(e)}")
-        raise
-
-@shared_task
-def process_file(file_id):
-    """
-    Minimal file processing task.
-    Currently just logs the file receipt.
-    Can be extended with actual processing logic later.
-    """
-    try:
-        logger.info(f"File {file_id} received for processing")
-        return {
-            "status": "success",
-            "file_id": file_id,
-            "message": "File processing completed (mock)"
-        }
-    except Exception as e:
-        logger.error(f"Error processing file {file_id}: {str(e)}")
-        raise
\ No newline at end of file
+from celery import shared_task
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils.timezone import now
+from django.core.files.storage import default_storage
+from django_redis import get_redis_connection
+from redis.exceptions import LockNotOwnedError
+from .counters import flush_download_counters
+from .events import notify_file_change
+from .models import (
+    REVOKED_SHARED_LINKS_KEY,
+    SIGNED_SHARED_LINKS_KEY,
+    Blob,
+    ChangeSequence,
+    File,
+    FileChange,
+    StorageTombstone,
+    StorageUsage,
+    UploadSession,
+    forget_shared_links,
+)
+from .processing import run_pipeline
+from .serializers import FileSerializer
+from .sharing import share_token
+from .storage import delete_stored_files, get_file_storage
+from .tiering import apply_tiering
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+def expired_file_keys(cutoff, last_key=None):
+    """
+    (auto_deleted_at, id) keys of the files expired at `cutoff`, in keyset
+    order after `last_key`. Served by files_file_expiry_idx.
+    """
+    expired = File.objects.filter(auto_deleted_at__lte=cutoff)
+    if last_key:
+        expired = expired.filter(
+            Q(auto_deleted_at__gt=last_key[0]) |
+            Q(auto_deleted_at=last_key[0], id__gt=last_key[1])
+        )
+    return expired.order_by('auto_deleted_at', 'id').values_list('auto_deleted_at', 'id')
+
+def blob_references(names):
+    """
+    (name, number of files) of the given blob names that files reference,
+    counted through the index on File.file.
+    """
+    return File.objects.filter(file__in=names).values('file').annotate(refs=Count('id')).values_list('file', 'refs')
+
+@shared_task(bind=True)
+def delete_old_files(self, batch_size=None):
+    """
+    Deletes files whose auto_deleted_at has passed.
+    Walks the expiry index in keyset order (auto_deleted_at, id) and deletes
+    bounded batches, each in its own short transaction; stored content is
+    removed in parallel after every commit. Reports progress as task state.
+    Runs automatically via Celery beat schedule.
+    """
+    batch_size = batch_size or settings.FILE_EXPIRY_BATCH_SIZE
+    cutoff = now()
+    started = time.monotonic()
+    deleted_count = batches = 0
+    last_key = None
+    try:
+        while True:
+            keys = list(expired_file_keys(cutoff, last_key)[:batch_size])
+            if not keys:
+                break
+            with transaction.atomic():
+                deleted_count += File.objects.filter(
+                    id__in=[key[1] for key in keys], auto_deleted_at__lte=cutoff
+                ).purge()
+            last_key = keys[-1]
+            batches += 1
+            progress = {
+                "deleted": deleted_count,
+                "batches": batches,
+                "seconds": round(time.monotonic() - started, 2),
+            }
+            if self.request.id:
+                self.update_state(state='PROGRESS', meta=progress)
+            logger.debug(f"Expiry progress: {progress}")
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Successfully deleted {deleted_count} expired files in {batches} batches "
+            f"({elapsed:.1f}s, {deleted_count / elapsed if elapsed else 0:.0f} files/s)"
+        )
+        return {"deleted": deleted_count, "batches": batches, "seconds": round(elapsed, 2)}
+    except Exception as e:
+        logger.error(f"Error deleting old files: {str(e)}")
+        raise
+
+@shared_task
+def process_file(file_id):
+    """
+    Runs the processing pipeline over the stored content of a file: checksum,
+    MIME type, thumbnail and compression in a single read (see FILE_PROCESSING_STAGES).
+    The metadata is saved only if the file still has the processed content,
+    and the owner's sessions are notified of the update. Compressed content
+    replaces the original, which is removed after commit.
+    """
+    try:
+        file = File.objects.filter(pk=file_id).first()
+        if file is None or not file.file:
+            logger.info(f"File {file_id} no longer exists, skipping processing")
+            return {"status": "skipped", "file_id": file_id}
+
+        started = time.monotonic()
+        metadata = run_pipeline(file)
+        previous_thumbnail = file.thumbnail.name or None
+        thumbnail = metadata.pop('thumbnail', None)
+        metadata['thumbnail'] = None
+        if thumbnail is not None:
+            file.thumbnail.save(thumbnail.name, thumbnail, save=False)
+            metadata['thumbnail'] = file.thumbnail.name
+        compressed = metadata.pop('compressed', None)
+        original_name = file.file.name
+        if compressed is not None:
+            storage = file.file.storage
+            with compressed:
+                metadata['file'] = storage.save(
+                    f"{os.path.dirname(original_name)}/{compressed.name}", compressed,
+                    max_length=File._meta.get_field('file').max_length,
+                )
+        metadata['processed_at'] = now()
+
+        with transaction.atomic():
+            updated = File.objects.filter(pk=file_id, file=original_name).update(**metadata)
+            if updated:
+                file = File.objects.get(pk=file_id)
+                forget_shared_links([file.shared_link])
+                notify_file_change(file.user_id, file_id, 'updated', FileSerializer(file).data)
+                if compressed is not None:
+                    transaction.on_commit(lambda: storage.delete(original_name))
+        if not updated:
+            # Deleted or replaced while processing
+            if thumbnail is not None:
+                default_storage.delete(metadata['thumbnail'])
+            if compressed is not None:
+                storage.delete(metadata['file'])
+            logger.info(f"File {file_id} changed during processing, result discarded")
+            return {"status": "skipped", "file_id": file_id}
+        if previous_thumbnail and previous_thumbnail != metadata['thumbnail']:
+            default_storage.delete(previous_thumbnail)
+
+        elapsed = time.monotonic() - started
+        logger.info(f"Processed file {file_id} in {elapsed:.2f}s")
+        return {
+            "status": "success",
+            "file_id": file_id,
+            "sha256": file.sha256,
+            "mime_type": file.mime_type,
+            "thumbnail": file.thumbnail.name or None,
+            "content_encoding": file.content_encoding,
+            "stored_size": file.stored_size,
+        }
+    except Exception as e:
+        logger.error(f"Error processing file {file_id}: {str(e)}")
+        raise
+
+@shared_task
+def delete_expired_upload_sessions():
+    """
+    Discards upload sessions that have not received a chunk within
+    UPLOAD_SESSION_TTL_HOURS, together with their partially written data.
+    """
+    try:
+        expired = UploadSession.objects.filter(expires_at__lt=now())
+        discarded_count = 0
+        for session in expired.iterator():
+            session.discard()
+            discarded_count += 1
+        logger.info(f"Discarded {discarded_count} expired upload sessions")
+        return discarded_count
+    except Exception as e:
+        logger.error(f"Error discarding expired upload sessions: {str(e)}")
+        raise
+
+
+@shared_task
+def reconcile_blob_references(grace_hours=1, batch_size=None):
+    """
+    Repairs deduplicated blob reference counts from the File table.
+    Counts that are too low are raised; blobs no File references any more are
+    removed once they are older than the grace period (in-flight uploads hold
+    a reference before their File row exists).
+    Blobs are walked in digest order in batches; the references of each batch
+    are counted through the index on File.file, so no pass reads the whole table.
+    """
+    storage = File._meta.get_field('file').storage
+    if not hasattr(storage, 'release'):
+        logger.info("Content-addressed storage is disabled, nothing to reconcile")
+        return {"raised": 0, "removed": 0}
+    batch_size = batch_size or settings.BLOB_RECONCILE_BATCH_SIZE
+    try:
+        grace_cutoff = now() - timedelta(hours=grace_hours)
+        raised = removed = 0
+        last_digest = ''
+        while True:
+            blobs = list(Blob.objects.filter(digest__gt=last_digest).order_by('digest')[:batch_size])
+            if not blobs:
+                break
+            last_digest = blobs[-1].digest
+            references = dict(blob_references([storage.blob_name(blob.digest) for blob in blobs]))
+            for blob in blobs:
+                refs = references.get(storage.blob_name(blob.digest), 0)
+                if refs > blob.ref_count:
+                    Blob.objects.filter(pk=blob.pk, ref_count__lt=refs).update(ref_count=refs)
+                    raised += 1
+                elif refs == 0 and blob.created_at < grace_cutoff:
+                    with transaction.atomic():
+                        locked = Blob.objects.select_for_update().filter(
+                            pk=blob.pk, ref_count=blob.ref_count
+                        ).first()
+                        if locked is None or File.objects.filter(file=storage.blob_name(blob.digest)).exists():
+                            continue
+                        Blob.objects.filter(pk=blob.pk).update(ref_count=1)
+                        storage.release(blob.digest)
+                    removed += 1
+        logger.info(f"Reconciled blobs: {raised} counts raised, {removed} unreferenced removed")
+        return {"raised": raised, "removed": removed}
+    except Exception as e:
+        logger.error(f"Error reconciling blob references: {str(e)}")
+        raise
+
+@shared_task
+def reconcile_storage_usage(batch_size=None):
+    """
+    Recomputes per-user storage usage from files_file and corrects drifted counters.
+    Users are processed in id batches; each batch locks its usage rows first,
+    so concurrent uploads either commit before the sums are taken or wait for
+    the batch to finish and then apply their delta on top.
+    Sums are taken per user (LATERAL) so every batch reads only its users'
+    files through the (user, ...) index instead of hashing the whole table.
+    """
+    batch_size = batch_size or settings.STORAGE_USAGE_RECONCILE_BATCH_SIZE
+    User = get_user_model()
+    users_table = connection.ops.quote_name(User._meta.db_table)
+    usage_table = connection.ops.quote_name(StorageUsage._meta.db_table)
+    file_table = connection.ops.quote_name(File._meta.db_table)
+    corrected = 0
+    last_id = 0
+    try:
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            with transaction.atomic():
+                list(StorageUsage.objects.select_for_update().filter(user_id__in=user_ids).values_list('pk'))
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"INSERT INTO {usage_table} (user_id, bytes, files, updated_at) "
+                        f"SELECT owner.id, COALESCE(f.bytes, 0), f.files, NOW() "
+                        f"FROM {users_table} AS owner "
+                        f"CROSS JOIN LATERAL ("
+                        f"SELECT SUM(size) AS bytes, COUNT(*) AS files "
+                        f"FROM {file_table} WHERE user_id = owner.id"
+                        f") AS f "
+                        f"WHERE owner.id = ANY(%s) "
+                        f"ON CONFLICT (user_id) DO UPDATE "
+                        f"SET bytes = EXCLUDED.bytes, files = EXCLUDED.files, updated_at = EXCLUDED.updated_at "
+                        f"WHERE ({usage_table}.bytes, {usage_table}.files) "
+                        f"IS DISTINCT FROM (EXCLUDED.bytes, EXCLUDED.files)",
+                        [user_ids],
+                    )
+                    corrected += cursor.rowcount
+        logger.info(f"Reconciled storage usage: {corrected} counters corrected")
+        return corrected
+    except Exception as e:
+        logger.error(f"Error reconciling storage usage: {str(e)}")
+        raise
+
+
+@shared_task
+def trim_file_changes(batch_size=None):
+    """
+    Removes change log entries older than FILE_CHANGES_RETENTION_HOURS in batches.
+    The highest removed sequence number of each user is recorded in the same
+    statement, so clients further behind are told to resync.
+    """
+    batch_size = batch_size or settings.FILE_EXPIRY_BATCH_SIZE
+    cutoff = now() - timedelta(hours=settings.FILE_CHANGES_RETENTION_HOURS)
+    change_table = connection.ops.quote_name(FileChange._meta.db_table)
+    sequence_table = connection.ops.quote_name(ChangeSequence._meta.db_table)
+    removed = 0
+    try:
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"WITH removed AS ("
+                    f"DELETE FROM {change_table} WHERE id IN ("
+                    f"SELECT id FROM {change_table} WHERE created_at < %s "
+                    f"ORDER BY created_at LIMIT %s"
+                    f") RETURNING user_id, seq"
+                    f"), trimmed AS ("
+                    f"UPDATE {sequence_table} AS s SET trimmed = GREATEST(s.trimmed, r.seq) "
+                    f"FROM (SELECT user_id, MAX(seq) AS seq FROM removed GROUP BY user_id) AS r "
+                    f"WHERE s.user_id = r.user_id"
+                    f") SELECT COUNT(*) FROM removed",
+                    [cutoff, batch_size],
+                )
+                count = cursor.fetchone()[0]
+            removed += count
+            if count < batch_size:
+                break
+        logger.info(f"Trimmed {removed} file change log entries")
+        return removed
+    except Exception as e:
+        logger.error(f"Error trimming file change log: {str(e)}")
+        raise
+
+
+@shared_task
+def flush_download_stats():
+    """
+    Writes buffered download counters and timestamps from Redis to the database.
+    Runs every DOWNLOAD_STATS_FLUSH_INTERVAL seconds via Celery beat.
+    """
+    try:
+        return flush_download_counters()
+    except Exception as e:
+        logger.error(f"Error flushing download counters: {str(e)}")
+        raise
+
+@shared_task
+def export_share_revocations():
+    """
+    Writes the revoked shared links whose signed URLs have not all expired to
+    FILE_SHARE_REVOCATIONS_PATH as an nginx map include ("<token> 1;" lines),
+    so the edge refuses them instead of serving cached copies. Expired entries
+    are dropped first. The file is replaced atomically and only when it changes.
+    Runs every FILE_SHARE_REVOCATIONS_INTERVAL seconds via Celery beat.
+    Returns the number of revoked links.
+    """
+    try:
+        redis = get_redis_connection('default')
+        current = time.time()
+        pipe = redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(REVOKED_SHARED_LINKS_KEY, '-inf', current)
+        pipe.zremrangebyscore(SIGNED_SHARED_LINKS_KEY, '-inf', current)
+        pipe.zrange(REVOKED_SHARED_LINKS_KEY, 0, -1)
+        links = pipe.execute()[-1]
+        path = settings.FILE_SHARE_REVOCATIONS_PATH
+        if not path:
+            return len(links)
+        content = "".join(
+            f"{token} 1;\n" for token in sorted(share_token(uuid.UUID(link.decode())) for link in links)
+        )
+        try:
+            with open(path) as existing:
+                if existing.read() == content:
+                    return len(links)
+        except FileNotFoundError:
+            pass
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as output:
+            output.write(content)
+        os.replace(temporary, path)
+        logger.info(f"Exported {len(links)} revoked shared links to {path}")
+        return len(links)
+    except Exception as e:
+        logger.error(f"Error exporting shared link revocations: {str(e)}")
+        raise
+
+@shared_task
+def apply_storage_tiering(batch_size=None, max_bytes=None, bandwidth=None):
+    """
+    Moves content between the hot and cold tiers of a TieredStorage (see
+    files.tiering). Runs every FILE_TIERING_INTERVAL seconds via Celery beat;
+    a run still moving content when the next one starts makes that one skip.
+    """
+    storage = get_file_storage()
+    if not hasattr(storage, 'demote'):
+        return None
+    lock = get_redis_connection('default').lock('files:tiering:lock', timeout=3600, blocking=False)
+    if not lock.acquire():
+        logger.info("Storage tiering already running, skipping")
+        return None
+    try:
+        result = apply_tiering(storage, batch_size, max_bytes, bandwidth)
+        logger.info(
+            f"Storage tiering recalled {result['recalled'][0]} files ({result['recalled'][1]} bytes), "
+            f"demoted {result['demoted'][0]} files ({result['demoted'][1]} bytes)"
+        )
+        return result
+    except Exception as e:
+        logger.error(f"Error applying storage tiering: {str(e)}")
+        raise
+    finally:
+        try:
+            lock.release()
+        except LockNotOwnedError:
+            logger.warning("Storage tiering outlived its lock")
+
+@shared_task
+def remove_stored_files(names, location='files'):
+    """
+    Removes stored content of a deleted user's files in the background:
+    'files' from the File storage (releasing deduplicated blobs), 'thumbnails'
+    from the default storage and 'cold' from the cold storage tier. The local
+    upload tree itself is purged by purge_storage_tombstone.
+    """
+    storages = {
+        'files': get_file_storage,
+        'thumbnails': lambda: default_storage,
+        'cold': lambda: get_file_storage().cold,
+    }
+    try:
+        return delete_stored_files(names, storage=storages[location]())
+    except Exception as e:
+        logger.error(f"Error removing {len(names)} stored files ({location}): {str(e)}")
+        raise
+
+
+def _remove_path(path):
+    """Removes one file. Returns 0 if an earlier run already removed it."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return 1
+
+@shared_task(bind=True)
+def purge_storage_tombstone(self, tombstone_id, batch_size=None):
+    """
+    Removes a deleted user's tombstoned storage tree with a bounded thread pool.
+    Progress is saved after every batch; files already gone are skipped, so an
+    interrupted purge is simply run again by resume_storage_tombstones.
+    """
+    tombstone = StorageTombstone.objects.filter(pk=tombstone_id, completed_at__isnull=True).first()
+    if tombstone is None or not tombstone.move_aside():
+        return None
+    batch_size = batch_size or settings.FILE_EXPIRY_BATCH_SIZE
+    root = get_file_storage().path(tombstone.path)
+    try:
+        with ThreadPoolExecutor(max_workers=settings.STORAGE_DELETE_WORKERS) as pool:
+
+            def flush(paths):
+                tombstone.removed_files += sum(pool.map(_remove_path, paths))
+                tombstone.save(update_fields=['removed_files'])
+                if self.request.id:
+                    self.update_state(state='PROGRESS', meta={"removed": tombstone.removed_files})
+
+            batch = []
+            for dirpath, dirnames, filenames in os.walk(root):
+                for filename in filenames:
+                    batch.append(os.path.join(dirpath, filename))
+                    if len(batch) >= batch_size:
+                        flush(batch)
+                        batch = []
+            if batch:
+                flush(batch)
+
+        for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+            os.rmdir(dirpath)
+        tombstone.completed_at = now()
+        tombstone.save(update_fields=['completed_at'])
+        logger.info(f"Purged {tombstone.removed_files} files of deleted user {tombstone.username}")
+        return tombstone.removed_files
+    except Exception as e:
+        logger.error(f"Error purging tombstone {tombstone_id}: {str(e)}")
+        raise
+
+@shared_task
+def resume_storage_tombstones(stale_minutes=30):
+    """
+    Re-queues tombstones whose purge has not completed, e.g. after a worker restart.
+    """
+    stale = StorageTombstone.objects.filter(
+        completed_at__isnull=True, created_at__lt=now() - timedelta(minutes=stale_minutes)
+    )
+    tombstone_ids = list(stale.values_list('id', flat=True))
+    for tombstone_id in tombstone_ids:
+        purge_storage_tombstone.delay(tombstone_id)
+    logger.info(f"Re-queued {len(tombstone_ids)} storage tombstones")
+    return len(tombstone_ids)
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from . import events
+from .counters import _update_batch
+from .models import Blob, File, forget_shared_links
+from .serializers import FileSerializer
+from .sharing import share_signature, share_token
+from .tasks import blob_references, expired_file_keys, reconcile_storage_usage
+from .tiering import demotion_candidates, recall_candidates
+
+WORDS = (
+    'report', 'invoice', 'budget', 'holiday', 'photo', 'contract', 'draft', 'backup',
+    'scan', 'notes', 'slides', 'summary', 'receipt', 'design', 'video', 'archive',
+)
+EXTENSIONS = ('pdf', 'jpg', 'png', 'docx', 'xlsx', 'txt', 'zip', 'mp4')
+
+
+class QueryCountTests(TestCase):
+    """
+    The admin changelists, the list and search endpoints and the file
+    serializers run a fixed number of queries, however many files a page holds.
+    Rows are created without content, nothing is written to storage.
+    """
+    users_count = 5
+    files_count = 300
+    page_sizes = (5, 50)
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = User.objects.bulk_create(
+            User(username=f"user-{i}", email=f"user-{i}@example.com") for i in range(cls.users_count)
+        )
+        cls.admin_user = User.objects.create(
+            username='admin', email='admin@example.com', is_staff=True, is_superuser=True
+        )
+        File.objects.bulk_create((
+            File(
+                user=cls.users[i % len(cls.users)],
+                name=f"report-{i}.txt",
+                comment=f"quarterly report {i}",
+                file=f"uploads/{cls.users[i % len(cls.users)].username}/report-{i}.txt",
+                size=i,
+                shared_link=uuid.uuid4(),
+            )
+            for i in range(cls.files_count)
+        ), batch_size=5000)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin_user)
+
+    def assertQueriesPerPage(self, num, render):
+        """
+        Renders every page size after a warm-up request and asserts `num`
+        queries for each.
+        """
+        render(self.page_sizes[0])
+        for page_size in self.page_sizes:
+            with self.subTest(page_size=page_size), self.assertNumQueries(num):
+                response = render(page_size)
+                self.assertEqual(getattr(response, 'status_code', 200), 200)
+
+    def changelist(self, model, url):
+        model_admin = admin.site._registry[model]
+        self.addCleanup(setattr, model_admin, 'list_per_page', model_admin.list_per_page)
+        self.client.force_login(self.admin_user)
+
+        def render(page_size):
+            model_admin.list_per_page = page_size
+            return self.client.get(url, secure=True)
+        return render
+
+    def test_file_admin_changelist(self):
+        self.assertQueriesPerPage(3, self.changelist(File, '/admin/files/file/'))
+
+    def test_user_admin_changelist(self):
+        self.assertQueriesPerPage(4, self.changelist(get_user_model(), '/admin/users/customuser/'))
+
+    def test_file_list(self):
+        self.assertQueriesPerPage(1, lambda page_size: self.api.get(
+            '/api/files/', {'page_size': page_size}, secure=True
+        ))
+
+    def test_file_list_of_user(self):
+        self.api.force_authenticate(self.users[0])
+        self.assertQueriesPerPage(1, lambda page_size: self.api.get(
+            '/api/files/', {'page_size': page_size, 'ordering': 'auto_deleted_at'}, secure=True
+        ))
+
+    def test_search(self):
+        self.api.force_authenticate(self.users[0])
+        for mode in ('ranked', 'prefix', 'fuzzy'):
+            with self.subTest(mode=mode):
+                self.assertQueriesPerPage(1, lambda page_size: self.api.get(
+                    '/api/files/search/', {'q': 'report', 'mode': mode, 'page_size': page_size}, secure=True
+                ))
+
+    def test_file_serializer(self):
+        request = RequestFactory().get('/', secure=True)
+        request.user = self.admin_user
+
+        def render(page_size):
+            return FileSerializer(File.objects.all()[:page_size], many=True, context={'request': request}).data
+        self.assertQueriesPerPage(1, render)
+
+
+@skipUnless(os.environ.get('FILES_QUERY_BENCHMARK'), "set FILES_QUERY_BENCHMARK=1 to seed 50k files")
+class QueryCountBenchmarkTests(QueryCountTests):
+    """
+    QueryCountTests over 50k files and page sizes up to 1000, with the time of
+    every request reported. Opt-in, as seeding takes a while.
+    """
+    users_count = 100
+    files_count = 50000
+    page_sizes = (10, 100, 1000)
+
+    def assertQueriesPerPage(self, num, render):
+        def timed(page_size):
+            started = time.perf_counter()
+            response = render(page_size)
+            print(f"{self.id()} page={page_size} time={(time.perf_counter() - started) * 1000:.1f}ms")
+            return response
+        super().assertQueriesPerPage(num, timed)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Every files_file query of the API and the Celery tasks is planned on an
+    index. Seeds files with the spread of a live table, runs each path with
+    its queries captured and EXPLAINs those reading or writing files_file.
+    Tasks that remove stored content are not run; the statements they issue
+    are taken from the query helpers they use, and on-commit callbacks (where
+    deleted files' content would be removed) are discarded.
+    """
+    users_count = 200
+    files_count = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        storage = File._meta.get_field('file').storage
+        deduplicated = hasattr(storage, 'blob_name')
+        users = User.objects.bulk_create(
+            User(username=f"plans-{i}", email=f"plans-{i}@example.com") for i in range(cls.users_count)
+        )
+        current = now()
+
+        def digest(i):
+            return hashlib.sha256(f"plans-{i}".encode()).hexdigest()
+
+        def build(i):
+            user = users[i % len(users)]
+            return File(
+                user=user,
+                name=f"{WORDS[i % len(WORDS)]} {WORDS[i * 7 % len(WORDS)]} {i}.{EXTENSIONS[i % len(EXTENSIONS)]}",
+                comment=f"{WORDS[i * 3 % len(WORDS)]} notes" if i % 4 == 0 else None,
+                file=storage.blob_name(digest(i)) if deduplicated else f"uploads/{user.username}/file-{i}.bin",
+                size=i,
+                auto_deleted_at=current + timedelta(days=-1 if i % 200 == 0 else 1 + i % 365),
+                last_downloaded=current - timedelta(minutes=i) if i // len(users) % 10 == 1 else None,
+                shared_link=uuid.uuid4(),
+                storage_tier=File.COLD if i % 3 == 0 else File.HOT,
+                tier_changed_at=current - timedelta(days=2) if i % 3 == 0 else None,
+            )
+
+        File.objects.bulk_create((build(i) for i in range(cls.files_count)), batch_size=5000)
+        if deduplicated:
+            Blob.objects.bulk_create(
+                (Blob(digest=digest(i), size=i, ref_count=1) for i in range(cls.files_count)), batch_size=5000
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(File._meta.db_table)}")
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(User._meta.db_table)}")
+        cls.owner = users[0]
+        cls.admin_user = User.objects.create(
+            username='plans-admin', email='plans-admin@example.com', is_staff=True, is_superuser=True
+        )
+        cls.sample = list(File.objects.filter(user=cls.owner).order_by('id').values('id', 'file', 'shared_link')[:10])
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+
+    def explain(self, sql):
+        """Returns the flattened plan nodes of a statement (not executed)."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = []
+        pending = [plan[0]['Plan']]
+        while pending:
+            node = pending.pop()
+            nodes.append(node)
+            pending.extend(node.get('Plans', []))
+        return nodes
+
+    def assertIndexed(self, run):
+        """
+        Runs `run` in a rolled-back savepoint and asserts that it queries
+        files_file and that no statement scans files_file sequentially.
+        """
+        table = File._meta.db_table
+        pattern = re.compile(rf'\b{re.escape(table)}\b')
+        with self.captureOnCommitCallbacks(execute=False), transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                run()
+            transaction.set_rollback(True)
+        statements = [
+            query['sql'] for query in queries.captured_queries
+            if pattern.search(query['sql'])
+            and query['sql'].lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+        ]
+        self.assertTrue(statements, "No files_file queries")
+        for sql in statements:
+            with transaction.atomic():
+                try:
+                    nodes = self.explain(sql)
+                except DatabaseError as e:
+                    self.fail(f"Could not plan {sql[:300]}: {e}")
+            seq_scans = [
+                node for node in nodes if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table
+            ]
+            self.assertFalse(seq_scans, f"Sequential scan of {table}: {sql[:300]}")
+
+    def get(self, url, params=None):
+        return lambda: self.api.get(url, params, secure=True)
+
+    def next_page(self, params):
+        def request():
+            response = self.api.get('/api/files/', {'page_size': 2, **params}, secure=True)
+            self.assertEqual(response.status_code, 200)
+            self.api.get(response.json()['next'], secure=True)
+        return request
+
+    def test_list(self):
+        paths = {
+            'list': self.get('/api/files/'),
+            'list next page': self.next_page({}),
+            'list expiring': self.next_page({'ordering': 'auto_deleted_at'}),
+            'list downloaded': self.next_page({'ordering': '-last_downloaded'}),
+        }
+        for label, run in paths.items():
+            with self.subTest(label):
+                self.assertIndexed(run)
+
+    def test_list_staff(self):
+        self.api.force_authenticate(self.admin_user)
+        self.assertIndexed(self.get('/api/files/'))
+
+    def test_search(self):
+        paths = {
+            'ranked': {'q': 'budget report'},
+            'prefix': {'q': 'bud rep', 'mode': 'prefix'},
+            'fuzzy': {'q': 'budgte', 'mode': 'fuzzy'},
+        }
+        for mode, params in paths.items():
+            with self.subTest(mode):
+                self.assertIndexed(self.get('/api/files/search/', params))
+
+    def test_file_actions(self):
+        file_id = self.sample[0]['id']
+        ids = [file['id'] for file in self.sample]
+        paths = {
+            'retrieve': self.get(f'/api/files/{file_id}/'),
+            'download': self.get(f'/api/files/{file_id}/download/'),
+            'view': self.get(f'/api/files/{file_id}/view/'),
+            'download zip': self.get('/api/files/download_zip/', {'ids': ','.join(map(str, ids))}),
+            'bulk rename': lambda: self.api.post(
+                '/api/files/bulk_rename/', {'files': [{'id': file_id, 'name': 'renamed.txt'}]},
+                format='json', secure=True,
+            ),
+            'bulk delete': lambda: self.api.post('/api/files/bulk_delete/', {'ids': ids}, format='json', secure=True),
+        }
+        for label, run in paths.items():
+            with self.subTest(label):
+                self.assertIndexed(run)
+
+    @override_settings(FILE_SIGNING_KEY='plans-signing-key')
+    def test_shared_links(self):
+        link = self.sample[0]['shared_link']
+        token = share_token(link)
+        expires = int(time.time()) + 3600
+
+        def get(url):
+            def request():
+                # Resolve the link from the database, not from the cache
+                forget_shared_links([link])
+                self.api.get(url, secure=True)
+            return request
+
+        paths = {
+            'shared link download': get(f'/api/files/download/{token}/'),
+            'signed link view': get(f'/api/files/s/{token}/{expires}/{share_signature(token, expires)}/'),
+        }
+        for label, run in paths.items():
+            with self.subTest(label):
+                self.assertIndexed(run)
+
+    def test_tasks(self):
+        cutoff = now()
+        names = [file['file'] for file in self.sample]
+        paths = {
+            'expired files': lambda: list(expired_file_keys(cutoff, (cutoff - timedelta(days=2), 0))[:500]),
+            'purge expired files': lambda: File.objects.filter(
+                id__in=[key[1] for key in expired_file_keys(cutoff)[:500]], auto_deleted_at__lte=cutoff
+            ).delete_returning(),
+            'blob references': lambda: list(blob_references(names)),
+            'reconcile_storage_usage': lambda: reconcile_storage_usage(batch_size=self.users_count // 20),
+            'flush download counters': lambda: _update_batch(
+                [(file['id'], (1, time.time())) for file in self.sample]
+            ),
+            'tiering demotion': lambda: list(demotion_candidates((cutoff - timedelta(days=30), 0))[:100]),
+            'tiering recall': lambda: list(recall_candidates()[:100]),
+        }
+        for label, run in paths.items():
+            with self.subTest(label):
+                self.assertIndexed(run)
+
+
+class FileEventTests(TestCase):
+    """
+    File change events are sent once their transaction commits, without those
+    recorded in savepoints that rolled back.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username='events', email='events@example.com')
+
+    def setUp(self):
+        self.sent = []
+        channel_layer = mock.Mock(group_send=mock.AsyncMock(side_effect=self.record))
+        patcher = mock.patch.object(events, 'get_channel_layer', return_value=channel_layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def record(self, group, message):
+        if group != events.ADMIN_GROUP:
+            self.sent.append([(frame['file_id'], frame['action']) for frame in map(json.loads, message['frames'])])
+
+    def notify(self, file_id, action):
+        events.notify_file_change(self.user.id, file_id, action)
+
+    def test_sent_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(1, 'created')
+            self.notify(2, 'created')
+            self.notify(2, 'deleted')
+            self.assertEqual(self.sent, [])
+        self.assertEqual(self.sent, [[(1, 'created')]])
+
+    def test_rolled_back_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(1, 'created')
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.notify(2, 'created')
+                self.notify(1, 'updated')
+                raise ValueError
+            with transaction.atomic():
+                self.notify(3, 'created')
+            self.notify(4, 'created')
+        self.assertEqual(self.sent, [[(1, 'created'), (4, 'created')], [(3, 'created')]])
+
+    def test_sent_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(1, 'created')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(2, 'created')
+        self.assertEqual(self.sent, [[(1, 'created')], [(2, 'created')]])
@@ -0,0 +1,36 @@
+"""
+Thumbnail rendering. Runs in the processing process pool, so this module must
+not import Django models or settings.
+"""
+import io
+
+THUMBNAIL_FORMAT = 'WEBP'
+
+def render_thumbnail(path, mime_type, size, quality=80):
+    """
+    Renders a thumbnail of at most size x size pixels from an image or the first
+    page of a PDF and returns it encoded as WebP.
+    Requires Pillow, and pypdfium2 for PDFs.
+    """
+    from PIL import Image
+
+    if mime_type == 'application/pdf':
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page = pdf[0]
+            scale = size / max(page.get_size())
+            image = page.render(scale=scale).to_pil()
+        finally:
+            pdf.close()
+    else:
+        image = Image.open(path)
+        # Lets JPEG decode at a reduced scale instead of at full resolution
+        image.draft('RGB', (size, size))
+
+    image.thumbnail((size, size))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    output = io.BytesIO()
+    image.save(output, THUMBNAIL_FORMAT, quality=quality)
+    return output.getvalue()
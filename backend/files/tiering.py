@@ -0,0 +1,188 @@
+"""
+Storage tiering policy for TieredStorage.
+Content of files not downloaded for a while moves from local disk (hot) to the
+cold object store and comes back once it is downloaded again. Both run in
+batches within a byte budget per run and a bandwidth limit, so the transfers
+neither fill the network nor starve the workers serving downloads.
+"""
+import logging
+import shutil
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+from .models import File
+
+logger = logging.getLogger(__name__)
+
+class Throttle:
+    """
+    Byte budget of a tiering run and its bandwidth limit: record() sleeps
+    after a transfer as long as the run is ahead of `bandwidth` bytes per second.
+    """
+
+    def __init__(self, budget, bandwidth):
+        self.budget = budget
+        self.bandwidth = bandwidth
+        self.started = time.monotonic()
+        self.transferred = 0
+
+    def exhausted(self):
+        return bool(self.budget) and self.transferred >= self.budget
+
+    def record(self, size):
+        self.transferred += size
+        if self.bandwidth:
+            delay = self.transferred / self.bandwidth - (time.monotonic() - self.started)
+            if delay > 0:
+                time.sleep(delay)
+
+def demotion_candidates(position=None):
+    """
+    Hot files, least recently downloaded (or uploaded) first, after the
+    (accessed, id) keyset position. Served by files_file_tier_demote_idx.
+    """
+    queryset = File.objects.filter(storage_tier=File.HOT).annotate(
+        accessed=Coalesce('last_downloaded', 'uploaded_at')
+    )
+    if position is not None:
+        accessed, file_id = position
+        queryset = queryset.filter(
+            Q(accessed__gte=accessed) & (Q(accessed__gt=accessed) | Q(accessed=accessed, id__gt=file_id))
+        )
+    return queryset.order_by('accessed', 'id').values_list('id', 'file', 'accessed')
+
+def recall_candidates(after_id=0):
+    """
+    Cold files downloaded since they went cold, by id. Served by
+    files_file_tier_recall_idx.
+    """
+    return File.objects.filter(
+        storage_tier=File.COLD, last_downloaded__gt=F('tier_changed_at'), id__gt=after_id
+    ).order_by('id').values_list('id', 'file')
+
+def disk_usage(storage):
+    """Fraction of the hot tier's disk in use."""
+    usage = shutil.disk_usage(storage.location)
+    return usage.used / usage.total
+
+def demote(storage, name):
+    """
+    Moves the content of a storage name to the cold tier and marks every file
+    using it (several for a deduplicated blob) cold. Content whose files were
+    deleted during the move is removed from the cold tier again, as deleting
+    them removed only the local copy.
+    Returns the number of bytes moved.
+    """
+    try:
+        size = storage.demote(name)
+    except FileNotFoundError:
+        if not storage.cold.exists(name):
+            logger.warning(f"Stored content {name} is missing, not moved to the cold tier")
+            return 0
+        # Already moved along with another file of the same blob
+        File.objects.filter(file=name).update(storage_tier=File.COLD, tier_changed_at=now())
+        return 0
+    if File.objects.filter(file=name).update(storage_tier=File.COLD, tier_changed_at=now()):
+        storage.remove_local(name)
+        if File.objects.filter(file=name).exists():
+            return size
+    storage.remove_cold(name)
+    return size
+
+def recall(storage, name):
+    """
+    Moves the content of a storage name back to local disk and marks its
+    files hot. Content whose files were deleted during the move is removed
+    from both tiers. Returns the number of bytes moved.
+    """
+    try:
+        size = storage.recall(name)
+    except FileNotFoundError:
+        if not storage.is_hot(name):
+            logger.warning(f"Stored content {name} is missing, not recalled from the cold tier")
+            return 0
+        File.objects.filter(file=name).update(storage_tier=File.HOT, tier_changed_at=now())
+        return 0
+    if File.objects.filter(file=name).update(storage_tier=File.HOT, tier_changed_at=now()):
+        storage.remove_cold(name)
+    else:
+        storage.remove_local(name)
+        storage.remove_cold(name)
+    return size
+
+def recall_files(storage, throttle, batch_size):
+    """
+    Recalls cold files that were downloaded again, until the byte budget is
+    used up. Returns (files, bytes) recalled.
+    """
+    recalled, moved, after_id = 0, 0, 0
+    done = set()
+    while not throttle.exhausted():
+        rows = list(recall_candidates(after_id)[:batch_size])
+        if not rows:
+            break
+        for file_id, name in rows:
+            after_id = file_id
+            if throttle.exhausted():
+                break
+            if not name or name in done:
+                continue
+            done.add(name)
+            size = recall(storage, name)
+            throttle.record(size)
+            recalled += 1
+            moved += size
+    return recalled, moved
+
+def demote_files(storage, throttle, batch_size):
+    """
+    Moves hot files to the cold tier, least recently accessed first: all not
+    downloaded for FILE_TIERING_COLD_AFTER_DAYS, and more while local disk
+    usage is above FILE_TIERING_DISK_HIGH_WATERMARK, until the byte budget is
+    used up. A blob shared by several files stays hot while any of them was
+    accessed more recently. Returns (files, bytes) demoted.
+    """
+    cutoff = now() - timedelta(days=settings.FILE_TIERING_COLD_AFTER_DAYS)
+    watermark = settings.FILE_TIERING_DISK_HIGH_WATERMARK
+    demoted, moved, position = 0, 0, None
+    done = set()
+    while not throttle.exhausted():
+        rows = list(demotion_candidates(position)[:batch_size])
+        if not rows:
+            break
+        for file_id, name, accessed in rows:
+            if throttle.exhausted():
+                break
+            if accessed >= cutoff and not (watermark and disk_usage(storage) > watermark):
+                return demoted, moved
+            position = (accessed, file_id)
+            if not name or name in done:
+                continue
+            done.add(name)
+            if hasattr(storage, 'is_blob') and storage.is_blob(name) and demotion_candidates().filter(
+                file=name, accessed__gt=max(accessed, cutoff)
+            ).exists():
+                continue
+            size = demote(storage, name)
+            throttle.record(size)
+            demoted += 1
+            moved += size
+    return demoted, moved
+
+def apply_tiering(storage, batch_size=None, max_bytes=None, bandwidth=None):
+    """
+    One tiering run: recalls first, as they serve users waiting on downloads,
+    then demotions with what is left of the byte budget.
+    Returns {'recalled': (files, bytes), 'demoted': (files, bytes)}.
+    """
+    batch_size = batch_size or settings.FILE_TIERING_BATCH_SIZE
+    throttle = Throttle(
+        settings.FILE_TIERING_MAX_BYTES_PER_RUN if max_bytes is None else max_bytes,
+        settings.FILE_TIERING_BANDWIDTH if bandwidth is None else bandwidth,
+    )
+    recalled = recall_files(storage, throttle, batch_size)
+    demoted = demote_files(storage, throttle, batch_size)
+    return {'recalled': recalled, 'demoted': demoted}
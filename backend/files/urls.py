@@ -1,13 +1,19 @@
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from .views import FileViewSet
-
-router = DefaultRouter()
-router.register(r'', FileViewSet, basename='files')
-
-urlpatterns = [
-    path('', include(router.urls)),
-    path('download/<str:shared_link>/', 
-         FileViewSet.as_view({'get': 'download_file'}),
-         name='file-download'),
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from rest_framework.permissions import AllowAny
+from . import async_views
+from .views import FileViewSet, UploadSessionViewSet, signed_view
+
+router = DefaultRouter()
+router.register(r'uploads', UploadSessionViewSet, basename='uploads')
+router.register(r'', FileViewSet, basename='files')
+
+urlpatterns = [
+    path('async/<int:pk>/download/', async_views.download, name='file-download-async'),
+    path('async/<int:pk>/view/', async_views.view, name='file-view-async'),
+    path('s/<str:token>/<int:expires>/<str:signature>/', signed_view, name='file-signed'),
+    path('', include(router.urls)),
+    path('download/<str:shared_link>/', 
+         FileViewSet.as_view({'get': 'download_file'}, permission_classes=[AllowAny], authentication_classes=[]),
+         name='file-download'),
 ]
\ No newline at end of file
@@ -1,158 +1,620 @@
-from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.response import Response
-from rest_framework.decorators import action
-from django.http import FileResponse, Http404
-from django.shortcuts import get_object_or_404
-from django.utils import timezone
-from django.conf import settings
-from urllib.parse import quote
-from .models import File
-from .serializers import FileSerializer
-import logging
-from rest_framework.authentication import SessionAuthentication
-from .tasks import process_file
-
-logger = logging.getLogger(__name__)
-
-class FileViewSet(viewsets.ModelViewSet):
-    """
-    ViewSet for handling file uploads, downloads and management.
-    Provides CRUD operations with additional actions for file sharing.
-    Integrates with Celery for asynchronous file processing.
-    """
-    queryset = File.objects.all()
-    serializer_class = FileSerializer
-    authentication_classes = [SessionAuthentication]
-    permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
-
-    def get_queryset(self):
-        """
-        Filters files based on user. Admin sees all files, others can see their own.
-        """
-        user = self.request.user
-        if user.is_staff:
-            return File.objects.all()
-        return File.objects.filter(user=user)
-
-    def perform_create(self, serializer):
-        """
-        Automatically assign the current user to new files.
-        Triggers Celery task for asynchronous file processing after creation.
-        """
-        file_instance = serializer.save(user=self.request.user)
-        # Trigger Celery task after file creation
-        process_file.delay(file_instance.id)
-        logger.info(f"Started processing for file ID {file_instance.id}")
-
-    def perform_destroy(self, instance):
-        """
-        Delete a file from the database and storage.
-        Handles both database record and physical file deletion.
-        """
-        try:
-            instance.file.delete()
-            instance.delete()
-            logger.info(f"Deleted file ID {instance.id}")
-        except Exception as e:
-            logger.error(f"Error deleting file ID {instance.id}: {e}")
-            raise Exception(f"Error deleting file: {e}")
-
-    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
-    def get_shared_link(self, request, pk=None):
-        """
-        Generates and returns a unique link to view the file (not download).
-        Creates absolute URL using current request's domain.
-        """
-        file = self.get_object()
-        shared_url = request.build_absolute_uri(f'/files/{file.id}/view/')
-        return Response({"shared_link": shared_url})
-
-    @action(detail=True, methods=['get'])
-    def download(self, request, pk=None):
-        """
-        Downloads the file as an attachment.
-        Updates last_downloaded timestamp on successful download.
-        """
-        file = get_object_or_404(File, pk=pk, user=request.user)
-        try:
-            file.last_downloaded = timezone.now()
-            file.save()
-            
-            response = FileResponse(file.file.open('rb'), as_attachment=True)
-            response['Content-Disposition'] = f'attachment; filename="{quote(file.name)}"'
-            logger.info(f"Downloaded file ID {file.id}")
-            return response
-        except Exception as e:
-            logger.error(f"File download error for ID {pk}: {str(e)}")
-            raise Http404("File not found")
-
-    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
-    def view(self, request, pk=None):
-        """
-        Displays the file inline in browser (for shared links).
-        Does not require authentication for public access.
-        """
-        file = get_object_or_404(File, pk=pk)
-        try:
-            response = FileResponse(file.file.open('rb'))
-            response['Content-Disposition'] = f'inline; filename="{quote(file.name)}"'
-            return response
-        except Exception as e:
-            logger.error(f"File view error for ID {pk}: {str(e)}")
-            raise Http404("File not found")
-
-    @action(detail=True, 
-            methods=['put'], 
-            permission_classes=[IsAuthenticated],
-            parser_classes=[MultiPartParser, FormParser])
-    def update_file(self, request, pk=None):
-        """
-        Updates the file name and comment via form-data.
-        Allows updates by file owner or admin.
-        Triggers Celery task if file content is updated.
-        """
-        file_instance = self.get_object()
-        
-        if not (request.user.is_staff or request.user == file_instance.user):
-            return Response(
-                {'error': 'You can only update your own files.'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        data = {
-            'name': request.data.get('name'),
-            'comment': request.data.get('comment')
-        }
-        
-        data = {k: v for k, v in data.items() if v is not None}
-
-        serializer = self.get_serializer(
-            file_instance,
-            data=data,
-            partial=True
-        )
-        
-        if serializer.is_valid():
-            serializer.save()
-            # Trigger Celery task if file content was updated
-            if 'file' in request.FILES:
-                process_file.delay(file_instance.id)
-                logger.info(f"Triggered reprocessing for updated file ID {file_instance.id}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        
-        logger.error(f"Update validation errors for file ID {pk}: {serializer.errors}")
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    def finalize_response(self, request, response, *args, **kwargs):
-        """
-        Add no-cache headers to all responses in this viewset.
-        Ensures fresh data and prevents browser caching of sensitive file information.
-        """
-        response = super().finalize_response(request, response, *args, **kwargs)
-        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response['Pragma'] = 'no-cache'
-        response['Expires'] = '0'
-        return response
\ No newline at end of file
+from rest_framework import viewsets, mixins, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from datetime import datetime, timezone
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.generics import get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from .counters import record_download, record_downloads
+from .delivery import serve_file, serve_zip
+from .events import notify_file_change, notify_file_changes
+from .models import File, FileChange, StorageUsage, UploadSession, lock_file_owner, revoke_shared_links
+from .pagination import KeysetPagination
+from .serializers import (
+    BulkFileIdsSerializer,
+    BulkRenameSerializer,
+    FileChangesSerializer,
+    FileListSerializer,
+    FileSerializer,
+    SharedLinkSerializer,
+    UploadSessionSerializer
+)
+from .sharing import (
+    SharedLinkGone,
+    count_shared_download,
+    resolve_shared_file,
+    shared_cache_control,
+    sign_shared_file,
+    signed_cache_control,
+    verify_share_signature,
+)
+import logging
+from rest_framework.authentication import SessionAuthentication
+from users.authentication import CachedJWTAuthentication
+from .tasks import process_file
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceeded(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Storage quota exceeded.'
+    default_code = 'quota_exceeded'
+
+def check_quota(user, incoming):
+    """
+    Raises QuotaExceeded if storing `incoming` more bytes would exceed the user's quota.
+    """
+    if StorageUsage.objects.exceeds_quota(user, incoming):
+        logger.info(f"Rejected upload of {incoming} bytes for user {user.pk}: quota exceeded")
+        raise QuotaExceeded()
+
+class FileViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for handling file uploads, downloads and management.
+    Provides CRUD operations with additional actions for file sharing.
+    Integrates with Celery for asynchronous file processing.
+    """
+    queryset = File.objects.all()
+    serializer_class = FileSerializer
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-uploaded_at', '-id')
+    # ?ordering= of the list, each served by a (user, ...) index of File
+    list_orderings = {
+        '-uploaded_at': keyset_ordering,
+        'auto_deleted_at': ('auto_deleted_at', 'id'),
+        '-last_downloaded': ('-last_downloaded', '-id'),
+    }
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Rejects uploads over quota from Content-Length before authentication,
+        which would otherwise parse (and spool) the whole multipart body.
+        Content-Length also counts the multipart framing and the other form
+        fields, so up to FILE_UPLOAD_MULTIPART_OVERHEAD bytes of it are not
+        charged; perform_create checks the exact file size afterwards.
+        """
+        if self.action == 'create':
+            user = self.get_uploading_user(request)
+            length = request.META.get('CONTENT_LENGTH')
+            if user is not None and user.is_authenticated and length and length.isdigit():
+                check_quota(user, max(int(length) - settings.FILE_UPLOAD_MULTIPART_OVERHEAD, 0))
+        super().initial(request, *args, **kwargs)
+
+    def get_uploading_user(self, request):
+        """
+        The user of an upload for the quota pre-check, found without reading
+        the body: JWT clients from the Authorization header alone (the CSRF
+        check of session authentication would parse the form), session users
+        from AuthenticationMiddleware. None if the token is invalid; regular
+        authentication rejects the request afterwards.
+        """
+        if 'HTTP_AUTHORIZATION' not in request.META:
+            return request._request.user
+        try:
+            result = CachedJWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        return result[0] if result else None
+
+    def get_queryset(self):
+        """
+        Filters files based on user. Admin sees all files, others can see their own.
+        """
+        user = self.request.user
+        if user.is_staff:
+            return File.objects.all()
+        return File.objects.filter(user=user)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Lists files one keyset page at a time, newest first.
+        Rows are read with .values() and serialized by FileListSerializer;
+        `?fields=id,name,...` limits the returned fields.
+        `?ordering=auto_deleted_at` lists the files expiring first and
+        `?ordering=-last_downloaded` the downloaded files, most recent first.
+        """
+        ordering = request.query_params.get('ordering', '-uploaded_at')
+        if ordering not in self.list_orderings:
+            return Response(
+                {'error': f"ordering must be one of: {', '.join(self.list_orderings)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        if ordering == '-last_downloaded':
+            # Keyset positions cannot hold NULLs; never downloaded files are left out
+            queryset = queryset.filter(last_downloaded__isnull=False)
+        return self.list_rows(request, queryset, self.list_orderings[ordering])
+
+    def list_rows(self, request, queryset, ordering):
+        """
+        Returns one keyset page of `queryset` in `ordering` as FileListSerializer
+        rows, honouring `?fields=`. Ordering columns are read along with the fields.
+        """
+        fields = request.query_params.get('fields')
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+            unknown = set(fields) - set(FileListSerializer.available_fields)
+            if unknown:
+                return Response(
+                    {'error': f"Unknown fields: {', '.join(sorted(unknown))}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        columns = FileListSerializer.values_fields(
+            list(fields or FileListSerializer.available_fields) +
+            [field.lstrip('-') for field in ordering]
+        )
+        page = self.paginator.paginate_queryset(
+            queryset.values(*columns), request, view=self, ordering=ordering
+        )
+        serializer = FileListSerializer(
+            page, many=True, fields=fields, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Searches the user's files by name and comment: `?q=<text>&mode=ranked|prefix|fuzzy`.
+        Results are paged with a cursor like the list, in the mode's order
+        (rank, newest first, or similarity).
+        """
+        query = request.query_params.get('q', '').strip()
+        mode = request.query_params.get('mode', 'ranked')
+        orderings = File.objects.get_queryset().search_orderings
+        if not query or len(query) > settings.FILE_SEARCH_MAX_LENGTH:
+            return Response(
+                {'error': f"q must be 1 to {settings.FILE_SEARCH_MAX_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if mode not in orderings:
+            return Response(
+                {'error': f"mode must be one of: {', '.join(orderings)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.list_rows(request, self.get_queryset().search(query, mode), orderings[mode])
+
+    def perform_create(self, serializer):
+        """
+        Automatically assign the current user to new files.
+        Triggers Celery task for asynchronous file processing after creation.
+        """
+        check_quota(self.request.user, serializer.validated_data['file'].size)
+        with transaction.atomic():
+            if not lock_file_owner(self.request.user):
+                raise AuthenticationFailed('User not found.', code='user_not_found')
+            file_instance = serializer.save(user=self.request.user)
+            notify_file_change(
+                file_instance.user_id, file_instance.id, 'created',
+                serializer.data, self.request.user.username
+            )
+        # Trigger Celery task after file creation
+        process_file.delay(file_instance.id)
+        logger.info(f"Started processing for file ID {file_instance.id}")
+
+    def perform_destroy(self, instance):
+        """
+        Delete a file from the database and storage.
+        The post_delete signal removes (or releases) the stored content.
+        """
+        file_id = instance.id
+        try:
+            with transaction.atomic():
+                instance.delete()
+                notify_file_change(instance.user_id, file_id, 'deleted', actor=self.request.user.username)
+            logger.info(f"Deleted file ID {file_id}")
+        except Exception as e:
+            logger.error(f"Error deleting file ID {file_id}: {e}")
+            raise Exception(f"Error deleting file: {e}")
+
+    @action(detail=False, methods=['get'])
+    def usage(self, request):
+        """
+        Returns the bytes and number of files stored by the current user and their quota.
+        """
+        usage = StorageUsage.objects.filter(user=request.user).first()
+        quota = usage.quota if usage and usage.quota is not None else settings.STORAGE_QUOTA_DEFAULT
+        return Response({
+            'bytes': usage.bytes if usage else 0,
+            'files': usage.files if usage else 0,
+            'quota': quota or None,
+        })
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Returns the current user's file changes after `?since=<seq>`, coalesced
+        per file, so a reconnecting client does not need to reload the full list.
+        Answers `resync: true` when the change log no longer covers `since`.
+        """
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response(
+                {'error': 'since must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        result = FileChange.objects.since(request.user.pk, since)
+        return Response(FileChangesSerializer(result, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, FormParser])
+    def bulk_delete(self, request):
+        """
+        Deletes the files in `ids` with one DELETE ... RETURNING statement;
+        their content is removed in parallel after commit.
+        Ids of files the user cannot access are ignored.
+        """
+        serializer = BulkFileIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        try:
+            deleted = self.get_queryset().filter(id__in=ids).purge(actor=request.user.username)
+            logger.info(f"Bulk deleted {deleted} files for user {request.user.id}")
+            return Response({'deleted': deleted})
+        except Exception as e:
+            logger.error(f"Error bulk deleting files: {e}")
+            raise
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser])
+    def bulk_rename(self, request):
+        """
+        Renames several files at once from a list of {id, name} pairs with one
+        UPDATE statement. Returns the renamed files.
+        """
+        serializer = BulkRenameSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['files']
+        with transaction.atomic():
+            renamed = self.get_queryset().rename(names)
+            rows = File.objects.filter(id__in=[file_id for file_id, _ in renamed]).values(
+                *FileListSerializer.values_fields(FileListSerializer.available_fields)
+            )
+            listing = FileListSerializer(context=self.get_serializer_context())
+            data = {row['id']: listing.to_representation(row) for row in rows}
+            notify_file_changes(
+                ((user_id, file_id, 'updated', data.get(file_id)) for file_id, user_id in renamed),
+                request.user.username
+            )
+        logger.info(f"Bulk renamed {len(renamed)} files for user {request.user.id}")
+        return Response({'renamed': len(renamed), 'files': list(data.values())})
+
+    @action(detail=False, methods=['get', 'post'], parser_classes=[JSONParser, FormParser])
+    def download_zip(self, request):
+        """
+        Streams a ZIP archive of the files in `ids` (`?ids=1,2,3` or a POST body
+        for large selections). The archive is built while it is sent, without
+        temporary files.
+        """
+        if request.method == 'GET':
+            ids = [i for i in request.query_params.get('ids', '').split(',') if i.strip()]
+            serializer = BulkFileIdsSerializer(data={'ids': ids})
+        else:
+            serializer = BulkFileIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        files = list(
+            self.get_queryset().filter(id__in=serializer.validated_data['ids'])
+            .only('id', 'name', 'file', 'content_encoding', 'uploaded_at')
+            .order_by('id')
+        )
+        if not files:
+            raise Http404("File not found")
+        record_downloads(file.id for file in files)
+        logger.info(f"Downloading {len(files)} files as ZIP for user {request.user.id}")
+        return serve_zip(files, f"files-{now():%Y%m%d-%H%M%S}.zip")
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def get_shared_link(self, request, pk=None):
+        """
+        Returns the public download link of the file (compact token form),
+        or null if its link was revoked.
+        """
+        file = self.get_object()
+        shared_url = request.build_absolute_uri(file.get_shared_url()) if file.shared_link else None
+        return Response({"shared_link": shared_url})
+
+    @action(detail=True, methods=['get', 'post', 'delete'], parser_classes=[JSONParser, FormParser])
+    def share(self, request, pk=None):
+        """
+        Shows (GET), updates (POST) or revokes (DELETE) the shared link of a file.
+        POST takes `expires_at`, `max_downloads` (null removes a limit) and
+        `rotate` to issue a new token; changes apply to cached links at once.
+        """
+        file = self.get_object()
+        if request.method == 'DELETE':
+            link = file.shared_link
+            file.shared_link = None
+            file.save(update_fields=['shared_link'])
+            revoke_shared_links([link])
+            logger.info(f"Revoked shared link of file ID {file.id}")
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        context = self.get_serializer_context()
+        if request.method == 'POST':
+            serializer = SharedLinkSerializer(file, data=request.data, partial=True, context=context)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return Response(SharedLinkSerializer(file, context=context).data)
+
+    @action(detail=True, methods=['get'])
+    def signed_url(self, request, pk=None):
+        """
+        Returns a signed URL of the file's shared link that the edge can check
+        and cache without calling Django, and its expiry. `?ttl=<seconds>` sets
+        the lifetime, at most FILE_SIGNED_URL_MAX_TTL. Links with a download
+        limit are not signed, since cached copies would not be counted.
+        Answers 503 while FILE_SIGNING_KEY is unset.
+        """
+        file = self.get_object()
+        if not file.shared_link or file.shared_link_max_downloads:
+            return Response(
+                {'error': 'Only files with a shared link without a download limit can be signed.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            ttl = int(request.query_params.get('ttl', settings.FILE_SIGNED_URL_TTL))
+        except ValueError:
+            ttl = 0
+        if not 0 < ttl <= settings.FILE_SIGNED_URL_MAX_TTL:
+            return Response(
+                {'error': f"ttl must be between 1 and {settings.FILE_SIGNED_URL_MAX_TTL} seconds."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if file.shared_link_expires_at is not None and file.shared_link_expires_at <= now():
+            raise SharedLinkGone()
+        path, expires = sign_shared_file(file, ttl)
+        return Response({
+            'url': request.build_absolute_uri(path),
+            'expires_at': datetime.fromtimestamp(expires, tz=timezone.utc),
+        })
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Downloads the file as an attachment.
+        Supports Range requests for resuming and conditional GET via ETag/Last-Modified.
+        The download is buffered in Redis and flushed to last_downloaded/download_count.
+        """
+        file = get_object_or_404(File, pk=pk, user=request.user)
+        try:
+            record_download(file.id)
+            response = serve_file(request, file, as_attachment=True)
+            logger.info(f"Downloaded file ID {file.id}")
+            return response
+        except Exception as e:
+            logger.error(f"File download error for ID {pk}: {str(e)}")
+            raise Http404("File not found")
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def view(self, request, pk=None):
+        """
+        Displays the file inline in browser.
+        Allows access by file owner or admin; others reach a file only through
+        its shared link, which enforces revocation, expiry and download limits.
+        """
+        file = self.get_object()
+        try:
+            return serve_file(request, file)
+        except Exception as e:
+            logger.error(f"File view error for ID {pk}: {str(e)}")
+            raise Http404("File not found")
+
+    def download_file(self, request, shared_link=None):
+        """
+        Downloads a file by its shared link token (download/<token>/ route).
+        Does not require authentication; the unguessable token grants access.
+        The link is resolved through the cache, so a hot link is served without
+        a database query unless its downloads are limited.
+        """
+        file = resolve_shared_file(shared_link)
+        if file is None:
+            raise Http404("File not found")
+        count_shared_download(request, file)
+        try:
+            record_download(file.id)
+            response = serve_file(request, file, as_attachment=True, cache_control=shared_cache_control(file))
+            logger.info(f"Downloaded file ID {file.id} via shared link")
+            return response
+        except Exception as e:
+            logger.error(f"Shared link download error for {shared_link}: {str(e)}")
+            raise Http404("File not found")
+
+    @action(detail=True, 
+            methods=['put'], 
+            permission_classes=[IsAuthenticated],
+            parser_classes=[MultiPartParser, FormParser])
+    def update_file(self, request, pk=None):
+        """
+        Updates the file name and comment via form-data.
+        Allows updates by file owner or admin.
+        Triggers Celery task if file content is updated.
+        """
+        file_instance = self.get_object()
+        
+        if not (request.user.is_staff or request.user == file_instance.user):
+            return Response(
+                {'error': 'You can only update your own files.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        data = {
+            'name': request.data.get('name'),
+            'comment': request.data.get('comment')
+        }
+        
+        data = {k: v for k, v in data.items() if v is not None}
+
+        serializer = self.get_serializer(
+            file_instance,
+            data=data,
+            partial=True
+        )
+        
+        if serializer.is_valid():
+            with transaction.atomic():
+                serializer.save()
+                notify_file_change(
+                    file_instance.user_id, file_instance.id, 'updated',
+                    serializer.data, request.user.username
+                )
+            # Trigger Celery task if file content was updated
+            if 'file' in request.FILES:
+                process_file.delay(file_instance.id)
+                logger.info(f"Triggered reprocessing for updated file ID {file_instance.id}")
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        
+        logger.error(f"Update validation errors for file ID {pk}: {serializer.errors}")
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Add no-cache headers to responses in this viewset.
+        Ensures fresh data and prevents browser caching of sensitive file information.
+        File content responses set their own Cache-Control and keep it.
+        """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.has_header('Cache-Control'):
+            return response
+        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        response['Pragma'] = 'no-cache'
+        response['Expires'] = '0'
+        return response
+
+@require_safe
+def signed_view(request, token, expires, signature):
+    """
+    Displays a file inline through a signed share URL (s/<token>/<expires>/<signature>/).
+    Expiry and signature are checked first, so a forged or expired URL costs
+    no lookup; the link is then resolved through the cache like download_file.
+    The response is public and immutable until the URL expires, so the edge
+    serves a viral file from its cache after the first request.
+    """
+    if not verify_share_signature(token, expires, signature):
+        return HttpResponse(status=403)
+    try:
+        file = resolve_shared_file(token)
+    except SharedLinkGone:
+        return HttpResponse(status=410)
+    if file is None:
+        raise Http404("File not found")
+    if file.shared_link_max_downloads:
+        return HttpResponse(status=410)
+    try:
+        record_download(file.id)
+        response = serve_file(request, file, cache_control=signed_cache_control(expires))
+        logger.info(f"Viewed file ID {file.id} via signed link")
+        return response
+    except Exception as e:
+        logger.error(f"Signed link view error for {token}: {str(e)}")
+        raise Http404("File not found")
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads.
+    POST creates a session, PUT appends a chunk at the given offset,
+    GET reports the offset to resume from and `complete` turns the session into a File.
+    Chunks are written straight to the final storage path, so each byte hits the disk once.
+    """
+    serializer_class = UploadSessionSerializer
+    authentication_classes = [CachedJWTAuthentication, SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser]
+
+    def get_queryset(self):
+        """
+        Users can only see and resume their own upload sessions.
+        """
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        """
+        Checks the declared size against the quota before any chunk is accepted.
+        """
+        check_quota(self.request.user, serializer.validated_data['size'])
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        """
+        Aborts the upload and removes the partially written data.
+        """
+        instance.discard()
+        logger.info(f"Aborted upload session {instance.id}")
+
+    def update(self, request, pk=None):
+        """
+        Appends the raw request body at the offset given in the `Upload-Offset` header
+        (or `offset` query parameter). The offset must match the bytes already stored;
+        on mismatch the current offset is returned with 409 so the client can resume.
+        """
+        offset = request.headers.get('Upload-Offset', request.query_params.get('offset'))
+        try:
+            offset = int(offset)
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'A numeric Upload-Offset and Content-Length are required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {'error': f'Chunks may not exceed {settings.UPLOAD_CHUNK_MAX_SIZE} bytes.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        with transaction.atomic():
+            session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            if offset != session.offset:
+                return Response(
+                    {'error': 'Offset mismatch.', 'offset': session.offset},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Upload-Offset': str(session.offset)}
+                )
+            if offset + length > session.size:
+                return Response(
+                    {'error': 'Chunk exceeds the declared upload size.', 'offset': session.offset},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if length:
+                session.append_chunk(request.stream, length)
+
+        serializer = self.get_serializer(session)
+        return Response(
+            serializer.data,
+            status=status.HTTP_200_OK,
+            headers={'Upload-Offset': str(session.offset)}
+        )
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """
+        Finalizes a fully received upload and creates the File record.
+        Triggers Celery task for asynchronous file processing.
+        """
+        with transaction.atomic():
+            if not lock_file_owner(request.user):
+                raise AuthenticationFailed('User not found.', code='user_not_found')
+            session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            if session.offset != session.size:
+                return Response(
+                    {'error': 'Upload is incomplete.', 'offset': session.offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+            file_instance = session.finish()
+            serializer = FileSerializer(file_instance, context=self.get_serializer_context())
+            notify_file_change(
+                file_instance.user_id, file_instance.id, 'created',
+                serializer.data, request.user.username
+            )
+
+        process_file.delay(file_instance.id)
+        logger.info(f"Completed upload session {pk} as file ID {file_instance.id}")
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
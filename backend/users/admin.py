@@ -1,19 +1,26 @@
-from django.contrib import admin
-from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
-from files.models import File
-
-if admin.site.is_registered(CustomUser):
-    admin.site.unregister(CustomUser)
-
-class CustomUserAdmin(UserAdmin):
-    list_display = UserAdmin.list_display + ('get_files_count',)
-
-    def get_files_count(self, obj):
-        """
-	Returns the number of files uploaded by the user
-	"""
-        return File.objects.filter(user=obj).count()
-    get_files_count.short_description = 'Files Count'
-
-admin.site.register(CustomUser, CustomUserAdmin)
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.db.models import Count
+from .models import CustomUser
+
+if admin.site.is_registered(CustomUser):
+    admin.site.unregister(CustomUser)
+
+class CustomUserAdmin(UserAdmin):
+    list_display = UserAdmin.list_display + ('get_files_count',)
+
+    def get_queryset(self, request):
+        """
+	Annotates the file count so the changelist does not query it per user
+	"""
+        return super().get_queryset(request).annotate(files_count=Count('files'))
+
+    def get_files_count(self, obj):
+        """
+	Returns the number of files uploaded by the user
+	"""
+        return obj.files_count
+    get_files_count.short_description = 'Files Count'
+    get_files_count.admin_order_field = 'files_count'
+
+admin.site.register(CustomUser, CustomUserAdmin)
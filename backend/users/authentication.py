@@ -0,0 +1,81 @@
+import logging
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import user_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication for API clients.
+    Tokens are verified in-process against the signing key held by the token
+    backend; the user is read through the same cache as session users, so an
+    authenticated request normally touches neither the session table nor users.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.USER_CACHE_TTL)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Channels middleware accepting a JWT access token for WebSocket connections,
+    from an `Authorization: Bearer <token>` header or a `token` query parameter.
+    Placed inside AuthMiddlewareStack; without a token the session user is kept.
+    """
+
+    async def __call__(self, scope, receive, send):
+        raw_token = self.get_raw_token(scope)
+        if raw_token:
+            user = await self.get_user(raw_token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def get_raw_token(scope):
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                parts = value.decode('latin1').split()
+                if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+                    return parts[1]
+        query = parse_qs(scope.get('query_string', b'').decode())
+        return query.get('token', [None])[0]
+
+    @database_sync_to_async
+    def get_user(self, raw_token):
+        try:
+            return CachedJWTAuthentication().get_user(AccessToken(raw_token))
+        except (TokenError, InvalidToken, AuthenticationFailed) as e:
+            logger.warning(f"Rejected WebSocket token: {str(e)}")
+            return None
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from .hashing import run_hasher
+from .models import user_cache_key
+
+UserModel = get_user_model()
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps session users in the cache for USER_CACHE_TTL seconds,
+    so authenticated requests and WebSocket connects skip the user query.
+    Entries are invalidated whenever the user is saved or deleted.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        """
+        Authenticates by username or email. Passwords are verified on the
+        bounded hashing pool, and hashes made with another hasher or cost are
+        replaced on success. A failed attempt raises PermissionDenied so the
+        remaining backends do not hash the same password again.
+        """
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if password is None or (username is None and email is None):
+            return None
+        try:
+            if email is not None:
+                user = UserModel._default_manager.get(email__iexact=email)
+            else:
+                user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so unknown accounts take as long as wrong passwords
+            run_hasher(make_password, password)
+            raise PermissionDenied
+
+        is_correct, must_update = run_hasher(verify_password, password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            raise PermissionDenied
+        if must_update:
+            user.password = run_hasher(make_password, password)
+            user.save(update_fields=['password'])
+        return user
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TTL)
+        return user
@@ -0,0 +1,51 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-in attempts are being processed, try again shortly.'
+    default_code = 'hashing_busy'
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(
+                    settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE
+                )
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASHING_WORKERS,
+                    thread_name_prefix='password-hashing',
+                )
+    return _executor, _slots
+
+
+def run_hasher(func, *args):
+    """
+    Runs a password hashing call on a process-wide pool of
+    PASSWORD_HASHING_WORKERS threads and waits for the result.
+    The hashers release the GIL, so at most that many cores hash at once
+    however many requests log in; when PASSWORD_HASHING_QUEUE calls are
+    already waiting the attempt is rejected with HashingBusy instead of queueing.
+    """
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        logger.warning("Password hashing pool is saturated, rejecting attempt")
+        raise HashingBusy()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
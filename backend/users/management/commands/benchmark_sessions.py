@@ -0,0 +1,62 @@
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from users.models import user_cache_key
+
+
+class Command(BaseCommand):
+    """
+    Counts database round-trips of authenticated API requests.
+    Runs the same requests with the previous configuration (session saved on
+    every request, user loaded by ModelBackend) and with the current one.
+    The benchmark user is created in a transaction that is rolled back.
+    """
+    help = "Benchmark per-request database queries of session authentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--path', default='/api/users/profile/')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        suffix = int(time.time() * 1000)
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=f"bench-session-{suffix}", email=f"bench-session-{suffix}@example.com"
+            )
+            modes = {
+                'save every request': {
+                    'SESSION_SAVE_EVERY_REQUEST': True,
+                    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+                },
+                'refresh near expiry': {},
+            }
+            try:
+                for label, overrides in modes.items():
+                    with override_settings(**overrides):
+                        self.run(label, user, options)
+            finally:
+                cache.delete(user_cache_key(user.pk))
+                transaction.set_rollback(True)
+
+    def run(self, label, user, options):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        client.force_login(user)
+        client.get(options['path'], secure=True)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                response = client.get(options['path'], secure=True)
+                if response.status_code != 200:
+                    raise CommandError(f"{options['path']} returned {response.status_code}")
+            elapsed = time.perf_counter() - started
+        client.logout()
+        self.stdout.write(
+            f"{label:<20} {len(queries) / options['requests']:.2f} queries/request, "
+            f"{elapsed / options['requests'] * 1000:.2f}ms/request"
+        )
@@ -1,17 +1,17 @@
-# Generated by Django 5.1.3 on 2024-12-07 20:32
-
-from django.db import migrations
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('users', '0002_alter_customuser_managers_alter_customuser_email'),
-    ]
-
-    operations = [
-        migrations.RemoveField(
-            model_name='customuser',
-            name='is_admin',
-        ),
-    ]
+# Generated by Django 5.1.3 on 2024-12-07 20:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_customuser_managers_alter_customuser_email'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='is_admin',
+        ),
+    ]
@@ -1,138 +1,151 @@
-from rest_framework import serializers
-from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth import authenticate
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import CustomUser
-
-
-class UserSerializer(serializers.ModelSerializer):
-    """
-    Serializer for user registration and profile management.
-    Handles password validation and hashing automatically.
-    """
-    password = serializers.CharField(
-        write_only=True,
-        required=True,
-        validators=[validate_password],
-        style={'input_type': 'password'}
-    )
-
-    class Meta:
-        model = CustomUser
-        fields = [
-            'id',
-            'username',
-            'email',
-            'password',
-            'is_staff',
-            'is_superuser',
-            'first_name',
-            'last_name'
-        ]
-        extra_kwargs = {
-            'is_staff': {'read_only': True},
-            'is_superuser': {'read_only': True}
-        }
-
-    def create(self, validated_data):
-        user = CustomUser.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', '')
-        )
-        return user
-
-    def update(self, instance, validated_data):
-        password = validated_data.pop('password', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        if password:
-            instance.set_password(password)
-        instance.save()
-        return instance
-
-
-class UserLoginSerializer(serializers.Serializer):
-    """
-    Serializer for user login authentication.
-    Validates email and password, returns user object if valid.
-    """
-    email = serializers.EmailField(required=True)
-    password = serializers.CharField(
-        write_only=True,
-        required=True,
-        style={'input_type': 'password'}
-    )
-
-    def validate(self, attrs):
-        email = attrs.get('email')
-        password = attrs.get('password')
-
-        if email and password:
-            user = authenticate(
-                request=self.context.get('request'),
-                email=email,
-                password=password
-            )
-            if not user:
-                raise serializers.ValidationError("Invalid email or password", code='authorization')
-        else:
-            raise serializers.ValidationError("Must include 'email' and 'password'", code='authorization')
-
-        attrs['user'] = user
-        return attrs
-
-
-class UserProfileSerializer(serializers.ModelSerializer):
-    """
-    Serializer for authenticated user's profile (read-only).
-    """
-    class Meta:
-        model = CustomUser
-        fields = [
-            'id',
-            'username',
-            'email',
-            'first_name',
-            'last_name',
-            'is_staff'
-        ]
-        read_only_fields = fields
-
-
-class PasswordChangeSerializer(serializers.Serializer):
-    """
-    Serializer for user password change.
-    """
-    old_password = serializers.CharField(
-        required=True,
-        write_only=True,
-        style={'input_type': 'password'}
-    )
-    new_password = serializers.CharField(
-        required=True,
-        write_only=True,
-        validators=[validate_password],
-        style={'input_type': 'password'}
-    )
-
-    def validate_old_password(self, value):
-        user = self.context['request'].user
-        if not user.check_password(value):
-            raise serializers.ValidationError("Old password is incorrect")
-        return value
-
-
-class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    """
-    Custom JWT serializer to add extra claims (if needed).
-    """
-    @classmethod
-    def get_token(cls, user):
-        token = super().get_token(user)
-        token['username'] = user.username
-        token['email'] = user.email
-        token['is_staff'] = user.is_staff
-        return token
+from rest_framework import serializers
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .hashing import run_hasher
+from .models import CustomUser
+
+
+class UserSerializer(serializers.ModelSerializer):
+    """
+    Serializer for user registration and profile management.
+    Handles password validation and hashing automatically.
+    """
+    password = serializers.CharField(
+        write_only=True,
+        required=True,
+        validators=[validate_password],
+        style={'input_type': 'password'}
+    )
+
+    class Meta:
+        model = CustomUser
+        fields = [
+            'id',
+            'username',
+            'email',
+            'password',
+            'is_staff',
+            'is_superuser',
+            'first_name',
+            'last_name'
+        ]
+        extra_kwargs = {
+            'is_staff': {'read_only': True},
+            'is_superuser': {'read_only': True}
+        }
+
+    def create(self, validated_data):
+        user = CustomUser.objects.create_user(
+            username=validated_data['username'],
+            email=validated_data['email'],
+            password=validated_data['password'],
+            first_name=validated_data.get('first_name', ''),
+            last_name=validated_data.get('last_name', '')
+        )
+        return user
+
+    def update(self, instance, validated_data):
+        password = validated_data.pop('password', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if password:
+            instance.set_password(password)
+        instance.save()
+        return instance
+
+
+class UserLoginSerializer(serializers.Serializer):
+    """
+    Serializer for user login authentication.
+    Validates email and password, returns user object if valid.
+    """
+    email = serializers.EmailField(required=True)
+    password = serializers.CharField(
+        write_only=True,
+        required=True,
+        style={'input_type': 'password'}
+    )
+
+    def validate(self, attrs):
+        email = attrs.get('email')
+        password = attrs.get('password')
+
+        if email and password:
+            user = authenticate(
+                request=self.context.get('request'),
+                email=email,
+                password=password
+            )
+            if not user:
+                raise serializers.ValidationError("Invalid email or password", code='authorization')
+        else:
+            raise serializers.ValidationError("Must include 'email' and 'password'", code='authorization')
+
+        attrs['user'] = user
+        return attrs
+
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    """
+    Serializer for authenticated user's profile (read-only).
+    """
+    class Meta:
+        model = CustomUser
+        fields = [
+            'id',
+            'username',
+            'email',
+            'first_name',
+            'last_name',
+            'is_staff'
+        ]
+        read_only_fields = fields
+
+
+class PasswordChangeSerializer(serializers.Serializer):
+    """
+    Serializer for user password change.
+    """
+    old_password = serializers.CharField(
+        required=True,
+        write_only=True,
+        style={'input_type': 'password'}
+    )
+    new_password = serializers.CharField(
+        required=True,
+        write_only=True,
+        validators=[validate_password],
+        style={'input_type': 'password'}
+    )
+
+    def validate_old_password(self, value):
+        user = self.context['request'].user
+        is_correct, _ = run_hasher(verify_password, value, user.password)
+        if not is_correct:
+            raise serializers.ValidationError("Old password is incorrect")
+        return value
+
+    def save(self):
+        """
+        Sets the new password. Both hashes of a change are made on the bounded
+        hashing pool, like those of sign-ins.
+        """
+        user = self.context['request'].user
+        user.password = run_hasher(make_password, self.validated_data['new_password'])
+        user.save(update_fields=['password'])
+        return user
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Custom JWT serializer to add extra claims (if needed).
+    """
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['email'] = user.email
+        token['is_staff'] = user.is_staff
+        return token
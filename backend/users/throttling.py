@@ -0,0 +1,68 @@
+import logging
+import time
+import uuid
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Drops entries older than the window, then records the attempt unless the
+# limit is reached. Returns 0 when allowed, otherwise the milliseconds until
+# the oldest attempt leaves the window.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return math.max(tonumber(oldest[2]) + window - now, 1)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], window)
+return 0
+"""
+
+
+class LoginRateThrottle(BaseThrottle):
+    """
+    Sliding-window limit on sign-in attempts, kept in Redis so it holds across
+    workers. Attempts are counted per client IP and per account (email or
+    username) and rejected before any password is hashed.
+    If Redis is unavailable attempts are let through.
+    """
+    scope = 'login'
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_account(self, request):
+        account = request.data.get('email') or request.data.get('username')
+        return str(account).strip().lower() if account else None
+
+    def allow_request(self, request, view):
+        window = settings.LOGIN_RATE_LIMIT_WINDOW * 1000
+        limits = [(f"ip:{self.get_ident(request)}", settings.LOGIN_RATE_LIMIT_PER_IP)]
+        account = self.get_account(request)
+        if account:
+            limits.append((f"account:{account}", settings.LOGIN_RATE_LIMIT_PER_ACCOUNT))
+
+        try:
+            script = get_redis_connection('default').register_script(SLIDING_WINDOW_SCRIPT)
+            now = int(time.time() * 1000)
+            for key, limit in limits:
+                wait = script(
+                    keys=[f"throttle:{self.scope}:{key}"],
+                    args=[now, window, limit, uuid.uuid4().hex],
+                )
+                if wait:
+                    self.retry_after = int(wait) / 1000
+                    logger.warning(f"Sign-in attempts throttled for {key}")
+                    return False
+        except Exception as e:
+            logger.error(f"Error checking sign-in rate limit: {str(e)}")
+        return True
+
+    def wait(self):
+        return self.retry_after
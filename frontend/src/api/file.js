@@ -48,10 +48,14 @@ export const uploadFile = async (file, name, comment = 'No comment') => {
   }
 };
 
-export const listFiles = async () => {
+// Loads one page of the cursor-paginated file list. Pass the returned `next`
+// URL as `url` to load the following page; it already carries the query, so
+// `config.params` only apply to the first page. `next` is null on the last page.
+export const listFiles = async (config = {}, url = null) => {
   try {
-    const response = await axiosInstance.get('/files/');
-    return { success: true, data: response.data };
+    const { params, ...pageConfig } = config;
+    const response = await axiosInstance.get(url || '/files/', url ? pageConfig : config);
+    return { success: true, data: response.data.results, next: response.data.next };
   } catch (error) {
     console.error('Fetch files error:', error);
     return { 
@@ -90,16 +94,16 @@ export const deleteFile = async (fileId) => {
   }
 };
 
-export const getFileUrl = (fileId) => {
-  return `${API_URL}/files/${fileId}/view/`;
-};
-
 export const getDownloadLink = async (fileId) => {
   try {
-    const response = await axiosInstance.get(`/files/${fileId}/share/`);
+    let response = await axiosInstance.get(`/files/${fileId}/share/`);
+    if (!response.data.shared_link) {
+      // The link was revoked: issue a new one
+      response = await axiosInstance.post(`/files/${fileId}/share/`, {});
+    }
     return { 
       success: true, 
-      shared_link: response.data.shared_link || getFileUrl(fileId) 
+      shared_link: response.data.shared_link 
     };
   } catch (error) {
     console.error('Get shared link error:', error);
@@ -2,6 +2,7 @@ import React, { useState } from 'react';
 import FileConfig from '../FileConfig/FileConfig';
 import ConfirmationModal from '../ConfirmationModal/ConfirmationModal';
 import { toast } from 'react-toastify';
+import { getDownloadLink } from '../../api/file';
 import './FileItem.css';
 
 const FileItem = ({ file, onDelete, onFileUpdate }) => {
@@ -26,14 +27,21 @@ const FileItem = ({ file, onDelete, onFileUpdate }) => {
     }
   };
 
-  const handleGetLink = () => {
-    const url = `${window.location.origin}/files/${file.id}/view/`;
-    setFileUrl(url);
-    return url;
+  const handleGetLink = async () => {
+    const { shared_link } = await getDownloadLink(file.id);
+    setFileUrl(shared_link || null);
+    return shared_link;
   };
 
-  const handleCopyLink = () => {
-    const urlToCopy = fileUrl || handleGetLink();
+  const handleCopyLink = async () => {
+    const urlToCopy = fileUrl || await handleGetLink();
+    if (!urlToCopy) {
+      toast.error('Failed to get link', {
+        autoClose: 2000,
+        hideProgressBar: true,
+      });
+      return;
+    }
     navigator.clipboard.writeText(urlToCopy)
       .then(() => toast.success('Link copied to clipboard', {
         autoClose: 2000,
@@ -5,22 +5,24 @@ import ConfirmationModal from '../ConfirmationModal/ConfirmationModal';
 import PropTypes from 'prop-types';
 import { toast } from 'react-toastify';
 
-const AllUserFiles = ({ files = [], onDeleteFile, onFileChange = () => {} }) => {
+const AllUserFiles = ({
+  files = [], onDeleteFile, onGetDownloadLink, onFileChange = () => {},
+  hasMore = false, loadingMore = false, onLoadMore = () => {},
+}) => {
   const [searchTerm, setSearchTerm] = useState('');
   const [configFileId, setConfigFileId] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [selectedFileId, setSelectedFileId] = useState(null);
   const [isProcessing, setIsProcessing] = useState(false);
   const [lastDownloadTimestamps, setLastDownloadTimestamps] = useState({});
-  const [fileUrls, setFileUrls] = useState({});
   const [socket, setSocket] = useState(null);
 
   useEffect(() => {
     const ws = new WebSocket(`wss://${window.location.host}/ws/files/`);
     ws.onmessage = (e) => {
       const data = JSON.parse(e.data);
-      if (data.type === 'FILE_UPDATE') {
-        onFileChange();
+      if (['file_update', 'file_updates', 'resync'].includes(data.type)) {
+        onFileChange(data);
       }
     };
     setSocket(ws);
@@ -30,20 +32,13 @@ const AllUserFiles = ({ files = [], onDeleteFile, onFileChange = () => {} }) =>
     };
   }, []);
 
-  useEffect(() => {
-    const urls = {};
-    files.forEach(file => {
-      urls[file.id] = `${window.location.origin}/files/${file.id}/view/`;
-    });
-    setFileUrls(urls);
-  }, [files]);
-
   const filesArray = Array.isArray(files) ? files : [];
 
   const handleCopyLink = async (fileId) => {
     try {
       setIsProcessing(true);
-      const urlToCopy = fileUrls[fileId];
+      const response = await onGetDownloadLink(fileId);
+      const urlToCopy = response?.shared_link;
       if (urlToCopy) {
         await navigator.clipboard.writeText(urlToCopy);
         toast.success('Link copied to clipboard!', {
@@ -229,6 +224,16 @@ const AllUserFiles = ({ files = [], onDeleteFile, onFileChange = () => {} }) =>
         </tbody>
       </table>
 
+      {hasMore && (
+        <button
+          onClick={onLoadMore}
+          className="action-button load-more-button"
+          disabled={loadingMore}
+        >
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      )}
+
       {configFileId && (
         <FileConfig 
           fileId={configFileId} 
@@ -255,7 +260,11 @@ AllUserFiles.propTypes = {
     PropTypes.object
   ]),
   onDeleteFile: PropTypes.func.isRequired,
-  onFileChange: PropTypes.func
+  onGetDownloadLink: PropTypes.func.isRequired,
+  onFileChange: PropTypes.func,
+  hasMore: PropTypes.bool,
+  loadingMore: PropTypes.bool,
+  onLoadMore: PropTypes.func
 };
 
 AllUserFiles.defaultProps = {
@@ -5,12 +5,14 @@ import FileConfig from '../FileConfig/FileConfig';
 import PropTypes from 'prop-types';
 import { toast } from 'react-toastify';
 
-const FileList = ({ files, onDeleteFile, onFileChange = () => {} }) => {
+const FileList = ({
+  files, onDeleteFile, onGetDownloadLink, onFileChange = () => {},
+  hasMore = false, loadingMore = false, onLoadMore = () => {},
+}) => {
   const [searchTerm, setSearchTerm] = useState('');
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [selectedFileId, setSelectedFileId] = useState(null);
   const [editingFileId, setEditingFileId] = useState(null);
-  const [fileUrls, setFileUrls] = useState({});
   const [isProcessing, setIsProcessing] = useState(false);
   const [socket, setSocket] = useState(null);
 
@@ -18,8 +20,8 @@ const FileList = ({ files, onDeleteFile, onFileChange = () => {} }) => {
     const ws = new WebSocket(`wss://${window.location.host}/ws/files/`);
     ws.onmessage = (e) => {
       const data = JSON.parse(e.data);
-      if (data.type === 'FILE_UPDATE') {
-        onFileChange();
+      if (['file_update', 'file_updates', 'resync'].includes(data.type)) {
+        onFileChange(data);
       }
     };
     setSocket(ws);
@@ -29,22 +31,15 @@ const FileList = ({ files, onDeleteFile, onFileChange = () => {} }) => {
     };
   }, []);
 
-  useEffect(() => {
-    const urls = {};
-    files.forEach(file => {
-      urls[file.id] = `${window.location.origin}/files/${file.id}/view/`;
-    });
-    setFileUrls(urls);
-  }, [files]);
-
   const filteredFiles = Array.isArray(files)
     ? files.filter((file) =>
         file.name.toLowerCase().includes(searchTerm.toLowerCase())
       )
     : [];
 
-  const handleCopyLink = (fileId) => {
-    const urlToCopy = fileUrls[fileId];
+  const handleCopyLink = async (fileId) => {
+    const response = await onGetDownloadLink(fileId);
+    const urlToCopy = response?.shared_link;
     if (urlToCopy) {
       navigator.clipboard.writeText(urlToCopy)
         .then(() => toast.success('Link copied to clipboard!', {
@@ -181,6 +176,16 @@ const FileList = ({ files, onDeleteFile, onFileChange = () => {} }) => {
         </tbody>
       </table>
 
+      {hasMore && (
+        <button
+          onClick={onLoadMore}
+          className="action-button load-more-button"
+          disabled={loadingMore}
+        >
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      )}
+
       <ConfirmationModal
         isOpen={isModalOpen}
         onClose={() => !isProcessing && setIsModalOpen(false)}
@@ -204,7 +209,11 @@ const FileList = ({ files, onDeleteFile, onFileChange = () => {} }) => {
 FileList.propTypes = {
   files: PropTypes.array.isRequired,
   onDeleteFile: PropTypes.func.isRequired,
-  onFileChange: PropTypes.func
+  onGetDownloadLink: PropTypes.func.isRequired,
+  onFileChange: PropTypes.func,
+  hasMore: PropTypes.bool,
+  loadingMore: PropTypes.bool,
+  onLoadMore: PropTypes.func
 };
 
 export default FileList;
\ No newline at end of file
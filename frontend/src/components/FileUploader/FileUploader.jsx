@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { uploadFile } from '../../api/file';
+import { applyFileEvents } from '../../utils/helpers';
 import { toast } from 'react-toastify';
 import './FileUploader.css';
 
@@ -46,7 +47,7 @@ const FileUploader = ({ refreshFiles }) => {
           autoClose: 2000,
           hideProgressBar: true,
         });
-        refreshFiles((prevFiles) => [...prevFiles, data]);
+        refreshFiles((prevFiles) => applyFileEvents(prevFiles, [{ action: 'created', file_id: data.id, data }]));
         setSelectedFile(null);
         setFileName('');
         setComment('');
@@ -5,13 +5,16 @@ import UserTable from '../../components/UserTable/UserTable';
 import AllUserFiles from '../../components/FileList/AllUserFiles';
 import UserConfig from '../../components/UserConfig/UserConfig';
 import { toast } from 'react-toastify';
+import { appendFilePage, applyFileEvents, fileEvents } from '../../utils/helpers';
 import './AdminPanel.css';
 
 const AdminPanel = () => {
   const [activeTab, setActiveTab] = useState('users');
   const [users, setUsers] = useState([]);
   const [files, setFiles] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [configUser, setConfigUser] = useState(null);
 
   const handleError = (err) => {
@@ -46,29 +49,28 @@ const AdminPanel = () => {
     }
   };
 
+  const withUsernames = (fileList) => fileList.map(file => {
+    const user = users.find(user => user.id === file.user);
+    return { 
+      ...file, 
+      username: user ? user.username : 'Unknown',
+      formatted_uploaded_at: new Date(file.uploaded_at).toLocaleString(),
+      formatted_last_downloaded: file.last_downloaded 
+        ? new Date(file.last_downloaded).toLocaleString() 
+        : 'Never'
+    };
+  });
+
+  // Loads the first page; further pages are loaded on demand and kept up to
+  // date from the WebSocket events (see handleFilesUpdated)
   const loadFiles = async () => {
     if (loading) return;
     setLoading(true);
     try {
       const response = await listFiles();
       if (response.success) {
-        const sortedFiles = response.data.sort((a, b) => 
-          new Date(b.last_downloaded || 0) - new Date(a.last_downloaded || 0)
-        );
-        
-        const filesWithUsernames = sortedFiles.map(file => {
-          const user = users.find(user => user.id === file.user);
-          return { 
-            ...file, 
-            username: user ? user.username : 'Unknown',
-            formatted_uploaded_at: new Date(file.uploaded_at).toLocaleString(),
-            formatted_last_downloaded: file.last_downloaded 
-              ? new Date(file.last_downloaded).toLocaleString() 
-              : 'Never'
-          };
-        });
-        
-        setFiles(filesWithUsernames);
+        setFiles(withUsernames(response.data));
+        setNextPage(response.next);
       } else {
         handleError(response.message || 'Failed to load files');
       }
@@ -79,14 +81,27 @@ const AdminPanel = () => {
     }
   };
 
-  useEffect(() => {
-    const interval = setInterval(() => {
-      if (activeTab === 'users') {
-        loadUsers();
+  const loadMoreFiles = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await listFiles({}, nextPage);
+      if (response.success) {
+        setFiles(prev => appendFilePage(prev, withUsernames(response.data)));
+        setNextPage(response.next);
       } else {
-        loadFiles();
+        handleError(response.message || 'Failed to load files');
       }
-    }, 30000);
+    } catch (error) {
+      handleError('An error occurred while loading files.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
+    if (activeTab !== 'users') return undefined;
+    const interval = setInterval(loadUsers, 30000);
     
     return () => clearInterval(interval);
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -124,7 +139,7 @@ const AdminPanel = () => {
     try {
       const response = await deleteFile(fileId);
       if (response.success) {
-        await loadFiles();
+        setFiles(prev => prev.filter(file => file.id !== fileId));
       } else {
         handleError(response.message || 'Failed to delete file');
       }
@@ -137,7 +152,6 @@ const AdminPanel = () => {
     try {
       const response = await getDownloadLink(fileId);
       if (response.success) {
-        setTimeout(loadFiles, 1000);
         return response;
       } else {
         handleError(response.message || 'Failed to get download link');
@@ -164,8 +178,15 @@ const AdminPanel = () => {
     }
   };
 
-  const handleFilesUpdated = async () => {
-    await loadFiles();
+  // Called with the WebSocket frame, or without one after a local change
+  // that its event will report
+  const handleFilesUpdated = (message) => {
+    if (!message) return;
+    if (message.type === 'resync') {
+      loadFiles();
+    } else {
+      setFiles(prev => withUsernames(applyFileEvents(prev, fileEvents(message))));
+    }
   };
 
   return (
@@ -202,6 +223,9 @@ const AdminPanel = () => {
             onDeleteFile={handleDeleteFile}
             onGetDownloadLink={handleGetDownloadLink}
             onFileChange={handleFilesUpdated}
+            hasMore={Boolean(nextPage)}
+            loadingMore={loadingMore}
+            onLoadMore={loadMoreFiles}
           />
         )}
       </div>
@@ -5,11 +5,14 @@ import FileUploader from '../../components/FileUploader/FileUploader';
 import { useNavigate } from 'react-router-dom';
 import { useSelector } from 'react-redux';
 import { toast } from 'react-toastify';
+import { appendFilePage, applyFileEvents, fileEvents } from '../../utils/helpers';
 import './Dashboard.css';
 
 const Dashboard = () => {
   const [userFiles, setUserFiles] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const navigate = useNavigate();
   const isAdmin = useSelector((state) => state.auth.isAdmin);
@@ -28,6 +31,8 @@ const Dashboard = () => {
     }
   }, [navigate]);
 
+  // Loads the first page; further pages are loaded on demand and kept up to
+  // date from the WebSocket events (see handleFileChange)
   const fetchFiles = async () => {
     const token = localStorage.getItem('accessToken');
     if (!token) return;
@@ -39,15 +44,13 @@ const Dashboard = () => {
     setError('');
 
     try {
-      const { success, data, message } = await listFiles({
+      const { success, data, next, message } = await listFiles({
         signal: abortControllerRef.current.signal
       });
 
       if (success) {
-        const sortedFiles = [...data].sort((a, b) => 
-          new Date(b.last_downloaded || 0) - new Date(a.last_downloaded || 0)
-        );
-        setUserFiles(isAdmin ? sortedFiles.filter(file => file.user === 1) : sortedFiles);
+        setUserFiles(data);
+        setNextPage(next);
       } else {
         handleAuthError(message);
       }
@@ -61,13 +64,43 @@ const Dashboard = () => {
     }
   };
 
+  const loadMoreFiles = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const { success, data, next, message } = await listFiles({
+        signal: abortControllerRef.current.signal
+      }, nextPage);
+      if (success) {
+        setUserFiles(prev => appendFilePage(prev, data));
+        setNextPage(next);
+      } else {
+        handleAuthError(message);
+      }
+    } catch (err) {
+      if (err.name !== 'CanceledError') {
+        setError('Error loading files');
+        console.error('File loading error:', err);
+      }
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Called with the WebSocket frame, or without one after a local change
+  // that its event will report
+  const handleFileChange = (message) => {
+    if (!message) return;
+    if (message.type === 'resync') {
+      fetchFiles();
+    } else {
+      setUserFiles(prev => applyFileEvents(prev, fileEvents(message)));
+    }
+  };
+
   useEffect(() => {
     fetchFiles();
-    const interval = setInterval(fetchFiles, 30000);
-    return () => {
-      abortControllerRef.current.abort();
-      clearInterval(interval);
-    };
+    return () => abortControllerRef.current.abort();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [isAdmin]);
 
@@ -92,7 +125,6 @@ const Dashboard = () => {
     try {
       const response = await getDownloadLink(fileId);
       if (response.success && response.shared_link) {
-        setTimeout(fetchFiles, 1000);
         return { shared_link: response.shared_link };
       }
       setError(response.message || 'Failed to get download link');
@@ -127,16 +159,19 @@ const Dashboard = () => {
       
       {error && <div className="error-message">{error}</div>}
       
-      <FileUploader refreshFiles={fetchFiles} />
+      <FileUploader refreshFiles={setUserFiles} />
       
       {loading ? (
         <div className="loading-indicator">Loading...</div>
       ) : (
         <FileList
-          files={userFiles}
+          files={isAdmin ? userFiles.filter(file => file.user === 1) : userFiles}
           onGetDownloadLink={handleGetDownloadLink}
           onDeleteFile={handleDeleteFile}
-          onFileChange={fetchFiles}
+          onFileChange={handleFileChange}
+          hasMore={Boolean(nextPage)}
+          loadingMore={loadingMore}
+          onLoadMore={loadMoreFiles}
         />
       )}
     </div>
@@ -14,4 +14,29 @@ export const clearUserData = () => {
 export const isAuthenticated = async () => {
   console.warn('The IsAuthenticated() method is deprecated. Use API verification');
   return false;
-};
\ No newline at end of file
+};
+
+// Events of a `file_update` or `file_updates` WebSocket frame.
+export const fileEvents = (message) => (
+  message.type === 'file_updates' ? message.events : [message]
+);
+
+// Applies file change events to a loaded, newest-first file list: created
+// files go in front, updated ones are merged in place and deleted ones are
+// removed. Changes to files on pages not loaded yet arrive with those pages.
+export const applyFileEvents = (files, events) => events.reduce((result, event) => {
+  const { action, file_id: fileId, data = {} } = event;
+  if (action === 'deleted') {
+    return result.filter(file => file.id !== fileId);
+  }
+  if (result.some(file => file.id === fileId)) {
+    return result.map(file => (file.id === fileId ? { ...file, ...data } : file));
+  }
+  return action === 'created' ? [{ id: fileId, ...data }, ...result] : result;
+}, files);
+
+// Appends a further page, skipping files that are already listed.
+export const appendFilePage = (files, page) => {
+  const ids = new Set(files.map(file => file.id));
+  return [...files, ...page.filter(file => !ids.has(file.id))];
+};